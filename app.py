@@ -34,7 +34,13 @@ def init_database():
     """Inicializa o banco de dados (executa uma única vez por sessão do servidor)."""
     try:
         from database.migrations import run_migrations
+        from database.queries import reconcile_bank_balances, take_balance_snapshots
         run_migrations()
+        # Também preenche o saldo corrente na primeira execução após a migração do trigger
+        for f in reconcile_bank_balances():
+            logger.warning(f"Saldo do banco {f['name']} reconciliado: {f['previous_cents']} → {f['expected_cents']}")
+        # Completa os snapshots de saldo até ontem (backfill na primeira execução)
+        take_balance_snapshots()
         return True
     except Exception as e:
         st.error(f"❌ Erro ao inicializar banco de dados: {e}")
@@ -42,20 +48,38 @@ def init_database():
 
 db_ok = init_database()
 
-# ─── Verificação de notificações (uma vez por sessão) ──────────────────
-if 'notifications_sent' not in st.session_state:
-    st.session_state.notifications_sent = False
+# ─── Métricas (Prometheus) ─────────────────────────────────────────────
+from utils.metrics import get_metrics_config, start_http_server, start_file_writer, track_page
+from utils.tracing import span
+from utils.profiling import profiling_allowed, profile_requested, profile_run
 
-if db_ok and not st.session_state.notifications_sent:
+
+@st.cache_resource
+def init_metrics():
+    """Sobe o exportador uma única vez por processo do servidor, se configurado."""
+    config = get_metrics_config()
     try:
-        from database.queries import get_items_for_notification
-        from utils.notifications import notify_due_items
-        items = get_items_for_notification()
-        if items:
-            notify_due_items(list(items))
-        st.session_state.notifications_sent = True
-    except Exception as e:
-        logger.warning(f"Falha ao verificar notificações: {e}")
+        if config.get("port"):
+            start_http_server(int(config["port"]), config.get("host", "0.0.0.0"))
+        elif config.get("file"):
+            start_file_writer(config["file"], float(config.get("interval", 15)))
+    except OSError as e:
+        logger.warning(f"Exportador de métricas não iniciado: {e}")
+    return True
+
+
+init_metrics()
+
+# ─── Manutenção diária (notificações, saldos, partições) ───────────────
+@st.cache_resource
+def init_daily_jobs():
+    """Timer do servidor, um por processo — roda mesmo sem sessões abertas."""
+    from jobs.scheduler import use_daily_scheduler, start_daily_scheduler
+    return start_daily_scheduler() if use_daily_scheduler() else None
+
+
+if db_ok:
+    init_daily_jobs()
 
 # ─── Sidebar de navegação ──────────────────────────────────────────────
 with st.sidebar:
@@ -77,6 +101,10 @@ with st.sidebar:
 
     st.markdown("---")
 
+    if profiling_allowed():
+        st.toggle("🔬 Perfilar execução", key="profile_run",
+                  help="Perfila cada rerun (cProfile) e mostra o resumo no fim da página. Também: ?profile=1")
+
     # Status do banco
     if db_ok:
         st.markdown("""
@@ -114,12 +142,18 @@ if not db_ok:
     """)
     st.stop()
 
-if page == "🏠 Home":
-    from pages.home import render
-    render()
-elif page == "💼 Finanças":
-    from pages.financas import render
-    render()
-elif page == "📋 Atividades":
-    from pages.atividades import render
-    render()
+# Raiz do trace do rerun: página → aba → queries/gráficos (utils/tracing.py);
+# com ?profile=1 ou o toggle da sidebar, o rerun também roda sob cProfile
+with span("streamlit.rerun", {"page": page}), profile_run(profile_requested()):
+    if page == "🏠 Home":
+        from pages.home import render
+        with track_page("Home"):
+            render()
+    elif page == "💼 Finanças":
+        from pages.financas import render
+        with track_page("Finanças"):
+            render()
+    elif page == "📋 Atividades":
+        from pages.atividades import render
+        with track_page("Atividades"):
+            render()
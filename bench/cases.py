@@ -0,0 +1,221 @@
+"""
+bench/cases.py
+Casos de benchmark: cada função de database/queries.py e os construtores
+de página (fluxo de caixa, recorrências, Dashboards, resumo da Home)
+"""
+
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from database import queries as q
+from database.connection import execute_query
+from utils.helpers import month_range
+from utils.reports import build_cashflow_table, build_recurrence_grid, dashboard_aggregates
+
+# Marca os registros criados pelos casos de escrita (removidos ao final de cada execução)
+BENCH_TAG = "__bench__"
+
+CASES = {}
+
+
+class Case:
+    def __init__(self, name: str, group: str, fn, setup=None):
+        self.name = name
+        self.group = group
+        self.fn = fn
+        self.setup = setup
+
+
+def case(name: str, group: str = "queries", setup=None):
+    """
+    Registra um caso. `fn(ctx, *args)` é cronometrada; `setup(ctx)` (não
+    cronometrado) devolve os args. Se `fn` retornar um callable, ele é
+    chamado depois da medição para desfazer escritas.
+    """
+    def register(fn):
+        CASES[name] = Case(name, group, fn, setup)
+        return fn
+    return register
+
+
+class Context:
+    """Ids e datas de referência da massa carregada, lidos uma vez."""
+
+    def __init__(self, today: date = None):
+        self.today = today or date.today()
+        self.month = self.today.replace(day=1)
+        row = execute_query("""
+            SELECT c.id AS category_id, c.flow_type, MIN(s.id) AS subcategory_id
+            FROM categories c JOIN subcategories s ON s.category_id = c.id
+            WHERE c.active = TRUE GROUP BY c.id, c.flow_type ORDER BY c.id LIMIT 1
+        """)
+        self.category_id = row[0]['category_id'] if row else None
+        self.subcategory_id = row[0]['subcategory_id'] if row else None
+        self.flow_type = row[0]['flow_type'] if row else 'Saída'
+        bank = execute_query("SELECT MIN(id) AS id FROM banks WHERE active = TRUE")
+        self.bank_id = bank[0]['id'] if bank else None
+
+    def transaction_data(self) -> dict:
+        return dict(flow_type=self.flow_type, category_id=self.category_id,
+                    subcategory_id=self.subcategory_id, bank_id=self.bank_id,
+                    description=BENCH_TAG, value=123.45, interest=0, due_date=self.today,
+                    status='Não pago', is_recurrent=True, recurrence_type='Mensal')
+
+
+def _cleanup(table: str, column: str):
+    return lambda: execute_query(f"DELETE FROM {table} WHERE {column}=%s", (BENCH_TAG,), fetch=False)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# LEITURAS
+# ═══════════════════════════════════════════════════════════════════
+
+case("get_home_summary")(lambda ctx: q.get_home_summary())
+case("get_cashflow_chart_data")(lambda ctx: q.get_cashflow_chart_data(6))
+case("get_today_activities")(lambda ctx: q.get_today_activities())
+case("get_suppliers")(lambda ctx: q.get_suppliers())
+case("get_categories")(lambda ctx: q.get_categories())
+case("get_categories[flow_type]")(lambda ctx: q.get_categories(ctx.flow_type))
+case("get_subcategories")(lambda ctx: q.get_subcategories(ctx.category_id))
+case("get_banks")(lambda ctx: q.get_banks())
+case("get_total_initial_balance_cents")(lambda ctx: q.get_total_initial_balance_cents())
+case("get_transactions[all]")(lambda ctx: q.get_transactions())
+case("get_transactions[month]")(lambda ctx: q.get_transactions(
+    start_date=ctx.month, end_date=ctx.month + relativedelta(months=1) - timedelta(days=1)))
+case("get_transactions[forecast]")(lambda ctx: q.get_transactions(is_forecast=True))
+case("get_transactions_table[all]")(lambda ctx: q.get_transactions_table())
+case("get_transactions_table[month]")(lambda ctx: q.get_transactions_table(
+    start_date=ctx.month, end_date=ctx.month + relativedelta(months=1) - timedelta(days=1)))
+case("get_cashflow_planned_vs_actual")(lambda ctx: q.get_cashflow_planned_vs_actual(24))
+case("get_cashflow_series[day,5y]")(lambda ctx: q.get_cashflow_series(
+    ctx.today - relativedelta(years=5), ctx.today, "day"))
+case("get_cashflow_series[week,5y]")(lambda ctx: q.get_cashflow_series(
+    ctx.today - relativedelta(years=5), ctx.today, "week"))
+case("get_ledger[month,5y]")(lambda ctx: q.get_ledger(ctx.today - relativedelta(years=5), ctx.today))
+case("get_ledger[day,by_bank,1y]")(lambda ctx: q.get_ledger(
+    ctx.today - relativedelta(years=1), ctx.today, "day", by_bank=True))
+case("get_balance_on[today]")(lambda ctx: q.get_balance_on(ctx.today))
+case("get_balance_on[1y ago]")(lambda ctx: q.get_balance_on(ctx.today - relativedelta(years=1)))
+case("get_goals")(lambda ctx: q.get_goals())
+case("get_budget")(lambda ctx: q.get_budget(ctx.month))
+case("get_budget_vs_actual")(lambda ctx: q.get_budget_vs_actual(ctx.month))
+case("get_activities")(lambda ctx: q.get_activities())
+case("get_action_plans")(lambda ctx: q.get_action_plans())
+case("get_items_for_notification")(lambda ctx: q.get_items_for_notification())
+
+
+@case("iter_transactions[all]")
+def _iter_transactions(ctx):
+    for _ in q.iter_transactions():
+        pass
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ESCRITAS (cada execução desfaz o que criou)
+# ═══════════════════════════════════════════════════════════════════
+
+@case("insert_transaction[single]", group="writes")
+def _insert_transaction(ctx):
+    q.insert_transaction(dict(ctx.transaction_data(), is_recurrent=False))
+    return _cleanup("transactions", "description")
+
+
+@case("insert_transaction[24 recurrences]", group="writes")
+def _insert_transaction_recurrent(ctx):
+    q.insert_transaction(ctx.transaction_data(), recurrence_months=24)
+    return _cleanup("transactions", "description")
+
+
+def _bench_transaction(ctx):
+    q.insert_transaction(dict(ctx.transaction_data(), is_recurrent=False))
+    rows = execute_query("SELECT MAX(id) AS id FROM transactions WHERE description=%s", (BENCH_TAG,))
+    return (rows[0]['id'],)
+
+
+@case("update_transaction", group="writes", setup=_bench_transaction)
+def _update_transaction(ctx, tx_id):
+    q.update_transaction(tx_id, dict(ctx.transaction_data(), status='Pago', payment_date=ctx.today))
+    return _cleanup("transactions", "description")
+
+
+@case("delete_transaction", group="writes", setup=_bench_transaction)
+def _delete_transaction(ctx, tx_id):
+    q.delete_transaction(tx_id)
+
+
+@case("upsert_supplier", group="writes")
+def _upsert_supplier(ctx):
+    q.upsert_supplier({'name': BENCH_TAG})
+    return _cleanup("suppliers", "name")
+
+
+@case("upsert_category+subcategory", group="writes")
+def _upsert_category(ctx):
+    q.upsert_category('Saída', BENCH_TAG)
+    q.upsert_subcategory(ctx.category_id, BENCH_TAG)
+    return lambda: (_cleanup("subcategories", "name")(), _cleanup("categories", "name")())
+
+
+@case("upsert_bank", group="writes")
+def _upsert_bank(ctx):
+    q.upsert_bank({'name': BENCH_TAG, 'initial_balance': 1000})
+
+    def cleanup():
+        # upsert_bank inclui o banco novo nos snapshots existentes (FK para banks)
+        execute_query("DELETE FROM balance_snapshots WHERE bank_id IN (SELECT id FROM banks WHERE name=%s)",
+                      (BENCH_TAG,), fetch=False)
+        _cleanup("banks", "name")()
+    return cleanup
+
+
+@case("upsert_goal", group="writes")
+def _upsert_goal(ctx):
+    q.upsert_goal({'title': BENCH_TAG, 'target_value': 1000, 'time_bound': ctx.today})
+    return _cleanup("goals", "title")
+
+
+_BUDGET_KEY = "category_id=%s AND subcategory_id IS NOT DISTINCT FROM %s AND year_month=%s"
+
+
+def _budget_row(ctx):
+    rows = execute_query(f"SELECT planned_value, updated_at FROM budget WHERE {_BUDGET_KEY}",
+                         (ctx.category_id, ctx.subcategory_id, ctx.month))
+    return (rows[0] if rows else None,)
+
+
+@case("upsert_budget", group="writes", setup=_budget_row)
+def _upsert_budget(ctx, previous):
+    q.upsert_budget(ctx.category_id, ctx.subcategory_id, ctx.month, 1000)
+    key = (ctx.category_id, ctx.subcategory_id, ctx.month)
+    # O orçamento do mês é da massa (ou do usuário): volta ao valor anterior
+    if previous is None:
+        return lambda: execute_query(f"DELETE FROM budget WHERE {_BUDGET_KEY}", key, fetch=False)
+    return lambda: execute_query(f"UPDATE budget SET planned_value=%s, updated_at=%s WHERE {_BUDGET_KEY}",
+                                 (previous['planned_value'], previous['updated_at'], *key), fetch=False)
+
+
+@case("upsert_activity+action_plan", group="writes")
+def _upsert_activity(ctx):
+    act_id = q.upsert_activity({'title': BENCH_TAG, 'start_date': ctx.today, 'end_date': ctx.today})
+    q.upsert_action_plan({'activity_id': act_id, 'what': BENCH_TAG})
+    return _cleanup("activities", "title")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CONSTRUTORES DE PÁGINA
+# ═══════════════════════════════════════════════════════════════════
+
+case("build_cashflow_table[forecast]", group="pages")(
+    lambda ctx: build_cashflow_table(True, ctx.month))
+case("build_cashflow_table[actual]", group="pages")(
+    lambda ctx: build_cashflow_table(False, ctx.month))
+case("recurrence_grid", group="pages")(
+    lambda ctx: build_recurrence_grid(q.get_transactions(), month_range(24)))
+
+
+@case("dashboard_aggregates[year]", group="pages")
+def _dashboard(ctx):
+    start = ctx.today.replace(month=1, day=1)
+    dashboard_aggregates(q.iter_transactions(start_date=start, end_date=start.replace(month=12, day=31)),
+                         ctx.today)
@@ -0,0 +1,299 @@
+"""
+bench/load.py
+Teste de carga com N sessões concorrentes (AppTest, uma por processo — o
+AppTest usa um Runtime global e não admite runs simultâneos na mesma
+instância do interpretador), percorrendo roteiros realistas: navegação,
+salvar grids, Pomodoro rodando:
+
+    python -m bench.load --url postgresql://localhost/bk_bench --sessions 8 --duration 120 \\
+        --out bench/results/load.json
+
+Reporta vazão, latência de rerun p50/p95/p99 por passo, conexões abertas e
+esperas no banco (amostradas de pg_stat_activity).
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import logging
+import argparse
+import threading
+import multiprocessing
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import numpy as np
+import psycopg2
+
+from database.instrumentation import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+RUN_TIMEOUT_SECONDS = 300
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PASSOS E ROTEIROS
+# ═══════════════════════════════════════════════════════════════════
+
+def _goto(label: str):
+    def step(at):
+        at.sidebar.radio[0].set_value(label).run()
+    return step
+
+
+def _click(key: str):
+    """Clica um botão com key. AppTest não edita data_editor: salvar regrava as linhas exibidas."""
+    def step(at):
+        at.button(key=key).click().run()
+    return step
+
+
+def _pomodoro(seconds: float):
+    """Inicia o timer e deixa os reruns de 1 s rodarem por `seconds`, depois pausa."""
+    def step(at):
+        start = next(b for b in at.button if b.label.startswith("▶️"))
+        try:
+            start.click().run(timeout=seconds)
+        except RuntimeError:
+            pass  # timeout esperado: o timer reexecuta a página até ser pausado
+        pause = next((b for b in at.button if b.label.startswith("⏸️")), None)
+        if pause is not None:
+            pause.click().run()
+    return step
+
+
+def build_paths(pomodoro_seconds: float) -> dict:
+    """Roteiros: nome → (peso, [(passo, função)])."""
+    return {
+        "navegação": (4, [("goto:Finanças", _goto("💼 Finanças")),
+                          ("goto:Atividades", _goto("📋 Atividades")),
+                          ("goto:Home", _goto("🏠 Home"))]),
+        "lançamentos": (2, [("goto:Finanças", _goto("💼 Finanças")),
+                            ("save:lançamentos", _click("save_lanc"))]),
+        "cadastros": (1, [("goto:Finanças", _goto("💼 Finanças")),
+                          ("save:fornecedores", _click("save_sup"))]),
+        "pomodoro": (1, [("goto:Atividades", _goto("📋 Atividades")),
+                         ("pomodoro", _pomodoro(pomodoro_seconds))]),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SESSÕES E MONITOR
+# ═══════════════════════════════════════════════════════════════════
+
+class Session:
+    def __init__(self, index: int, paths: dict, deadline: float, think: float, seed: int):
+        self.rng = random.Random(seed + index)
+        self.paths = paths
+        self.deadline = deadline
+        self.think = think
+        self.samples = []
+
+    def _record(self, step: str, fn, at):
+        started = time.perf_counter()
+        error = None
+        try:
+            fn(at)
+            if at.exception:
+                error = at.exception[0].message
+        except Exception as e:
+            error = str(e)
+        self.samples.append((step, time.perf_counter() - started, error))
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+        at = AppTest.from_file(APP_PATH, default_timeout=RUN_TIMEOUT_SECONDS)
+        self._record("open", lambda a: a.run(), at)
+        names = list(self.paths)
+        weights = [self.paths[n][0] for n in names]
+        while time.time() < self.deadline:
+            for step, fn in self.paths[self.rng.choices(names, weights)[0]][1]:
+                if time.time() >= self.deadline:
+                    return
+                self._record(step, fn, at)
+                time.sleep(self.rng.uniform(0, self.think))
+
+
+def _session_process(index: int, deadline: float, think: float, pomodoro_seconds: float, seed: int, out):
+    """Processo de uma sessão: devolve (índice, amostras, contagem de queries…) pela fila."""
+    logging.basicConfig(level=logging.WARNING)
+    sys.path.insert(0, ROOT)
+    session = Session(index, build_paths(pomodoro_seconds), deadline, think, seed)
+    with QueryRecorder() as rec:
+        session.run()
+    out.put((index, session.samples, rec.count, rec.total_time, dict(rec.time_by_statement)))
+
+
+class DbMonitor(threading.Thread):
+    """Amostra pg_stat_activity por conexão própria (fora da contagem de queries)."""
+
+    def __init__(self, url: str, interval: float):
+        super().__init__(name="db-monitor", daemon=True)
+        self.url = url
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.connections = []
+        self.active = []
+        self.waits = Counter()
+
+    def run(self):
+        conn = psycopg2.connect(self.url)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                while not self.stop_event.wait(self.interval):
+                    cur.execute("""
+                        SELECT state, wait_event_type, wait_event
+                        FROM pg_stat_activity
+                        WHERE datname = current_database() AND pid <> pg_backend_pid()
+                    """)
+                    rows = cur.fetchall()
+                    self.connections.append(len(rows))
+                    self.active.append(sum(1 for r in rows if r[0] == 'active'))
+                    for state, wait_type, wait in rows:
+                        if state == 'active' and wait_type:
+                            self.waits[f"{wait_type}:{wait}"] += 1
+        finally:
+            conn.close()
+
+
+def _percentiles(values: list) -> dict:
+    arr = np.asarray(values) * 1000
+    return {"count": len(values), "p50_ms": float(np.percentile(arr, 50)),
+            "p95_ms": float(np.percentile(arr, 95)), "p99_ms": float(np.percentile(arr, 99)),
+            "max_ms": float(arr.max())}
+
+
+def summarize(samples: list, duration: float, queries: int, db_time: float,
+              time_by_statement: Counter, monitor: DbMonitor) -> dict:
+    by_step = defaultdict(list)
+    errors = Counter()
+    for step, elapsed, error in samples:
+        if error:
+            errors[f"{step}: {error[:120]}"] += 1
+        elif step != "pomodoro":  # duração fixa, não é latência de rerun
+            by_step[step].append(elapsed)
+    reruns = [e for values in by_step.values() for e in values]
+    return {
+        "duration_s": duration,
+        "reruns": len(reruns),
+        "throughput_rps": len(reruns) / duration if duration else 0,
+        "latency": _percentiles(reruns) if reruns else {},
+        "by_step": {step: _percentiles(values) for step, values in sorted(by_step.items())},
+        "errors": dict(errors),
+        "queries": queries,
+        "queries_per_s": queries / duration if duration else 0,
+        "avg_query_ms": db_time / queries * 1000 if queries else 0,
+        "top_statements_s": dict(time_by_statement.most_common(10)),
+        "db": {
+            "connections_max": max(monitor.connections, default=0),
+            "connections_avg": float(np.mean(monitor.connections)) if monitor.connections else 0,
+            "active_max": max(monitor.active, default=0),
+            "wait_samples": dict(monitor.waits.most_common()),
+        },
+    }
+
+
+def run_load(url: str, sessions: int, duration: float, think: float, ramp: float,
+             pomodoro_seconds: float, seed: int, monitor_interval: float) -> dict:
+    mp = multiprocessing.get_context("spawn")
+    out = mp.Queue()
+    monitor = DbMonitor(url, monitor_interval)
+    monitor.start()
+    started = time.time()
+    # Tempo de subida do processo entra na rampa; o prazo vale para todas as sessões
+    deadline = started + ramp + duration
+    procs = []
+    for i in range(sessions):
+        p = mp.Process(target=_session_process, args=(i, deadline, think, pomodoro_seconds, seed, out),
+                       name=f"session-{i}")
+        p.start()
+        procs.append(p)
+        time.sleep(ramp / max(sessions, 1))
+
+    samples, queries, db_time, by_statement = [], 0, 0.0, Counter()
+    pending = set(range(sessions))
+    give_up = deadline + RUN_TIMEOUT_SECONDS
+    while pending and time.time() < give_up:
+        try:
+            i, s, count, total, statements = out.get(timeout=1)
+        except queue.Empty:
+            # Processo morto sem resultado na fila: a sessão falhou (crash, OOM…)
+            if not any(procs[j].is_alive() for j in pending):
+                break
+            continue
+        pending.discard(i)
+        samples += s
+        queries += count
+        db_time += total
+        by_statement.update(statements)
+    for i in sorted(pending):
+        procs[i].terminate()
+        procs[i].join()
+        logger.error(f"Sessão {i} sem resultado (exit code {procs[i].exitcode})")
+        samples.append(("sessão", 0.0, f"processo sem resultado (exit code {procs[i].exitcode})"))
+    for p in procs:
+        p.join()
+    elapsed = time.time() - started
+    monitor.stop_event.set()
+    monitor.join()
+    result = summarize(samples, elapsed, queries, db_time, by_statement, monitor)
+    result["sessions_failed"] = len(pending)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões Streamlit concorrentes")
+    parser.add_argument("--url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="URL do banco de benchmark (padrão: BENCH_DATABASE_URL)")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[4],
+                        help="sessões concorrentes; vários valores = uma rodada por valor")
+    parser.add_argument("--duration", type=float, default=60, help="segundos por rodada")
+    parser.add_argument("--think", type=float, default=2.0, help="pausa máxima entre cliques (s)")
+    parser.add_argument("--ramp", type=float, default=5.0, help="segundos para abrir todas as sessões")
+    parser.add_argument("--pomodoro-seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, help="processos do executor de relatórios (REPORT_WORKERS)")
+    parser.add_argument("--monitor-interval", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="arquivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.url:
+        parser.error("informe --url ou BENCH_DATABASE_URL")
+    from database.connection import set_db_url
+    set_db_url(args.url)
+    # Manutenção diária fora da medição (herdado pelos processos das sessões)
+    os.environ["JOB_SCHEDULER"] = "0"
+    if args.workers is not None:
+        os.environ["REPORT_WORKERS"] = str(args.workers)
+    sys.path.insert(0, ROOT)
+
+    rounds = {}
+    for n in args.sessions:
+        logger.info(f"Rodada com {n} sessões por {args.duration:.0f}s…")
+        r = run_load(args.url, n, args.duration, args.think, args.ramp,
+                     args.pomodoro_seconds, args.seed, args.monitor_interval)
+        rounds[str(n)] = r
+        lat = r["latency"]
+        logger.info(f"  {r['throughput_rps']:.2f} reruns/s  p50 {lat.get('p50_ms', 0):.0f} ms  "
+                    f"p95 {lat.get('p95_ms', 0):.0f} ms  p99 {lat.get('p99_ms', 0):.0f} ms  "
+                    f"conexões máx {r['db']['connections_max']}  erros {sum(r['errors'].values())}  "
+                    f"sessões falhas {r['sessions_failed']}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"),
+                                "duration_s": args.duration, "think_s": args.think, "seed": args.seed},
+                       "rounds": rounds}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
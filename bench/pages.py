@@ -0,0 +1,260 @@
+"""
+bench/pages.py
+Renderização headless das páginas (streamlit.testing AppTest) contra a massa
+semeada: tempo de script, queries, pico de memória e payload Arrow por página
+e por aba, com orçamentos por página (bench/budgets.json):
+
+    python -m bench.pages --url postgresql://localhost/bk_bench --scenario 10k \\
+        --out bench/results/pages.json
+"""
+
+import os
+import gc
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import statistics
+import tracemalloc
+from datetime import datetime
+
+from database.instrumentation import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+DEFAULT_BUDGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "budgets.json")
+RUN_TIMEOUT_SECONDS = 300
+
+# Folga dos orçamentos sobre a medição (--write-budgets): tempo e memória variam
+# com a máquina e o alocador; queries e payload Arrow quase não variam
+TIME_FACTOR, TIME_MIN_S = 2.0, 1.0
+QUERY_FACTOR, QUERY_MIN_EXTRA = 1.1, 2
+MEMORY_FACTOR, MEMORY_EXTRA_MB = 1.5, 2.0
+ARROW_FACTOR, ARROW_MIN_KB = 1.25, 8
+
+# Páginas inteiras (navegação pela sidebar do app.py) e abas isoladas
+APP_PAGES = {
+    "Home": "🏠 Home",
+    "Finanças": "💼 Finanças",
+    "Atividades": "📋 Atividades",
+}
+TABS = {
+    "Finanças/Cadastros": ("pages.financas", "_tab_cadastros"),
+    "Finanças/Movimentações": ("pages.financas", "_tab_movimentacoes"),
+    "Finanças/Gerencial": ("pages.financas", "_tab_gerencial"),
+    "Finanças/Metas & Orçamento": ("pages.financas", "_tab_metas_orcamento"),
+    "Finanças/Dashboards": ("pages.financas", "_tab_dashboards"),
+    "Atividades/Atividades": ("pages.atividades", "_tab_atividades"),
+    "Atividades/Plano de Ação": ("pages.atividades", "_tab_plano_acao"),
+    "Atividades/Pomodoro": ("pages.atividades", "_tab_pomodoro"),
+}
+
+
+def _app_run(label: str):
+    """Sessão nova no app.py; o primeiro run (Home) prepara, o medido navega até a página."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=RUN_TIMEOUT_SECONDS)
+    at.run()
+    at.sidebar.radio[0].set_value(label)
+    return at, at.run
+
+
+def _tab_run(module: str, func: str):
+    from streamlit.testing.v1 import AppTest
+    script = f"from {module} import {func}\n{func}()\n"
+    at = AppTest.from_string(script, default_timeout=RUN_TIMEOUT_SECONDS)
+    return at, at.run
+
+
+def _prepare(target: str):
+    if target in APP_PAGES:
+        return _app_run(APP_PAGES[target])
+    return _tab_run(*TABS[target])
+
+
+def _iter_elements(node):
+    children = getattr(node, "children", None)
+    if children is None:
+        yield node
+        return
+    for child in children.values():
+        yield from _iter_elements(child)
+
+
+def payload_sizes(at) -> dict:
+    """Bytes Arrow (dataframes/editores) e total serializado dos elementos renderizados."""
+    arrow = total = 0
+    for root in (at.main, at.sidebar):
+        for el in _iter_elements(root):
+            proto = getattr(el, "proto", None)
+            if proto is None:
+                continue
+            total += proto.ByteSize()
+            if hasattr(proto, "arrow_data"):
+                arrow += len(proto.arrow_data.data)
+    return {"arrow_bytes": arrow, "payload_bytes": total}
+
+
+def measure_target(target: str, repeat: int) -> dict:
+    """`repeat` runs cronometrados + 1 run sob tracemalloc para o pico de memória."""
+    from utils.executor import clear_jobs
+
+    times, queries, sizes, errors = [], None, None, []
+    for i in range(repeat + 1):
+        at, run = _prepare(target)
+        clear_jobs()
+        gc.collect()
+        trace = i == repeat
+        if trace:
+            tracemalloc.start()
+        with QueryRecorder() as rec:
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            times.append(elapsed)
+            queries = rec.count
+            sizes = payload_sizes(at)
+        errors = [e.message for e in at.exception]
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "queries": queries,
+        "peak_mb": round(peak / 2**20, 1),
+        "arrow_kb": round(sizes["arrow_bytes"] / 1024, 1),
+        "payload_kb": round(sizes["payload_bytes"] / 1024, 1),
+        "errors": errors,
+    }
+
+
+BUDGET_KEYS = ("seconds", "queries", "peak_mb", "arrow_kb")
+
+
+def check_budgets(results: dict, budgets: dict, keys=BUDGET_KEYS) -> list:
+    """
+    Violações (cenário, alvo, motivo): tempo, queries, memória ou payload
+    acima do orçamento — só os itens de `keys`.
+    """
+    limits = [(key, field, unit) for key, field, unit in (
+        ("seconds", "median_s", "s"), ("queries", "queries", ""),
+        ("peak_mb", "peak_mb", " MB"), ("arrow_kb", "arrow_kb", " KB")) if key in keys]
+    violations = []
+    for scenario, targets in results.items():
+        for target, r in targets.items():
+            if r.get("errors"):
+                violations.append((scenario, target, f"exceção: {r['errors'][0]}"))
+            budget = budgets.get(scenario, {}).get(target, {})
+            for key, field, unit in limits:
+                if key in budget and r[field] > budget[key]:
+                    violations.append((scenario, target, f"{key} {r[field]:g}{unit} > {budget[key]:g}{unit}"))
+    return violations
+
+
+def _round_up(value: float, step: float) -> float:
+    return math.ceil(value / step) * step
+
+
+def derive_budgets(results: dict) -> dict:
+    """Orçamentos por cenário/alvo a partir das medições, com as folgas acima."""
+    budgets = {}
+    for scenario, targets in results.items():
+        budgets[scenario] = {}
+        for target, r in targets.items():
+            queries = r["queries"]
+            budgets[scenario][target] = {
+                "seconds": max(TIME_MIN_S, _round_up(r["median_s"] * TIME_FACTOR, 0.5)),
+                "queries": max(math.ceil(queries * QUERY_FACTOR), queries + QUERY_MIN_EXTRA),
+                "peak_mb": math.ceil(r["peak_mb"] * MEMORY_FACTOR + MEMORY_EXTRA_MB),
+                "arrow_kb": max(ARROW_MIN_KB, _round_up(r["arrow_kb"] * ARROW_FACTOR, 8)),
+            }
+    return budgets
+
+
+def load_budgets(path: str = DEFAULT_BUDGETS) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def configure(url: str):
+    """Aponta o processo para o banco de benchmark, com relatórios medidos no próprio script."""
+    from database.connection import set_db_url
+    set_db_url(url)
+    # Relatórios do executor rodam no próprio script, para entrarem na medição
+    os.environ["REPORT_WORKERS"] = "0"
+    # Manutenção diária fora da medição (e sem e-mails a partir do banco de benchmark)
+    os.environ["JOB_SCHEDULER"] = "0"
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+def main(argv=None):
+    from bench.seed import SCENARIOS, seed
+
+    parser = argparse.ArgumentParser(description="Benchmarks de renderização das páginas (AppTest)")
+    parser.add_argument("--url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="URL do banco de benchmark (padrão: BENCH_DATABASE_URL)")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS),
+                        help="semeia (com --reset) e mede cada cenário; sem isso mede o banco como está")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-k", dest="filter", help="só alvos cujo nome contém este texto")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budgets", default=DEFAULT_BUDGETS, help="JSON de orçamentos por cenário/página")
+    parser.add_argument("--out", help="arquivo JSON de resultados")
+    parser.add_argument("--write-budgets", action="store_true",
+                        help="regrava os orçamentos dos cenários medidos a partir desta medição")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.url:
+        parser.error("informe --url ou BENCH_DATABASE_URL")
+    configure(args.url)
+
+    targets = [t for t in list(APP_PAGES) + list(TABS) if not args.filter or args.filter in t]
+    results = {}
+    for scenario in args.scenario or ["current"]:
+        if scenario != "current":
+            logger.info(f"Semeando cenário {scenario}…")
+            seed(SCENARIOS[scenario], args.years, args.seed, reset=True)
+        results[scenario] = {}
+        for target in targets:
+            r = measure_target(target, args.repeat)
+            results[scenario][target] = r
+            logger.info(f"  {target:<28} {r['median_s']:7.2f} s  {r['queries']:5d} queries  "
+                        f"{r['peak_mb']:7.1f} MB  arrow {r['arrow_kb']:8.1f} KB")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"),
+                                "repeat": args.repeat, "seed": args.seed, "years": args.years},
+                       "results": results}, f, indent=2, ensure_ascii=False)
+
+    if args.write_budgets:
+        budgets = load_budgets(args.budgets)
+        for scenario, targets in derive_budgets(results).items():
+            budgets.setdefault(scenario, {}).update(targets)
+        with open(args.budgets, "w", encoding="utf-8") as f:
+            json.dump(budgets, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        logger.info(f"Orçamentos regravados em {args.budgets}")
+
+    violations = check_budgets(results, load_budgets(args.budgets))
+    for scenario, target, reason in violations:
+        logger.error(f"ORÇAMENTO [{scenario}] {target}: {reason}")
+    if violations:
+        sys.exit(1)
+    logger.info("Todas as páginas dentro do orçamento")
+
+
+if __name__ == "__main__":
+    main()
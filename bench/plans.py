@@ -0,0 +1,279 @@
+"""
+bench/plans.py
+Captura os planos de execução (EXPLAIN ANALYZE, BUFFERS, FORMAT JSON) de
+cada statement emitido por database/queries.py durante os casos de
+benchmark, normaliza e compara com um baseline:
+
+    python -m bench.plans --url postgresql://localhost/bk_bench \\
+        --out bench/results/plans.json --baseline bench/results/plans_baseline.json
+
+Também roda a partir de `python -m bench.run --plans ...`.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+
+import psycopg2
+
+from database.instrumentation import add_statement_listener, remove_statement_listener
+
+logger = logging.getLogger(__name__)
+
+# Só statements da camada de queries; escritas são explicadas dentro de transação desfeita
+STATEMENT_PREFIX = "database.queries."
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+# Linhas reais/estimadas acima deste fator (com ≥ ESTIMATE_MIN_ROWS) indicam estatística ruim
+ESTIMATE_BLOWUP = 100
+ESTIMATE_MIN_ROWS = 1000
+WATCHED_RELATIONS = frozenset({"transactions"})
+# Partições anuais de transactions — o EXPLAIN cita só elas: um seq scan numa
+# partição conta como seq scan em transactions, e o número lido mede a poda
+PARTITION_RELATION = re.compile(r"^transactions_(y\d{4}|default)$")
+
+
+def _shape(sql: str) -> str:
+    """Hash do SQL sem literais — mesmas queries com parâmetros diferentes têm o mesmo formato."""
+    text = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    text = re.sub(r"\b\d+(?:\.\d+)?\b", "?", text)
+    text = " ".join(text.split())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+
+
+class StatementCapture:
+    """Listener que guarda o primeiro SQL concreto de cada (função, formato)."""
+
+    def __init__(self):
+        self.statements = {}
+
+    def __call__(self, name: str, sql: str):
+        if not name.startswith(STATEMENT_PREFIX) or not _EXPLAINABLE.match(sql):
+            return
+        key = f"{name[len(STATEMENT_PREFIX):]}#{_shape(sql)}"
+        entry = self.statements.setdefault(key, {"statement": name, "sql": sql, "calls": 0})
+        entry["calls"] += 1
+
+    def __enter__(self):
+        add_statement_listener(self)
+        return self
+
+    def __exit__(self, *exc):
+        remove_statement_listener(self)
+        return False
+
+
+# ═══════════════════════════════════════════════════════════════════
+# EXPLAIN E NORMALIZAÇÃO
+# ═══════════════════════════════════════════════════════════════════
+
+def _walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def normalize(node: dict) -> dict:
+    """Árvore do plano só com a forma (tipo de nó, relação, índice, join) — sem custos."""
+    out = {"node": node["Node Type"]}
+    for src, dst in (("Relation Name", "relation"), ("Index Name", "index"),
+                     ("Join Type", "join"), ("Strategy", "strategy")):
+        if src in node:
+            out[dst] = node[src]
+    children = [normalize(c) for c in node.get("Plans", [])]
+    if children:
+        out["children"] = children
+    return out
+
+
+def summarize_plan(explain: dict) -> dict:
+    root = explain["Plan"]
+    nodes = list(_walk(root))
+    misestimate = 1.0
+    for n in nodes:
+        if not n.get("Actual Loops"):
+            continue
+        est, act = max(n.get("Plan Rows", 0), 1), max(n.get("Actual Rows", 0), 1)
+        if max(est, act) >= ESTIMATE_MIN_ROWS:
+            misestimate = max(misestimate, act / est, est / act)
+    return {
+        "execution_ms": explain.get("Execution Time"),
+        "planning_ms": explain.get("Planning Time"),
+        "shared_hit": root.get("Shared Hit Blocks", 0),
+        "shared_read": root.get("Shared Read Blocks", 0),
+        "seq_scans": sorted({n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"}),
+        "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+        "partitions": len({n["Relation Name"] for n in nodes
+                           if PARTITION_RELATION.match(n.get("Relation Name", ""))}),
+        "misestimate": round(misestimate, 1),
+        "plan": normalize(root),
+    }
+
+
+def _explain(conn, entry: dict) -> dict:
+    """EXPLAIN ANALYZE de um statement, sempre com ROLLBACK (escritas não ficam)."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + entry["sql"])
+            explain = cur.fetchone()[0][0]
+        return dict(summarize_plan(explain), statement=entry["statement"],
+                    calls=entry["calls"], sql=entry["sql"])
+    except Exception as e:
+        return {"statement": entry["statement"], "sql": entry["sql"], "error": str(e)}
+    finally:
+        conn.rollback()
+
+
+def collect_plans(cases: list, ctx, url: str) -> dict:
+    """
+    Executa cada caso uma vez e explica os statements que ele emitiu numa
+    conexão própria — depois do setup e antes do cleanup, para que escritas
+    ainda encontrem as linhas (e FKs) que o caso criou.
+    """
+    conn = psycopg2.connect(url)
+    results = {}
+    try:
+        for bench_case in cases:
+            cleanup = None
+            with StatementCapture() as capture:
+                try:
+                    args = bench_case.setup(ctx) if bench_case.setup else ()
+                    cleanup = bench_case.fn(ctx, *args)
+                except Exception as e:
+                    logger.error(f"{bench_case.name}: {e}")
+            try:
+                for key, entry in sorted(capture.statements.items()):
+                    if key in results:
+                        results[key]["calls"] = results[key].get("calls", 0) + entry["calls"]
+                    else:
+                        results[key] = _explain(conn, entry)
+            finally:
+                if callable(cleanup):
+                    cleanup()
+    finally:
+        conn.close()
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════
+# VERIFICAÇÕES
+# ═══════════════════════════════════════════════════════════════════
+
+def _watched_scans(seq_scans) -> dict:
+    """Relação vigiada → relações lidas por seq scan (partições contam como transactions)."""
+    found = {}
+    for rel in seq_scans:
+        parent = "transactions" if PARTITION_RELATION.match(rel) else rel
+        if parent in WATCHED_RELATIONS:
+            found.setdefault(parent, []).append(rel)
+    return found
+
+
+def _scan_label(rel: str, scanned: list) -> str:
+    return rel if scanned == [rel] else f"{rel} ({', '.join(scanned)})"
+
+
+def plan_issues(plans: dict) -> list:
+    """Problemas absolutos: seq scan em tabelas vigiadas, estimativas muito erradas, erros."""
+    issues = []
+    for key, p in plans.items():
+        if "error" in p:
+            issues.append((key, f"erro no EXPLAIN: {p['error']}"))
+            continue
+        for rel, scanned in sorted(_watched_scans(p["seq_scans"]).items()):
+            issues.append((key, f"seq scan em {_scan_label(rel, scanned)}"))
+        if p["misestimate"] >= ESTIMATE_BLOWUP:
+            issues.append((key, f"estimativa de linhas errada ×{p['misestimate']:g}"))
+    return issues
+
+
+def compare_plans(current: dict, baseline: dict) -> tuple:
+    """(regressões, mudanças): novo seq scan vigiado, índice perdido, estimativa degradada; forma alterada."""
+    regressions, changes = [], []
+    for key, cur in current.items():
+        base = baseline.get(key)
+        if not base or "error" in base or "error" in cur:
+            continue
+        cur_scans, base_scans = _watched_scans(cur["seq_scans"]), _watched_scans(base["seq_scans"])
+        for rel in sorted(set(cur_scans) - set(base_scans)):
+            regressions.append((key, f"novo seq scan em {_scan_label(rel, cur_scans[rel])}"))
+        if cur.get("partitions", 0) > base.get("partitions", cur.get("partitions", 0)):
+            regressions.append((key, f"poda de partições: {base['partitions']} → {cur['partitions']} lidas"))
+        for index in sorted(set(base["indexes"]) - set(cur["indexes"])):
+            regressions.append((key, f"deixou de usar o índice {index}"))
+        if cur["misestimate"] >= ESTIMATE_BLOWUP and cur["misestimate"] > base["misestimate"] * 10:
+            regressions.append((key, f"estimativa ×{base['misestimate']:g} → ×{cur['misestimate']:g}"))
+        if cur["plan"] != base["plan"]:
+            changes.append((key, "plano mudou"))
+    for key in sorted(set(baseline) - set(current)):
+        changes.append((key, "statement não executado nesta rodada"))
+    return regressions, changes
+
+
+def report(plans_by_scenario: dict, baseline: dict = None, fail_on_issues: bool = False) -> bool:
+    """Loga problemas e regressões; retorna True se a verificação falhou."""
+    failed = False
+    for scenario, plans in plans_by_scenario.items():
+        issues = plan_issues(plans)
+        for key, reason in issues:
+            (logger.error if fail_on_issues else logger.warning)(f"PLANO [{scenario}] {key}: {reason}")
+        failed |= fail_on_issues and bool(issues)
+        # Statement sem plano escapa da comparação com o baseline: sempre falha
+        errors = [key for key, p in plans.items() if "error" in p]
+        if errors:
+            logger.error(f"PLANO [{scenario}] {len(errors)} statement(s) sem plano (EXPLAIN falhou)")
+        failed |= bool(errors)
+        if baseline is not None:
+            regressions, changes = compare_plans(plans, baseline.get(scenario, {}))
+            for key, reason in changes:
+                logger.info(f"PLANO [{scenario}] {key}: {reason}")
+            for key, reason in regressions:
+                logger.error(f"REGRESSÃO DE PLANO [{scenario}] {key}: {reason}")
+            failed |= bool(regressions)
+    return failed
+
+
+def main(argv=None):
+    from bench.cases import CASES, Context
+
+    parser = argparse.ArgumentParser(description="Captura e verificação de planos de execução")
+    parser.add_argument("--url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="URL do banco de benchmark (padrão: BENCH_DATABASE_URL)")
+    parser.add_argument("--scenario", default="current", help="rótulo do cenário no JSON")
+    parser.add_argument("-k", dest="filter", help="só casos cujo nome contém este texto")
+    parser.add_argument("--out", help="arquivo JSON com os planos normalizados")
+    parser.add_argument("--baseline", help="JSON de planos anterior para comparação")
+    parser.add_argument("--fail-on-issues", action="store_true",
+                        help="falha também com problemas absolutos (seq scan em transactions etc.)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.url:
+        parser.error("informe --url ou BENCH_DATABASE_URL")
+    from database.connection import set_db_url
+    set_db_url(args.url)
+
+    cases = [c for c in CASES.values() if not args.filter or args.filter in c.name]
+    plans = {args.scenario: collect_plans(cases, Context(), args.url)}
+    logger.info(f"{len(plans[args.scenario])} statements explicados")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"timestamp": datetime.now().isoformat(timespec="seconds")},
+                       "plans": plans}, f, indent=2, ensure_ascii=False)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["plans"]
+    if report(plans, baseline, args.fail_on_issues):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
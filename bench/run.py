@@ -0,0 +1,195 @@
+"""
+bench/run.py
+Executa os casos de bench/cases.py contra massas de tamanho crescente,
+grava os resultados em JSON e compara com um baseline:
+
+    python -m bench.run --url postgresql://localhost/bk_bench --scenario 10k 100k \\
+        --out bench/results/atual.json --baseline bench/results/baseline.json
+
+Sai com código 1 se algum caso ficar mais lento que o limite ou passar a
+executar mais queries que no baseline (e, com --plans-baseline, se algum
+plano de execução regredir — ver bench/plans.py).
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+
+from database.instrumentation import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+# Diferenças absolutas abaixo disso são ruído, qualquer que seja o percentual
+NOISE_FLOOR_SECONDS = 0.005
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return ""
+
+
+def run_case(bench_case, ctx, repeat: int, warmup: int) -> dict:
+    """Mede `repeat` execuções (após `warmup`) — tempo de parede e queries por execução."""
+    times, recorder = [], None
+    for i in range(warmup + repeat):
+        args = bench_case.setup(ctx) if bench_case.setup else ()
+        with QueryRecorder() as rec:
+            started = time.perf_counter()
+            cleanup = bench_case.fn(ctx, *args)
+            elapsed = time.perf_counter() - started
+        if callable(cleanup):
+            cleanup()
+        if i >= warmup:
+            times.append(elapsed)
+            recorder = rec
+    return {
+        "group": bench_case.group,
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "queries": recorder.count,
+        "db_time_s": recorder.total_time,
+    }
+
+
+def run_scenario(cases: list, repeat: int, warmup: int, plans_url: str = None) -> tuple:
+    """Resultados dos casos e, com `plans_url`, os planos de execução dos statements."""
+    from bench.cases import Context
+    ctx = Context()
+    results = {}
+    for bench_case in cases:
+        try:
+            results[bench_case.name] = run_case(bench_case, ctx, repeat, warmup)
+        except Exception as e:
+            logger.error(f"{bench_case.name}: {e}")
+            results[bench_case.name] = {"group": bench_case.group, "error": str(e)}
+            continue
+        r = results[bench_case.name]
+        logger.info(f"  {bench_case.name:<40} {r['median_s'] * 1000:9.1f} ms  {r['queries']:5d} queries")
+    plans = None
+    if plans_url:
+        from bench.plans import collect_plans
+        plans = collect_plans(cases, ctx, plans_url)
+    return results, plans
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Regressões: (cenário, caso, motivo) — tempo acima do limite ou mais queries."""
+    regressions = []
+    for scenario, cases in current.get("results", {}).items():
+        base_cases = baseline.get("results", {}).get(scenario, {})
+        for name, r in cases.items():
+            b = base_cases.get(name)
+            if not b or "error" in b:
+                continue
+            if "error" in r:
+                regressions.append((scenario, name, f"erro: {r['error']}"))
+                continue
+            slower = r["median_s"] - b["median_s"]
+            if slower > NOISE_FLOOR_SECONDS and r["median_s"] > b["median_s"] * (1 + threshold):
+                regressions.append((scenario, name, f"{b['median_s'] * 1000:.1f} → {r['median_s'] * 1000:.1f} ms "
+                                                    f"(+{r['median_s'] / b['median_s'] - 1:.0%})"))
+            if r["queries"] > b["queries"]:
+                regressions.append((scenario, name, f"queries {b['queries']} → {r['queries']}"))
+    return regressions
+
+
+def main(argv=None):
+    from bench.cases import CASES
+    from bench.seed import SCENARIOS, seed
+
+    parser = argparse.ArgumentParser(description="Benchmarks da camada de queries e construtores de página")
+    parser.add_argument("--url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="URL do banco de benchmark (padrão: BENCH_DATABASE_URL)")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS),
+                        help="semeia (com --reset) e mede cada cenário; sem isso mede o banco como está")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--group", nargs="+", choices=["queries", "writes", "pages"])
+    parser.add_argument("-k", dest="filter", help="só casos cujo nome contém este texto")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--out", help="arquivo JSON de resultados")
+    parser.add_argument("--baseline", help="JSON anterior para comparação")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="regressão de tempo tolerada sobre o baseline (0.25 = 25%%)")
+    parser.add_argument("--plans", help="captura os planos (EXPLAIN ANALYZE) neste JSON")
+    parser.add_argument("--plans-baseline", help="JSON de planos anterior para comparação")
+    parser.add_argument("--fail-on-plan-issues", action="store_true",
+                        help="falha com seq scan em transactions ou estimativas muito erradas")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.url:
+        parser.error("informe --url ou BENCH_DATABASE_URL")
+    from database.connection import set_db_url
+    set_db_url(args.url)
+
+    cases = [c for c in CASES.values()
+             if (not args.group or c.group in args.group) and (not args.filter or args.filter in c.name)]
+    output = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "years": args.years,
+        },
+        "results": {},
+    }
+    plans = {}
+    for scenario in args.scenario or ["current"]:
+        if scenario != "current":
+            logger.info(f"Semeando cenário {scenario}…")
+            seed(SCENARIOS[scenario], args.years, args.seed, reset=True)
+        logger.info(f"Cenário {scenario}: {len(cases)} casos")
+        results, scenario_plans = run_scenario(cases, args.repeat, args.warmup,
+                                               plans_url=args.url if args.plans else None)
+        output["results"][scenario] = results
+        if scenario_plans is not None:
+            plans[scenario] = scenario_plans
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+        logger.info(f"Resultados gravados em {args.out}")
+
+    failed = False
+    if args.plans:
+        from bench.plans import report
+        os.makedirs(os.path.dirname(os.path.abspath(args.plans)), exist_ok=True)
+        with open(args.plans, "w", encoding="utf-8") as f:
+            json.dump({"meta": output["meta"], "plans": plans}, f, indent=2, ensure_ascii=False)
+        plans_baseline = None
+        if args.plans_baseline:
+            with open(args.plans_baseline, encoding="utf-8") as f:
+                plans_baseline = json.load(f)["plans"]
+        failed |= report(plans, plans_baseline, args.fail_on_plan_issues)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(output, baseline, args.threshold)
+        for scenario, name, reason in regressions:
+            logger.error(f"REGRESSÃO [{scenario}] {name}: {reason}")
+        if not regressions:
+            logger.info("Sem regressões em relação ao baseline")
+        failed |= bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+bench/seed.py
+Gerador de massa de dados sintética (determinística) para benchmarks —
+carga em lote via COPY:
+
+    python -m bench.seed --scenario 100k [--years 5] [--seed 42] [--reset]
+    python -m bench.seed --transactions 250000 --suppliers 2000 --url postgresql://...
+"""
+
+import io
+import os
+import time
+import uuid
+import logging
+import argparse
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Volumes por cenário (transações; demais tabelas escalam junto)
+SCENARIOS = {
+    "10k":  dict(transactions=10_000,    suppliers=200,    categories=12, subcategories=6, banks=4,
+                 activities=200,   goals=10),
+    "100k": dict(transactions=100_000,   suppliers=2_000,  categories=20, subcategories=8, banks=8,
+                 activities=2_000, goals=30),
+    "1m":   dict(transactions=1_000_000, suppliers=10_000, categories=30, subcategories=10, banks=12,
+                 activities=10_000, goals=50),
+}
+
+# Fração das transações que pertence a séries recorrentes mensais
+RECURRENT_SHARE = 0.3
+COPY_CHUNK_ROWS = 100_000
+
+# Ordem de carga (pais antes de filhos) — também usada no --reset
+TABLES = ["suppliers", "categories", "subcategories", "banks", "transactions",
+          "budget", "goals", "activities", "action_plan"]
+
+_PRIORITIES = ['Urgente-Urgente', 'Importante-Urgente', 'Importante não Urgente', 'Não importante-Não urgente']
+_ACTIVITY_STATUS = ['Não iniciado', 'Em andamento', 'Concluído']
+_PLAN_STATUS = ['Pendente', 'Em andamento', 'Concluído', 'Cancelado']
+
+
+# ═══════════════════════════════════════════════════════════════════
+# GERAÇÃO (puro numpy/pandas — sem banco)
+# ═══════════════════════════════════════════════════════════════════
+
+class Generator:
+    """Gera os frames de cada tabela com ids explícitos a partir de `id_base`."""
+
+    def __init__(self, counts: dict, years: int, seed: int, id_base: dict = None, today: date = None):
+        self.counts = counts
+        self.years = years
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.id_base = id_base or {}
+        self.today = np.datetime64(today or date.today(), 'D')
+
+    def _ids(self, table: str, n: int) -> np.ndarray:
+        start = self.id_base.get(table, 0) + 1
+        return np.arange(start, start + n, dtype=np.int64)
+
+    def _money(self, n: int, low: float, high: float) -> np.ndarray:
+        """Valores log-uniformes em reais com 2 casas (muitos pequenos, poucos grandes)."""
+        cents = np.exp(self.rng.uniform(np.log(low * 100), np.log(high * 100), n))
+        return np.round(cents).astype(np.int64) / 100
+
+    def suppliers(self) -> pd.DataFrame:
+        n = self.counts['suppliers']
+        ids = self._ids('suppliers', n)
+        return pd.DataFrame({
+            'id': ids,
+            'name': [f"Fornecedor {i:06d}" for i in ids],
+            'document': [f"{i:014d}" for i in self.rng.integers(10**12, 10**14, n)],
+            'email': [f"contato{i}@fornecedor.com.br" for i in ids],
+            'phone': [f"(11) 9{i:08d}" for i in self.rng.integers(0, 10**8, n)],
+        })
+
+    def categories(self) -> pd.DataFrame:
+        n = self.counts['categories']
+        ids = self._ids('categories', n)
+        # ~1/3 entradas, resto saídas
+        flow = np.where(np.arange(n) % 3 == 0, 'Entrada', 'Saída')
+        return pd.DataFrame({'id': ids, 'flow_type': flow,
+                             'name': [f"Categoria {i:04d}" for i in ids]})
+
+    def subcategories(self, categories: pd.DataFrame) -> pd.DataFrame:
+        per = self.counts['subcategories']
+        cat_ids = np.repeat(categories['id'].to_numpy(), per)
+        ids = self._ids('subcategories', len(cat_ids))
+        return pd.DataFrame({'id': ids, 'category_id': cat_ids,
+                             'name': [f"Subcategoria {i:05d}" for i in ids]})
+
+    def banks(self) -> pd.DataFrame:
+        n = self.counts['banks']
+        ids = self._ids('banks', n)
+        balance = self._money(n, 1_000, 500_000)
+        return pd.DataFrame({
+            'id': ids, 'name': [f"Banco {i:03d}" for i in ids],
+            'account': [f"{i:08d}-{i % 10}" for i in self.rng.integers(0, 10**8, n)],
+            'agency': [f"{i:04d}" for i in self.rng.integers(0, 10**4, n)],
+            'initial_balance': balance, 'current_balance': balance,
+        })
+
+    def transactions(self, subcategories: pd.DataFrame, categories: pd.DataFrame,
+                     suppliers: pd.DataFrame, banks: pd.DataFrame) -> pd.DataFrame:
+        """
+        Transações espalhadas por `years` anos até 12 meses à frente: séries
+        mensais recorrentes (mesmo recurrence_group_id) + lançamentos avulsos.
+        """
+        n = self.counts['transactions']
+        rng = self.rng
+        start = self.today - np.timedelta64(365 * self.years, 'D')
+        span_days = 365 * (self.years + 1)
+        months_total = 12 * (self.years + 1)
+
+        # Séries recorrentes: comprimentos aleatórios até cobrir a fatia recorrente
+        n_rec = int(n * RECURRENT_SHARE)
+        lengths = rng.integers(6, months_total + 1, max(n_rec // 12, 1))
+        lengths = lengths[np.cumsum(lengths) <= n_rec]
+        n_rec = int(lengths.sum())
+        n_series = len(lengths)
+        series_idx = np.repeat(np.arange(n_series), lengths)
+        offset = np.arange(n_rec) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        first_month = rng.integers(0, np.maximum(months_total - lengths + 1, 1))
+        series_day = rng.integers(1, 29, n_series)
+        month0 = start.astype('datetime64[M]')
+        rec_due = ((month0 + (first_month[series_idx] + offset).astype('timedelta64[M]')).astype('datetime64[D]')
+                   + (series_day[series_idx] - 1).astype('timedelta64[D]'))
+        n_one = n - n_rec
+        one_due = start + rng.integers(0, span_days, n_one).astype('timedelta64[D]')
+
+        # Atributos por série (recorrentes) ou por linha (avulsos)
+        sub = subcategories.merge(categories[['id', 'flow_type']], left_on='category_id',
+                                  right_on='id', suffixes=('', '_cat'))
+        sub_pick_series = rng.integers(0, len(sub), n_series)[series_idx]
+        sub_pick = np.concatenate([sub_pick_series, rng.integers(0, len(sub), n_one)])
+        value_series = self._money(n_series, 50, 20_000)[series_idx]
+        value = np.concatenate([value_series, self._money(n_one, 10, 50_000)])
+        raw = rng.bytes(16 * n_series)
+        group_ids = np.array([str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, len(raw), 16)],
+                             dtype=object)
+
+        due = np.concatenate([rec_due, one_due])
+        past = due < self.today
+        paid = past & (rng.random(n) < 0.9)
+        payment = np.where(paid, due + rng.integers(-3, 6, n).astype('timedelta64[D]'),
+                           np.datetime64('NaT'))
+        interest = np.where(paid & (rng.random(n) < 0.05), np.round(value * 0.02, 2), 0.0)
+        is_rec = np.arange(n) < n_rec
+
+        df = pd.DataFrame({
+            'id': self._ids('transactions', n),
+            'flow_type': sub['flow_type'].to_numpy()[sub_pick],
+            'category_id': sub['category_id'].to_numpy()[sub_pick],
+            'subcategory_id': sub['id'].to_numpy()[sub_pick],
+            'supplier_id': suppliers['id'].to_numpy()[rng.integers(0, len(suppliers), n)],
+            'bank_id': banks['id'].to_numpy()[rng.integers(0, len(banks), n)],
+            'description': np.where(is_rec, 'Lançamento recorrente', 'Lançamento avulso'),
+            'value': value,
+            'interest': interest,
+            'due_date': due,
+            'payment_date': payment,
+            'status': np.where(paid, 'Pago', 'Não pago'),
+            'is_recurrent': is_rec,
+            'recurrence_type': 'Mensal',
+            'recurrence_group_id': np.concatenate([group_ids[series_idx], np.full(n_one, None, dtype=object)]),
+            # Realizado = parte dos lançamentos já pagos
+            'is_forecast': ~(paid & (rng.random(n) < 0.5)),
+        })
+        return df.sort_values('due_date', kind='stable').reset_index(drop=True)
+
+    def budget(self, subcategories: pd.DataFrame) -> pd.DataFrame:
+        """Orçamento mensal por subcategoria nos últimos 12 meses + 12 à frente."""
+        months = (self.today.astype('datetime64[M]') + np.arange(-12, 12)).astype('datetime64[D]')
+        sub = subcategories[['id', 'category_id']].rename(columns={'id': 'subcategory_id'})
+        df = sub.merge(pd.DataFrame({'year_month': months}), how='cross')
+        df['planned_value'] = self._money(len(df), 100, 30_000)
+        df.insert(0, 'id', self._ids('budget', len(df)))
+        return df[['id', 'category_id', 'subcategory_id', 'year_month', 'planned_value']]
+
+    def goals(self) -> pd.DataFrame:
+        n = self.counts['goals']
+        ids = self._ids('goals', n)
+        target = self._money(n, 5_000, 1_000_000)
+        return pd.DataFrame({
+            'id': ids, 'title': [f"Meta {i:04d}" for i in ids],
+            'specific': 'Meta sintética', 'measurable': 'Valor acumulado',
+            'time_bound': self.today + self.rng.integers(30, 365 * 3, n).astype('timedelta64[D]'),
+            'target_value': target,
+            'current_value': np.round(target * self.rng.random(n), 2),
+            'status': 'Em andamento',
+        })
+
+    def activities(self) -> pd.DataFrame:
+        """Hierarquia: ~20% raízes, demais filhas de um nó anterior (até ~4 níveis)."""
+        n = self.counts['activities']
+        rng = self.rng
+        ids = self._ids('activities', n)
+        is_root = (np.arange(n) == 0) | (rng.random(n) < 0.2)
+        # pai sempre é um id anterior, preferindo os próximos (árvores rasas e largas)
+        back = np.minimum(rng.geometric(0.3, n), np.arange(n))
+        parent = np.where(is_root | (back == 0), -1, ids - back)
+        start = self.today + rng.integers(-365, 180, n).astype('timedelta64[D]')
+        end = start + rng.integers(1, 90, n).astype('timedelta64[D]')
+        return pd.DataFrame({
+            'id': ids,
+            'parent_id': pd.array(np.where(parent < 0, None, parent), dtype='Int64'),
+            'title': [f"Atividade {i:06d}" for i in ids],
+            'start_date': start, 'end_date': end,
+            'priority': np.array(_PRIORITIES)[rng.integers(0, 4, n)],
+            'status': np.array(_ACTIVITY_STATUS)[rng.integers(0, 3, n)],
+            'order_index': np.arange(n) % 50,
+        })
+
+    def action_plan(self, activities: pd.DataFrame) -> pd.DataFrame:
+        """Até 3 itens 5W2H para metade das atividades."""
+        rng = self.rng
+        owners = activities['id'].to_numpy()[rng.random(len(activities)) < 0.5]
+        act = np.repeat(owners, rng.integers(1, 4, len(owners)))
+        n = len(act)
+        return pd.DataFrame({
+            'id': self._ids('action_plan', n), 'activity_id': act,
+            'what': 'Ação sintética', 'why': 'Benchmark', 'who': 'Equipe',
+            'when_date': self.today + rng.integers(-180, 180, n).astype('timedelta64[D]'),
+            'where_place': 'Escritório', 'how': 'Conforme plano',
+            'how_much': self._money(n, 100, 50_000),
+            'status': np.array(_PLAN_STATUS)[rng.integers(0, 4, n)],
+        })
+
+    def generate(self):
+        """Gera todas as tabelas, na ordem de carga, como (tabela, frame)."""
+        suppliers = self.suppliers()
+        categories = self.categories()
+        subcategories = self.subcategories(categories)
+        banks = self.banks()
+        yield "suppliers", suppliers
+        yield "categories", categories
+        yield "subcategories", subcategories
+        yield "banks", banks
+        yield "transactions", self.transactions(subcategories, categories, suppliers, banks)
+        yield "budget", self.budget(subcategories)
+        yield "goals", self.goals()
+        activities = self.activities()
+        yield "activities", activities
+        yield "action_plan", self.action_plan(activities)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CARGA
+# ═══════════════════════════════════════════════════════════════════
+
+def copy_frame(cur, table: str, df: pd.DataFrame, chunk_rows: int = COPY_CHUNK_ROWS):
+    """COPY ... FROM STDIN em blocos (CSV; vazio = NULL)."""
+    columns = ", ".join(df.columns)
+    for i in range(0, len(df), chunk_rows):
+        buf = io.StringIO()
+        df.iloc[i:i + chunk_rows].to_csv(buf, index=False, header=False, date_format='%Y-%m-%d')
+        buf.seek(0)
+        cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def current_max_ids(cur) -> dict:
+    out = {}
+    for table in TABLES:
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) AS max_id FROM {table}")
+        out[table] = cur.fetchone()['max_id']
+    return out
+
+
+def seed(counts: dict, years: int, seed_value: int, reset: bool = False) -> dict:
+    """Cria as tabelas, gera e carrega a massa. Retorna {tabela: linhas}."""
+    from database.connection import db_cursor
+    from database.migrations import run_migrations
+    from database.queries import reconcile_bank_balances, take_balance_snapshots
+
+    run_migrations()
+    loaded = {}
+    with db_cursor() as cur:
+        if reset:
+            cur.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        gen = Generator(counts, years, seed_value, id_base=current_max_ids(cur))
+        # Partições anuais para todo o período gerado antes da carga (nada cai na default)
+        cur.execute("SELECT ensure_transactions_partitions(%s::integer[])",
+                    (list(range(date.today().year - years - 1, date.today().year + 2)),))
+        # Carga em massa sem o trigger de saldo por linha; o saldo é reconciliado no fim
+        cur.execute("ALTER TABLE transactions DISABLE TRIGGER trg_transactions_bank_balance")
+        for table, df in gen.generate():
+            t0 = time.perf_counter()
+            copy_frame(cur, table, df)
+            # ids explícitos: avança a sequence do SERIAL
+            cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f"(SELECT GREATEST(MAX(id), 1) FROM {table}))")
+            loaded[table] = len(df)
+            logger.info(f"{table}: {len(df):,} linhas em {time.perf_counter() - t0:.1f}s")
+        cur.execute("ALTER TABLE transactions ENABLE TRIGGER trg_transactions_bank_balance")
+        cur.execute(f"ANALYZE {', '.join(TABLES)}")
+    reconcile_bank_balances()
+    # Como em produção: snapshots diários até ontem (reset já os descartou via TRUNCATE ... CASCADE)
+    loaded["balance_snapshots"] = take_balance_snapshots()
+    return loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Massa de dados sintética para benchmarks BK Finance")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="10k")
+    for key in SCENARIOS["10k"]:
+        parser.add_argument(f"--{key}", type=int, help=f"sobrescreve a quantidade de {key} do cenário")
+    parser.add_argument("--years", type=int, default=5, help="anos de histórico (+12 meses de previsão)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="TRUNCATE das tabelas antes da carga")
+    parser.add_argument("--url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="URL do banco de benchmark (padrão: BENCH_DATABASE_URL)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Sem fallback para secrets.toml/URL embutida: nunca semear o banco de produção por engano
+    if not args.url:
+        parser.error("informe --url ou BENCH_DATABASE_URL")
+    from database.connection import set_db_url
+    set_db_url(args.url)
+    counts = dict(SCENARIOS[args.scenario])
+    counts.update({k: getattr(args, k) for k in counts if getattr(args, k) is not None})
+
+    t0 = time.perf_counter()
+    loaded = seed(counts, args.years, args.seed, reset=args.reset)
+    logger.info(f"Total: {sum(loaded.values()):,} linhas em {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
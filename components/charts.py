@@ -3,10 +3,100 @@ components/charts.py
 Biblioteca de gráficos Plotly com tema dark — BK Finance
 """
 
+import json
+import hashlib
+import threading
+import functools
+from collections import OrderedDict
+
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
 import pandas as pd
 from utils.helpers import CHART_COLORS
+from utils.tracing import traced
+from utils.downsample import DEFAULT_MAX_POINTS, lttb_series
+from utils import metrics
+
+# Figuras serializadas mantidas em memória (LRU, por processo)
+MAX_CACHED_FIGURES = 128
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CACHE DE FIGURAS
+# ═══════════════════════════════════════════════════════════════════
+
+class _FigureCache:
+    """LRU de JSON de figuras, chaveado por (gráfico, impressão digital dos argumentos)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            spec = self.entries.get(key)
+            if spec is not None:
+                self.entries.move_to_end(key)
+            return spec
+
+    def put(self, key, spec: str):
+        with self.lock:
+            self.entries[key] = spec
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_figure_cache = _FigureCache(MAX_CACHED_FIGURES)
+
+
+def _fingerprint(value) -> str:
+    """Hash rápido (vetorizado) de DataFrames; demais argumentos entram pelo repr."""
+    if isinstance(value, pd.DataFrame):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((list(value.columns), [str(t) for t in value.dtypes])).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        return digest.hexdigest()
+    return repr(value)
+
+
+def cached_figure(fn):
+    """
+    Memoiza o JSON da figura: dados e parâmetros iguais pulam a montagem do
+    gráfico (a parte cara) e a serialização. O acerto devolve uma figura nova
+    montada do JSON sem revalidação — quem chama pode alterá-la à vontade.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            key = (fn.__name__, tuple(_fingerprint(a) for a in args),
+                   tuple(sorted((k, _fingerprint(v)) for k, v in kwargs.items())))
+        except TypeError:  # coluna com valores não hasheáveis: monta sem cache
+            return fn(*args, **kwargs)
+        spec = _figure_cache.get(key)
+        metrics.cache_hit("charts", spec is not None)
+        if spec is None:
+            fig = fn(*args, **kwargs)
+            _figure_cache.put(key, pio.to_json(fig, validate=False))
+            return fig
+        # _validate=False: o JSON saiu de uma figura já validada
+        return go.Figure(json.loads(spec), _validate=False)
+    return wrapper
+
+
+def clear_figure_cache():
+    _figure_cache.clear()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# GRÁFICOS
+# ═══════════════════════════════════════════════════════════════════
 
 
 def _base_layout(**extra) -> dict:
@@ -38,6 +128,8 @@ def _base_layout(**extra) -> dict:
     return layout
 
 
+@traced("chart.cashflow_bar_line")
+@cached_figure
 def cashflow_bar_line(df: pd.DataFrame) -> go.Figure:
     """
     Gráfico de barras + linha para o fluxo de caixa.
@@ -126,6 +218,50 @@ def cashflow_bar_line(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
+@traced("chart.cashflow_timeseries")
+@cached_figure
+def cashflow_timeseries(df: pd.DataFrame, title: str = "Fluxo de Caixa Diário",
+                        max_points: int = DEFAULT_MAX_POINTS) -> go.Figure:
+    """
+    Entradas, saídas e saldo corrente por dia/semana (colunas period, income,
+    expense, balance). Scattergl (WebGL) e LTTB por série, limitado a
+    `max_points` pontos — anos de dados diários sem perder os picos.
+    """
+    if df.empty:
+        return _empty_figure("Sem dados de fluxo de caixa")
+
+    fig = go.Figure()
+    for col, label, color, sign, yaxis in [
+        ('income', 'Entradas', CHART_COLORS["income"], 1, "y1"),
+        ('expense', 'Saídas', CHART_COLORS["expense"], -1, "y1"),
+        ('balance', 'Saldo', CHART_COLORS["primary"], 1, "y2"),
+    ]:
+        x, y = lttb_series(df['period'], df[col].to_numpy() * sign, max_points)
+        fig.add_trace(go.Scattergl(
+            name=label,
+            x=x,
+            y=y,
+            mode="lines",
+            line=dict(color=color, width=3 if col == 'balance' else 1),
+            fill=None if col == 'balance' else "tozeroy",
+            hovertemplate=f"<b>%{{x|%d/%m/%Y}}</b><br>{label}: R$ %{{y:,.2f}}<extra></extra>",
+            yaxis=yaxis,
+        ))
+
+    fig.update_layout(**_base_layout(
+        title=dict(text=title, font=dict(size=15, color="#93C5FD")),
+        hovermode="x unified",
+        yaxis=dict(title="Entradas / Saídas (R$)", gridcolor="#1E293B", linecolor="#334155",
+                   tickfont=dict(color="#94A3B8"), tickprefix="R$ "),
+        yaxis2=dict(title="Saldo (R$)", overlaying="y", side="right", showgrid=False,
+                    tickfont=dict(color=CHART_COLORS["primary"]), tickprefix="R$ ",
+                    color=CHART_COLORS["primary"]),
+    ))
+    return fig
+
+
+@traced("chart.income_expense_bar")
+@cached_figure
 def income_expense_bar(df: pd.DataFrame, title: str = "Entradas x Saídas") -> go.Figure:
     """Barras agrupadas para previsto/realizado por mês."""
     if df.empty:
@@ -152,6 +288,8 @@ def income_expense_bar(df: pd.DataFrame, title: str = "Entradas x Saídas") -> g
     return fig
 
 
+@traced("chart.pie_by_category")
+@cached_figure
 def pie_by_category(df: pd.DataFrame, title: str = "Gastos por Categoria") -> go.Figure:
     """Pizza de distribuição por categoria."""
     if df.empty or 'category' not in df.columns:
@@ -181,6 +319,8 @@ def pie_by_category(df: pd.DataFrame, title: str = "Gastos por Categoria") -> go
     return fig
 
 
+@traced("chart.budget_bar_comparison")
+@cached_figure
 def budget_bar_comparison(df: pd.DataFrame) -> go.Figure:
     """Barras comparando orçado x realizado por categoria."""
     if df.empty:
@@ -208,6 +348,8 @@ def budget_bar_comparison(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
+@traced("chart.gauge_goal")
+@cached_figure
 def gauge_goal(current: float, target: float, title: str) -> go.Figure:
     """Gauge para progresso de meta."""
     pct = min(current / target * 100, 100) if target > 0 else 0
@@ -0,0 +1,143 @@
+"""
+components/grids.py
+Apresentação dos grids grandes — só as colunas exibidas, tipos numéricos
+reduzidos e linhas paginadas antes de virar Arrow para o navegador, com o
+tamanho do payload medido por grid (bk_grid_payload_bytes)
+"""
+
+import math
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+
+from utils import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+# Linhas por página — acima disso o grid ganha um seletor de página
+GRID_PAGE_SIZE = 500
+
+# float32 só abaixo de 2**17: meio ulp fica < 0,005 e o centavo exibido não muda.
+# Vale só para grids de leitura — o valor digitado num editor volta como float32
+# (150000.01 → 150000.015625) e seria gravado errado
+_FLOAT32_LIMIT = 2 ** 17
+
+_INT_TYPES = (pa.int8(), pa.int16(), pa.int32())
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PREPARO DA TABELA
+# ═══════════════════════════════════════════════════════════════════
+
+def _to_table(data) -> pa.Table:
+    if isinstance(data, pa.Table):
+        return data
+    # `category` vira dictionary no Arrow; os grids editáveis precisam de texto simples
+    data = data.astype({c: object for c in data.columns if isinstance(data[c].dtype, pd.CategoricalDtype)})
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+def _downcast(column: pa.ChunkedArray, floats: bool = True) -> pa.ChunkedArray:
+    """
+    Menor inteiro que comporta a coluna; com `floats`, float64 → float32
+    quando a precisão de centavo da exibição se mantém.
+    """
+    if column.null_count == len(column):
+        return column
+    if pa.types.is_integer(column.type) and column.type.bit_width > 8:
+        bounds = pc.min_max(column)
+        low, high = bounds["min"].as_py(), bounds["max"].as_py()
+        for target in _INT_TYPES:
+            info = np.iinfo(target.to_pandas_dtype())
+            if target.bit_width >= column.type.bit_width:
+                break
+            if info.min <= low and high <= info.max:
+                return column.cast(target)
+    elif floats and pa.types.is_float64(column.type):
+        top = pc.max(pc.abs(column)).as_py()
+        if top is not None and top < _FLOAT32_LIMIT:
+            return column.cast(pa.float32())
+    return column
+
+
+def _encode_repeated(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Texto repetitivo (tipo, status, categoria) vira dictionary — cada valor viaja uma vez."""
+    if not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)) or len(column) < 2:
+        return column
+    if pc.count_distinct(column).as_py() * 2 > len(column):
+        return column
+    return pc.dictionary_encode(column)
+
+
+def present(data, columns: list = None, editable: bool = False) -> pa.Table:
+    """
+    pyarrow.Table enxuto para o grid: só `columns` (na ordem dada; as ausentes
+    são ignoradas) e inteiros reduzidos. Só nos grids de leitura os floats
+    viram float32 e o texto repetitivo vai como dictionary; editores mantêm
+    float64, que é o que volta para o banco.
+    """
+    table = _to_table(data)
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    for i, name in enumerate(table.column_names):
+        column = _downcast(table.column(i), floats=not editable)
+        if not editable:
+            column = _encode_repeated(column)
+        if column is not table.column(i):
+            table = table.set_column(i, name, column)
+    return table
+
+
+def payload_bytes(table: pa.Table) -> int:
+    """Tamanho do stream IPC do Arrow — o que o Streamlit envia pelo websocket."""
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.size()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# RENDERIZAÇÃO
+# ═══════════════════════════════════════════════════════════════════
+
+def _page(table: pa.Table, name: str, page_size: int) -> tuple:
+    """Fatia da página escolhida (seletor só quando há mais de uma) e o número da página."""
+    if table.num_rows <= page_size:
+        return table, 1
+    pages = math.ceil(table.num_rows / page_size)
+    col_page, col_info = st.columns([1, 3])
+    page = int(col_page.number_input("Página", min_value=1, max_value=pages, value=1, step=1,
+                                     key=f"grid_page_{name}"))
+    start = (page - 1) * page_size
+    end = min(start + page_size, table.num_rows)
+    col_info.caption(f"Linhas {start + 1:,}–{end:,} de {table.num_rows:,}".replace(",", "."))
+    return table.slice(start, end - start), page
+
+
+def render_grid(name: str, data, columns: list = None, editable: bool = False,
+                page_size: int = GRID_PAGE_SIZE, key: str = None, **kwargs):
+    """
+    Mostra `data` (DataFrame ou pyarrow.Table) em st.dataframe, ou em
+    st.data_editor com `editable`, depois de present() e da paginação.
+    `name` identifica o grid na métrica e no seletor de página; os demais
+    argumentos seguem para o Streamlit. Editores ganham uma key por página e
+    retornam só as linhas da página exibida.
+    """
+    with tracing.span(f"grid.{name}") as span:
+        table = present(data, columns, editable)
+        table, page = _page(table, name, page_size)
+        size = payload_bytes(table)
+        metrics.GRID_PAYLOAD_BYTES.observe(size, grid=name)
+        if span.recording:
+            span.set_attribute("grid.rows", table.num_rows)
+            span.set_attribute("grid.columns", table.num_columns)
+            span.set_attribute("grid.payload_bytes", size)
+        logger.debug(f"Grid {name}: {table.num_rows} linhas × {table.num_columns} colunas, {size} bytes")
+        if editable:
+            editor_key = key or f"grid_{name}"
+            return st.data_editor(table, key=f"{editor_key}_p{page}" if page > 1 else editor_key, **kwargs)
+        return st.dataframe(table, key=key, **kwargs)
@@ -0,0 +1,288 @@
+"""
+database/analytics.py
+Modo analítico opcional — réplica local (DuckDB) de transactions,
+sincronizada incrementalmente por updated_at, onde rodam os agregados das
+abas Gerencial e Dashboards (fluxo mensal, DRE, categorias e extrato) sem ida
+ao Postgres a cada mudança de widget. O arquivo Parquet (database/archive.py)
+entra na mesma consulta. Requer o pacote duckdb
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import date, timedelta
+
+import pyarrow as pa
+
+try:
+    import duckdb
+except ImportError:  # dependência opcional: sem ela o modo analítico fica desligado
+    duckdb = None
+
+from database.connection import execute_query, data_version
+from database import archive
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNC_SECONDS = 60
+# Relê o que mudou um pouco antes da marca d'água: updated_at = NOW() é o
+# início da transação, que pode confirmar depois da última sincronização
+SYNC_OVERLAP = timedelta(minutes=10)
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS tx (
+        id BIGINT PRIMARY KEY,
+        flow_type VARCHAR,
+        category_id BIGINT,
+        subcategory_id BIGINT,
+        supplier_id BIGINT,
+        bank_id BIGINT,
+        description VARCHAR,
+        total_value_cents BIGINT,
+        due_date DATE,
+        payment_date DATE,
+        status VARCHAR,
+        is_forecast BOOLEAN,
+        updated_at TIMESTAMP
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS dims (kind VARCHAR, id BIGINT, name VARCHAR)",
+]
+
+_store = None
+_store_lock = threading.Lock()
+_disabled = False
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CONFIGURAÇÃO
+# ═══════════════════════════════════════════════════════════════════
+
+def _config() -> dict:
+    """secrets.toml [analytics] enabled/path/sync_seconds → ANALYTICS_MODE/ANALYTICS_DB/ANALYTICS_SYNC_SECONDS."""
+    config = {}
+    try:
+        import streamlit as st
+        config = dict(st.secrets["analytics"])
+    except Exception:
+        pass
+    if "enabled" not in config:
+        config["enabled"] = os.getenv("ANALYTICS_MODE", "").lower() in ("1", "true", "yes")
+    if "path" not in config:
+        default = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               ".analytics", "bk_finance.duckdb")
+        config["path"] = os.getenv("ANALYTICS_DB", default)
+    if "sync_seconds" not in config:
+        config["sync_seconds"] = float(os.getenv("ANALYTICS_SYNC_SECONDS", DEFAULT_SYNC_SECONDS))
+    return config
+
+
+def analytics_enabled() -> bool:
+    """Ligado na configuração, com duckdb instalado e a réplica abrindo sem erro."""
+    if _disabled or not _config()["enabled"]:
+        return False
+    if duckdb is None:
+        _disable("pacote duckdb não instalado")
+        return False
+    return True
+
+
+def _disable(reason: str):
+    global _disabled
+    if not _disabled:
+        logger.warning(f"Modo analítico desligado: {reason}")
+    _disabled = True
+
+
+# ═══════════════════════════════════════════════════════════════════
+# RÉPLICA LOCAL
+# ═══════════════════════════════════════════════════════════════════
+
+class _Store:
+    """Conexão DuckDB do processo — uma consulta por vez (lock), estado da sincronização."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.con = duckdb.connect(path)
+        for ddl in _SCHEMA:
+            self.con.execute(ddl)
+        self.lock = threading.RLock()
+        self.synced_at = 0.0
+        self.synced_version = None
+
+
+def _get_store() -> _Store:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _Store(_config()["path"])
+    return _store
+
+
+def sync(force: bool = False) -> dict:
+    """
+    Traz para a réplica o que mudou desde a última sincronização (updated_at)
+    e as dimensões (nomes). Exclusões aparecem como diferença de contagem e
+    são resolvidas comparando os ids. Sem `force`, só sincroniza se passou
+    `sync_seconds` ou se houve escrita neste processo. Retorna o que mudou.
+    """
+    store = _get_store()
+    with store.lock:
+        interval = float(_config()["sync_seconds"])
+        if (not force and store.synced_version == data_version()
+                and time.monotonic() - store.synced_at < interval):
+            return {}
+        started = time.perf_counter()
+        version = data_version()
+        con = store.con
+        watermark = con.execute("SELECT MAX(updated_at) FROM tx").fetchone()[0]
+        since = watermark - SYNC_OVERLAP if watermark else None
+        delta = execute_query("""
+            SELECT id, flow_type, category_id, subcategory_id, supplier_id, bank_id, description,
+                   total_value, due_date, payment_date, status, is_forecast, updated_at
+            FROM transactions
+            WHERE %s::timestamp IS NULL OR updated_at >= %s::timestamp
+        """, (since, since), columnar=True, money=("total_value",))
+        dims = execute_query("""
+            SELECT 'category' AS kind, id, name FROM categories
+            UNION ALL SELECT 'subcategory', id, name FROM subcategories
+            UNION ALL SELECT 'supplier', id, name FROM suppliers
+            UNION ALL SELECT 'bank', id, name FROM banks
+        """, columnar=True)
+        remote_count = execute_query("SELECT COUNT(*) AS n FROM transactions")[0]['n']
+
+        con.begin()
+        try:
+            if not delta.empty:
+                con.register("delta_frame", delta)
+                con.execute("""
+                    INSERT OR REPLACE INTO tx
+                    SELECT id, flow_type::VARCHAR, category_id, subcategory_id, supplier_id, bank_id,
+                           description, total_value_cents, due_date, payment_date, status::VARCHAR,
+                           is_forecast, updated_at
+                    FROM delta_frame
+                """)
+                con.unregister("delta_frame")
+            con.execute("DELETE FROM dims")
+            if not dims.empty:
+                con.register("dims_frame", dims)
+                con.execute("INSERT INTO dims SELECT kind, id, name FROM dims_frame")
+                con.unregister("dims_frame")
+            deleted = 0
+            if con.execute("SELECT COUNT(*) FROM tx").fetchone()[0] != remote_count:
+                con.register("remote_ids", execute_query("SELECT id FROM transactions", columnar=True))
+                deleted = con.execute(
+                    "DELETE FROM tx WHERE id NOT IN (SELECT id FROM remote_ids)").fetchone()[0]
+                con.unregister("remote_ids")
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        store.synced_at = time.monotonic()
+        store.synced_version = version
+        result = {"rows": len(delta), "deleted": deleted, "seconds": time.perf_counter() - started}
+        if delta.shape[0] or deleted:
+            logger.info(f"Réplica analítica: {result['rows']} lançamentos, {deleted} excluídos "
+                        f"em {result['seconds']:.2f}s")
+        return result
+
+
+def _query(sql: str, params: list, arrow: bool = False, tables: dict = None):
+    """
+    Sincroniza (se preciso) e consulta a réplica — DataFrame, ou pyarrow.Table
+    com `arrow`; `tables` (nome → pyarrow.Table) ficam visíveis só nesta
+    consulta. Erro ao abrir o arquivo desliga o modo.
+    """
+    try:
+        store = _get_store()
+        sync()
+    except duckdb.Error as e:
+        _disable(str(e))
+        raise
+    with store.lock:
+        for name, table in (tables or {}).items():
+            store.con.register(name, table)
+        try:
+            result = store.con.execute(sql, params)
+            if not arrow:
+                return result.df()
+            # .arrow() devolve Table nas versões antigas e RecordBatchReader nas novas
+            table = result.arrow()
+            return table.read_all() if isinstance(table, pa.RecordBatchReader) else table
+        finally:
+            for name in tables or {}:
+                store.con.unregister(name)
+
+
+def _period_relation(start_date: date, end_date: date, is_forecast: bool = None) -> tuple:
+    """
+    (sql, params, tables) dos lançamentos do período — réplica + Parquet
+    arquivado (lido do banco, registrado como `archived`) — com os nomes.
+    """
+    conditions, params = ["t.due_date BETWEEN ? AND ?"], [start_date, end_date]
+    if is_forecast is not None:
+        conditions.append("t.is_forecast = ?"); params.append(is_forecast)
+    where = " AND ".join(conditions)
+    sql = f"""
+        SELECT t.id, t.flow_type, t.description, t.total_value_cents, t.due_date, t.status,
+               c.name AS category_name, s.name AS subcategory_name, b.name AS bank_name
+        FROM tx t
+        LEFT JOIN dims c ON c.kind = 'category' AND c.id = t.category_id
+        LEFT JOIN dims s ON s.kind = 'subcategory' AND s.id = t.subcategory_id
+        LEFT JOIN dims b ON b.kind = 'bank' AND b.id = t.bank_id
+        WHERE {where}
+    """
+    archived = archive.read_archived_table(start_date, end_date, is_forecast=is_forecast)
+    if archived is None:
+        return sql, params, {}
+    sql += """
+        UNION ALL
+        SELECT t.id, t.flow_type, t.description, t.total_value_cents, t.due_date, t.status,
+               t.category_name, t.subcategory_name, t.bank_name
+        FROM archived t
+    """
+    return sql, params, {"archived": archived}
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CONSULTAS
+# ═══════════════════════════════════════════════════════════════════
+
+def aggregates(start_date: date, end_date: date, today: date, is_forecast: bool = None):
+    """
+    Mesmo resultado de utils.reports.dashboard_aggregates (totais, mensal por
+    tipo e por categoria, em centavos) num GROUP BY local. None sem linhas.
+    """
+    relation, params, tables = _period_relation(start_date, end_date, is_forecast)
+    df = _query(f"""
+        SELECT date_trunc('month', due_date)::TIMESTAMP AS month, flow_type, category_name,
+               SUM(total_value_cents)::BIGINT AS cents,
+               COALESCE(SUM(total_value_cents) FILTER (
+                   WHERE flow_type = 'Saída' AND status = 'Não pago' AND due_date < ?), 0)::BIGINT AS overdue
+        FROM ({relation}) p
+        GROUP BY ALL
+    """, [today] + params, tables=tables)
+    if df.empty:
+        return None
+    by_flow = df.groupby('flow_type')['cents'].sum()
+    return dict(
+        total_in=int(by_flow.get('Entrada', 0)),
+        total_out=int(by_flow.get('Saída', 0)),
+        inadimplencia=int(df['overdue'].sum()),
+        monthly=df.groupby(['month', 'flow_type'])['cents'].sum().rename('total_value_cents'),
+        by_category=df.groupby(['flow_type', 'category_name'])['cents'].sum().rename('total_value_cents'),
+    )
+
+
+def extrato(start_date: date, end_date: date, is_forecast: bool = None) -> pa.Table:
+    """Linhas do extrato do período (colunas de utils.reports.EXTRATO_COLUMNS, em centavos), em Arrow."""
+    relation, params, tables = _period_relation(start_date, end_date, is_forecast)
+    return _query(f"""
+        SELECT due_date, flow_type, category_name, subcategory_name, description,
+               total_value_cents, status, bank_name
+        FROM ({relation}) p
+        ORDER BY due_date, flow_type, id
+    """, params, arrow=True, tables=tables)
@@ -0,0 +1,301 @@
+"""
+database/archive.py
+Arquivo frio de movimentações — lançamentos pagos de meses fechados saem da
+tabela transactions para Parquet (zstd) gravado no próprio Postgres
+(transaction_archive.data, um arquivo por mês e execução), legível por todos
+os servidores e workers, e voltam de forma transparente em get_transactions /
+iter_transactions, lidos pelo pyarrow com os filtros empurrados para o leitor.
+Os totais diários por banco ficam em archived_flows, para saldos, livro-razão
+e gráficos mensais não precisarem ler os arquivos
+"""
+
+import os
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from dateutil.relativedelta import relativedelta
+
+from database.connection import db_cursor, execute_query, mark_data_changed, data_version, _with_cents
+from database.columnar import fetch_frame, CATEGORY_COLUMNS
+from database.instrumentation import TimedCursor
+
+logger = logging.getLogger(__name__)
+
+# Meses mais recentes que isso continuam na tabela quente
+DEFAULT_KEEP_MONTHS = 24
+COMPRESSION = "zstd"
+MONTH_PREFIX = "month="
+
+# Mesmas colunas de get_transactions (dinheiro em centavos); nomes de
+# categoria/fornecedor/banco ficam como estavam no momento do arquivamento
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("flow_type", pa.string()),
+    ("category_id", pa.int64()),
+    ("subcategory_id", pa.int64()),
+    ("supplier_id", pa.int64()),
+    ("bank_id", pa.int64()),
+    ("description", pa.string()),
+    ("value_cents", pa.int64()),
+    ("interest_cents", pa.int64()),
+    ("total_value_cents", pa.int64()),
+    ("due_date", pa.date32()),
+    ("payment_date", pa.date32()),
+    ("status", pa.string()),
+    ("is_recurrent", pa.bool_()),
+    ("recurrence_type", pa.string()),
+    ("recurrence_group_id", pa.string()),
+    ("notes", pa.string()),
+    ("is_forecast", pa.bool_()),
+    ("created_at", pa.timestamp("us")),
+    ("updated_at", pa.timestamp("us")),
+    ("category_name", pa.string()),
+    ("subcategory_name", pa.string()),
+    ("supplier_name", pa.string()),
+    ("bank_name", pa.string()),
+])
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ARQUIVOS NO BANCO
+# ═══════════════════════════════════════════════════════════════════
+
+# Parquet já lido do banco, por arquivo (nomes são únicos e imutáveis) — LRU limitado em bytes
+CACHE_BYTES = 64 * 2**20
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_catalog = (None, [])
+
+
+def _list_catalog() -> list:
+    """(mês, arquivo) de tudo que foi arquivado — relido quando data_version muda."""
+    global _catalog
+    version = data_version()
+    cached_version, rows = _catalog
+    if cached_version != version:
+        rows = execute_query("SELECT month, file FROM transaction_archive WHERE data IS NOT NULL ORDER BY month, file")
+        rows = [(r['month'], r['file']) for r in rows or []]
+        _catalog = (version, rows)
+    return rows
+
+
+def _read_files(files: list) -> list:
+    """Conteúdo (bytes) dos arquivos, do cache ou numa só query ao banco."""
+    with _cache_lock:
+        found = {f: _cache[f] for f in files if f in _cache}
+        for f in found:
+            _cache.move_to_end(f)
+    missing = [f for f in files if f not in found]
+    if missing:
+        rows = execute_query("SELECT file, data FROM transaction_archive WHERE file = ANY(%s)", (missing,))
+        loaded = {r['file']: bytes(r['data']) for r in rows or []}
+        found.update(loaded)
+        with _cache_lock:
+            _cache.update(loaded)
+            size = sum(len(b) for b in _cache.values())
+            while _cache and size > CACHE_BYTES:
+                size -= len(_cache.popitem(last=False)[1])
+    return [found[f] for f in files if f in found]
+
+
+def clear_cache():
+    """Esquece o Parquet lido e o catálogo (testes)."""
+    global _catalog
+    with _cache_lock:
+        _cache.clear()
+    _catalog = (None, [])
+
+
+# ═══════════════════════════════════════════════════════════════════
+# LEITURA
+# ═══════════════════════════════════════════════════════════════════
+
+def archived_files(start_date: date = None, end_date: date = None) -> list:
+    """Arquivos Parquet dos meses arquivados que tocam o intervalo (poda pelo mês do catálogo)."""
+    first = start_date.replace(day=1) if start_date else date.min
+    last = end_date or date.max
+    return [file for month, file in _list_catalog() if first <= month <= last]
+
+
+def _filter(start_date=None, end_date=None, flow_type=None, is_forecast=None):
+    expr = None
+    for cond in (
+        ds.field("due_date") >= pa.scalar(start_date, pa.date32()) if start_date else None,
+        ds.field("due_date") <= pa.scalar(end_date, pa.date32()) if end_date else None,
+        ds.field("flow_type") == flow_type if flow_type and flow_type != 'Todos' else None,
+        ds.field("is_forecast") == is_forecast if is_forecast is not None else None,
+    ):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    return expr
+
+
+def _archived_dataset(start_date=None, end_date=None, status=None, flow_type=None, is_forecast=None):
+    """
+    Dataset em memória dos arquivos do intervalo, já filtrados na leitura do
+    Parquet, ou None se nada arquivado pode casar com os filtros.
+    """
+    if status and status not in ('Todos', 'Pago'):
+        return None
+    files = archived_files(start_date, end_date)
+    if not files:
+        return None
+    expr = _filter(start_date, end_date, flow_type, is_forecast)
+    tables = [pq.read_table(pa.BufferReader(data), schema=ARCHIVE_SCHEMA, filters=expr)
+              for data in _read_files(files)]
+    return ds.dataset(tables, schema=ARCHIVE_SCHEMA) if tables else None
+
+
+def _to_frame(data) -> pd.DataFrame:
+    """Table/RecordBatch → mesmo formato do fetch_frame (datas como objetos date, `category`)."""
+    df = data.to_pandas(date_as_object=True)
+    for col in CATEGORY_COLUMNS.intersection(df.columns):
+        df[col] = df[col].astype("category")
+    return df
+
+
+def read_archived_table(start_date=None, end_date=None, status=None, flow_type=None, is_forecast=None):
+    """Movimentações arquivadas com os filtros de get_transactions, em pyarrow.Table, ou None."""
+    dataset = _archived_dataset(start_date, end_date, status, flow_type, is_forecast)
+    if dataset is None:
+        return None
+    table = dataset.to_table()
+    return table if table.num_rows else None
+
+
+def read_archived(start_date=None, end_date=None, status=None, flow_type=None, is_forecast=None):
+    """Como read_archived_table, em DataFrame (formato de fetch_frame)."""
+    table = read_archived_table(start_date, end_date, status, flow_type, is_forecast)
+    return _to_frame(table) if table is not None else None
+
+
+def iter_archived(start_date=None, end_date=None, status=None, flow_type=None, is_forecast=None,
+                  batch_size: int = 2000):
+    """Como read_archived, em DataFrames de até `batch_size` linhas."""
+    dataset = _archived_dataset(start_date, end_date, status, flow_type, is_forecast)
+    if dataset is None:
+        return
+    for batch in dataset.to_batches(batch_size=batch_size):
+        if batch.num_rows:
+            yield _to_frame(batch)
+
+
+def with_archived(df: pd.DataFrame, start_date=None, end_date=None, status=None, flow_type=None,
+                  is_forecast=None) -> pd.DataFrame:
+    """Une ao resultado da tabela quente o que estiver arquivado no intervalo, na ordem da listagem."""
+    archived = read_archived(start_date, end_date, status, flow_type, is_forecast)
+    if archived is None:
+        return df
+    out = pd.concat([archived, df.astype({c: object for c in CATEGORY_COLUMNS.intersection(df.columns)})],
+                    ignore_index=True)
+    out = out.sort_values(["due_date", "flow_type"], kind="stable", ignore_index=True)
+    for col in CATEGORY_COLUMNS.intersection(out.columns):
+        out[col] = out[col].astype("category")
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ARQUIVAMENTO
+# ═══════════════════════════════════════════════════════════════════
+
+def _to_parquet(df: pd.DataFrame) -> bytes:
+    df = df.astype({c: object for c in CATEGORY_COLUMNS.intersection(df.columns)})
+    table = pa.Table.from_pandas(df[ARCHIVE_SCHEMA.names], schema=ARCHIVE_SCHEMA, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression=COMPRESSION)
+    return sink.getvalue().to_pybytes()
+
+
+def _archive_month(month: date, cutoff: date, dry_run: bool) -> dict:
+    """
+    Move os lançamentos pagos (antes de `cutoff`) de um mês numa transação:
+    Parquet + totais diários + exclusão — ou tudo, ou nada.
+    """
+    from database.queries import _transactions_query, _TRANSACTION_MONEY
+    month_end = month + relativedelta(months=1) - timedelta(days=1)
+    name = f"{uuid.uuid4().hex}.parquet"
+    with db_cursor(TimedCursor) as cur:
+        # O trigger de saldo ignora estas exclusões: o efeito passa para archived_flows
+        cur.execute("SET LOCAL bk.archiving = 'on'")
+        sql, params = _transactions_query(month, month_end, status='Pago')
+        sql += " FOR UPDATE OF t"
+        cur.execute(_with_cents(cur, sql, params, _TRANSACTION_MONEY), params)
+        df = fetch_frame(cur)
+        paid = df["payment_date"].where(df["payment_date"].notna(), df["due_date"])
+        df = df[paid < cutoff]
+        summary = {"month": month, "rows": len(df), "file": None if dry_run else name}
+        if df.empty or dry_run:
+            return summary
+        ids = df["id"].astype("int64").tolist()
+        cur.execute("""
+            INSERT INTO archived_flows (due_date, bank_id, is_forecast, income, expense)
+            SELECT due_date, bank_id, COALESCE(is_forecast, TRUE),
+                   SUM(CASE WHEN flow_type='Entrada' THEN total_value ELSE 0 END),
+                   SUM(CASE WHEN flow_type='Saída' THEN total_value ELSE 0 END)
+            FROM transactions
+            WHERE id = ANY(%s) AND due_date BETWEEN %s AND %s
+            GROUP BY 1, 2, 3
+            ON CONFLICT (due_date, (COALESCE(bank_id, 0)), is_forecast)
+            DO UPDATE SET income = archived_flows.income + EXCLUDED.income,
+                          expense = archived_flows.expense + EXCLUDED.expense
+        """, (ids, month, month_end))
+        cur.execute("INSERT INTO transaction_archive (month, file, rows, data) VALUES (%s, %s, %s, %s)",
+                    (month, name, len(ids), _to_parquet(df)))
+        cur.execute("DELETE FROM transactions WHERE id = ANY(%s) AND due_date BETWEEN %s AND %s",
+                    (ids, month, month_end))
+    return summary
+
+
+def archive_transactions(before: date = None, dry_run: bool = False, on_progress=None) -> list:
+    """
+    Arquiva os lançamentos pagos com vencimento e pagamento anteriores ao mês
+    de `before` (padrão: DEFAULT_KEEP_MONTHS meses atrás; nunca o mês corrente),
+    um mês por transação. Os não pagos ficam na tabela; se forem pagos depois,
+    uma nova execução acrescenta outro arquivo ao mês. Retorna um resumo por mês.
+    """
+    cutoff = min(before or date.today() - relativedelta(months=DEFAULT_KEEP_MONTHS), date.today()).replace(day=1)
+    rows = execute_query("""
+        SELECT DISTINCT DATE_TRUNC('month', due_date)::date AS month
+        FROM transactions
+        WHERE status = 'Pago' AND due_date < %s AND COALESCE(payment_date, due_date) < %s
+        ORDER BY 1
+    """, (cutoff, cutoff))
+    months = [r['month'] for r in rows or []]
+    results = []
+    for i, month in enumerate(months):
+        results.append(_archive_month(month, cutoff, dry_run))
+        if on_progress:
+            on_progress((i + 1) / len(months))
+    if results and not dry_run:
+        mark_data_changed()
+    return results
+
+
+def import_archive_dir(root: str) -> int:
+    """
+    Carrega no banco os Parquet de um arquivo em disco da versão anterior
+    (<root>/transactions/month=AAAA-MM/*.parquet) cujos registros ainda não
+    têm conteúdo. Retorna quantos arquivos foram carregados.
+    """
+    base = os.path.join(root, "transactions")
+    if not os.path.isdir(base):
+        return 0
+    paths = {f.name: f.path for d in os.scandir(base) if d.is_dir() and d.name.startswith(MONTH_PREFIX)
+             for f in os.scandir(d.path) if f.name.endswith(".parquet")}
+    rows = execute_query("SELECT file FROM transaction_archive WHERE data IS NULL AND file = ANY(%s)",
+                         (list(paths),))
+    with db_cursor() as cur:
+        for r in rows or []:
+            with open(paths[r['file']], "rb") as f:
+                cur.execute("UPDATE transaction_archive SET data = %s WHERE file = %s",
+                            (f.read(), r['file']))
+    if rows:
+        mark_data_changed()
+    return len(rows or [])
@@ -0,0 +1,157 @@
+"""
+database/columnar.py
+Montagem colunar de DataFrames a partir de cursores de tuplas e de
+pyarrow.Table a partir da saída de COPY ... TO STDOUT (CSV)
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from utils.money import CENTS_SUFFIX
+
+# Linhas buscadas por fetchmany — limita os objetos Python vivos ao mesmo tempo
+FETCH_CHUNK_SIZE = 5000
+
+# Colunas de baixa cardinalidade armazenadas como `category`
+CATEGORY_COLUMNS = frozenset({"flow_type", "status", "priority", "recurrence_type"})
+
+
+class _ColumnBuilder:
+    """Acumula os valores de uma coluna em arrays tipados, chunk a chunk."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.parts = []
+        if name.endswith(CENTS_SUFFIX):
+            self.kind = "cents"
+        elif name in CATEGORY_COLUMNS:
+            self.kind = "category"
+            self.codes = {}
+        else:
+            self.kind = "generic"
+
+    def add(self, values: tuple):
+        if self.kind == "cents":
+            self.parts.append(np.fromiter(values, dtype=np.int64, count=len(values)))
+        elif self.kind == "category":
+            codes = self.codes
+            self.parts.append(np.fromiter(
+                (-1 if v is None else codes.setdefault(v, len(codes)) for v in values),
+                dtype=np.int32, count=len(values),
+            ))
+        else:
+            self.parts.append(pd.Series(values))
+
+    def finish(self):
+        """Retorna (nome_final, array) da coluna."""
+        if self.kind == "cents":
+            data = np.concatenate(self.parts) if self.parts else np.empty(0, dtype=np.int64)
+            return self.name, data
+        if self.kind == "category":
+            codes = np.concatenate(self.parts) if self.parts else np.empty(0, dtype=np.int32)
+            return self.name, pd.Categorical.from_codes(codes, categories=list(self.codes))
+        if not self.parts:
+            return self.name, pd.Series([], dtype=object)
+        if len(self.parts) == 1:
+            return self.name, self.parts[0]
+        return self.name, pd.concat(self.parts, ignore_index=True)
+
+
+def _frame_from_builders(builders) -> pd.DataFrame:
+    data = {}
+    for builder in builders:
+        name, values = builder.finish()
+        data[name] = values.reset_index(drop=True) if isinstance(values, pd.Series) else values
+    return pd.DataFrame(data)
+
+
+def fetch_frame(cur, chunk_size: int = FETCH_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Consome um cursor de tuplas já executado e monta o DataFrame coluna a coluna:
+    `<nome>_cents` (cents_query) em int64, colunas de baixa cardinalidade como `category`.
+    """
+    names = [d[0] for d in cur.description]
+    builders = [_ColumnBuilder(n) for n in names]
+    while True:
+        chunk = cur.fetchmany(chunk_size)
+        if not chunk:
+            break
+        for builder, values in zip(builders, zip(*chunk)):
+            builder.add(values)
+        del chunk
+    return _frame_from_builders(builders)
+
+
+def iter_frames(cur, chunk_size: int = FETCH_CHUNK_SIZE):
+    """
+    Gera um DataFrame por bloco de `chunk_size` linhas, mesmo formato de
+    fetch_frame. Serve para cursores nomeados (server-side), cuja
+    `description` só fica disponível após o primeiro fetch.
+    """
+    while True:
+        chunk = cur.fetchmany(chunk_size)
+        if not chunk:
+            return
+        builders = [_ColumnBuilder(d[0]) for d in cur.description]
+        for builder, values in zip(builders, zip(*chunk)):
+            builder.add(values)
+        del chunk
+        yield _frame_from_builders(builders)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ARROW (COPY CSV)
+# ═══════════════════════════════════════════════════════════════════
+
+# OID do tipo no Postgres → tipo Arrow da coluna; o resto (texto, uuid,
+# timestamptz…) fica como string. NUMERIC que não é dinheiro vira float64;
+# dinheiro chega em bigint (cents_query)
+PG_ARROW_TYPES = {
+    16: pa.bool_(),
+    20: pa.int64(), 21: pa.int64(), 23: pa.int64(),
+    700: pa.float64(), 701: pa.float64(), 1700: pa.float64(),
+    1082: pa.date32(),
+    1114: pa.timestamp("us"),
+}
+
+# Formato CSV do COPY: booleanos t/f, NULL = campo vazio sem aspas ("" é texto vazio)
+_COPY_CONVERT = dict(true_values=["t"], false_values=["f"], null_values=[""],
+                     strings_can_be_null=True, quoted_strings_can_be_null=False)
+# Textos (notes, description) podem ter quebras de linha dentro das aspas
+_COPY_PARSE = pa_csv.ParseOptions(newlines_in_values=True)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def cents_query(query: str, names: list, money) -> str:
+    """
+    Envolve `query` num SELECT que troca cada coluna de `money` (lista
+    explícita de quem chama) por `<nome>_cents` bigint, calculado em NUMERIC
+    no banco (nulos → 0) — somas acima de 2**53 centavos não passam por
+    float64. Sem junções nem agregados por fora, a ordem da query é mantida.
+    """
+    missing = set(money) - set(names)
+    if missing:
+        raise ValueError(f"Colunas monetárias ausentes na query: {', '.join(sorted(missing))}")
+    columns = [f"COALESCE(ROUND(q.{_quote(n)} * 100), 0)::bigint AS {_quote(n + CENTS_SUFFIX)}"
+               if n in money else f"q.{_quote(n)}" for n in names]
+    return f"SELECT {', '.join(columns)} FROM ({query}) q"
+
+
+def arrow_schema(description) -> pa.Schema:
+    """Schema Arrow a partir de (nome, OID do tipo) de cada coluna (`cursor.description`)."""
+    return pa.schema([(d[0], PG_ARROW_TYPES.get(d[1], pa.string())) for d in description])
+
+
+def read_copy_csv(source, schema: pa.Schema) -> pa.Table:
+    """
+    Lê a saída de COPY ... (FORMAT csv, HEADER true) com os tipos de `schema`.
+    Colunas de CATEGORY_COLUMNS ficam string: o Arrow não ordena dictionary e
+    a string Arrow já é compacta.
+    """
+    return pa_csv.read_csv(source, parse_options=_COPY_PARSE, convert_options=pa_csv.ConvertOptions(
+        column_types=schema, **_COPY_CONVERT))
@@ -7,10 +7,39 @@ import streamlit as st
 import psycopg2
 import psycopg2.extras
 from contextlib import contextmanager
+import io
+import time
 import logging
+import uuid
+
+import pyarrow as pa
+
+from database.columnar import fetch_frame, iter_frames, arrow_schema, cents_query, read_copy_csv
+from database.instrumentation import TimedCursor, TimedDictCursor, add_observer, statement_name
+from utils import metrics, tracing
+from utils.money import CENTS_SUFFIX
 
 logger = logging.getLogger(__name__)
 
+# Latência de cada execute → histograma por statement (utils/metrics.py)
+add_observer(metrics.observe_query)
+# …e cada execute vira um span db.query filho do span corrente (utils/tracing.py)
+add_observer(tracing.record_query)
+
+# (nome, OID do tipo) das colunas por texto de query — o describe custa uma ida ao banco
+_descriptions = {}
+# OID de bigint — tipo das colunas `<nome>_cents` (cents_query)
+_BIGINT_OID = 20
+
+# Versão dos dados neste processo — incrementada a cada escrita, usada como
+# chave de cache dos relatórios calculados fora da thread do script
+_data_version = 0
+
+# Versão global (sequence data_version_seq, avançada por trigger em qualquer
+# processo) — relida no máximo a cada DATA_VERSION_TTL segundos
+DATA_VERSION_TTL = 5.0
+_db_version = (0.0, None)
+
 # URL padrão Neon — usada quando secrets.toml não está presente
 _NEON_URL = (
     "postgresql://neondb_owner:npg_bDpOXoF4NkJ9"
@@ -19,21 +48,46 @@ _NEON_URL = (
 )
 
 
+# URL fixada por ferramentas de linha de comando (bench) — tem precedência sobre
+# tudo; fica no ambiente para valer também nos processos do executor de jobs
+_URL_OVERRIDE_ENV = "BK_DATABASE_URL_OVERRIDE"
+
+
+def set_db_url(url: str):
+    """Fixa a URL do banco para este processo e seus filhos (CLIs de benchmark/seed)."""
+    import os
+    os.environ[_URL_OVERRIDE_ENV] = url
+
+
 def get_db_url() -> str:
-    """Retorna a URL do banco: secrets.toml → variável de ambiente → URL Neon embutida."""
+    """Retorna a URL do banco: override → secrets.toml → variável de ambiente → URL Neon embutida."""
+    import os
+    if os.getenv(_URL_OVERRIDE_ENV):
+        return os.environ[_URL_OVERRIDE_ENV]
     try:
         url = st.secrets["database"]["url"]
         if url:
             return url
     except Exception:
         pass
-    import os
     url_env = os.getenv("DATABASE_URL", "")
     if url_env:
         return url_env
     return _NEON_URL
 
 
+def get_db_itersize() -> int:
+    """Linhas por ida ao servidor nos cursores nomeados: secrets.toml → DB_ITERSIZE → 2000."""
+    try:
+        value = st.secrets["database"]["itersize"]
+        if value:
+            return int(value)
+    except Exception:
+        pass
+    import os
+    return int(os.getenv("DB_ITERSIZE", "2000"))
+
+
 @st.cache_resource
 def get_connection_pool():
     """Cria pool de conexões reutilizável."""
@@ -41,39 +95,166 @@ def get_connection_pool():
 
 
 def get_connection():
-    """Retorna conexão com o banco de dados."""
+    """Retorna conexão com o banco de dados (feche com _release_connection)."""
     url = get_db_url()
-    conn = psycopg2.connect(url, cursor_factory=psycopg2.extras.RealDictCursor)
+    with metrics.DB_CONNECT_SECONDS.time():
+        conn = psycopg2.connect(url, cursor_factory=TimedDictCursor)
+    metrics.DB_CONNECTIONS_OPENED.inc()
+    metrics.DB_CONNECTIONS_IN_USE.inc()
     return conn
 
 
+def _release_connection(conn):
+    conn.close()
+    metrics.DB_CONNECTIONS_IN_USE.dec()
+
+
 @contextmanager
-def db_cursor():
+def db_cursor(cursor_factory=None):
     """Context manager para operações no banco com commit/rollback automático."""
     conn = get_connection()
     try:
-        cur = conn.cursor()
+        cur = conn.cursor(cursor_factory=cursor_factory) if cursor_factory else conn.cursor()
         yield cur
         conn.commit()
     except Exception as e:
         conn.rollback()
+        metrics.DB_QUERY_ERRORS.inc()
         logger.error(f"Erro de banco de dados: {e}")
         raise e
     finally:
         cur.close()
-        conn.close()
+        _release_connection(conn)
 
 
-def execute_query(query: str, params=None, fetch=True):
-    """Executa query e retorna resultados."""
-    with db_cursor() as cur:
+def mark_data_changed():
+    """Sinaliza que houve escrita no banco (invalida relatórios cacheados)."""
+    global _data_version, _db_version
+    _data_version += 1
+    _db_version = (0.0, _db_version[1])
+
+
+def _read_db_version():
+    """last_value de data_version_seq, com cache de DATA_VERSION_TTL; None se ilegível."""
+    global _db_version
+    checked, value = _db_version
+    if value is not None and time.monotonic() - checked < DATA_VERSION_TTL:
+        return value
+    try:
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT last_value FROM data_version_seq")
+                value = cur.fetchone()['last_value']
+            conn.commit()
+        finally:
+            _release_connection(conn)
+    except Exception as e:
+        logger.warning(f"Versão global dos dados indisponível: {e}")
+    _db_version = (time.monotonic(), value)
+    return value
+
+
+def data_version() -> tuple:
+    """
+    Chave de cache dos relatórios: (versão global do banco, escritas deste
+    processo). A global cobre o worker de jobs e outros servidores, com atraso
+    de até DATA_VERSION_TTL segundos; a local vale na hora.
+    """
+    return (_read_db_version(), _data_version)
+
+
+def _describe(cur, query: str, params) -> list:
+    """(nome, OID do tipo) de cada coluna da query, de um LIMIT 0 feito uma vez por texto."""
+    description = _descriptions.get(query)
+    if description is None:
+        cur.execute(f"SELECT * FROM ({query}) q LIMIT 0", params or ())
+        description = _descriptions[query] = [(d[0], d[1]) for d in cur.description]
+    return description
+
+
+def _with_cents(cur, query: str, params, money) -> str:
+    """A query com as colunas de `money` trocadas por `<nome>_cents` calculadas no banco."""
+    if not money:
+        return query
+    return cents_query(query, [name for name, _ in _describe(cur, query, params)], money)
+
+
+def execute_query(query: str, params=None, fetch=True, columnar=False, money=()):
+    """
+    Executa query e retorna resultados.
+    Com columnar=True usa cursor de tuplas + fetchmany e devolve um DataFrame
+    montado coluna a coluna (ver database/columnar.py); as colunas listadas em
+    `money` chegam como `<nome>_cents` int64, convertidas em NUMERIC no banco.
+    """
+    with tracing.span("db.execute_query", kind=tracing.KIND_CLIENT) as span:
+        if span.recording:
+            span.set_attribute("code.function", statement_name())
+            span.set_attribute("db.columnar", columnar)
+        if columnar:
+            with db_cursor(TimedCursor) as cur:
+                cur.execute(_with_cents(cur, query, params, money), params or ())
+                return fetch_frame(cur)
+        with db_cursor() as cur:
+            cur.execute(query, params or ())
+            if fetch:
+                return cur.fetchall()
+    mark_data_changed()
+    return None
+
+
+def execute_arrow(query: str, params=None, money=()) -> pa.Table:
+    """
+    Executa a query via COPY (...) TO STDOUT em CSV e devolve um pyarrow.Table
+    montado pelo leitor CSV do Arrow — sem tuplas nem objetos Python por
+    valor. As colunas de `money` em `<nome>_cents` int64, como columnar=True.
+    Os tipos vêm de um describe (LIMIT 0) feito uma vez por texto de query.
+    """
+    with tracing.span("db.execute_arrow", kind=tracing.KIND_CLIENT) as span:
+        if span.recording:
+            span.set_attribute("code.function", statement_name())
+        with db_cursor(TimedCursor) as cur:
+            description = _describe(cur, query, params)
+            if money:
+                query = _with_cents(cur, query, params, money)
+                description = [(name + CENTS_SUFFIX, _BIGINT_OID) if name in money else (name, oid)
+                               for name, oid in description]
+            schema = arrow_schema(description)
+            sql = cur.mogrify(query, params or ()).decode("utf-8")
+            buf = io.BytesIO()
+            cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", buf)
+            buf.seek(0)
+            return read_copy_csv(buf, schema)
+
+
+def iter_query(query: str, params=None, itersize: int = None, money=()):
+    """
+    Executa a query num cursor nomeado (server-side) e gera DataFrames de até
+    `itersize` linhas — o resultado nunca fica inteiro em memória. `money`
+    como em execute_query.
+    """
+    itersize = itersize or get_db_itersize()
+    conn = get_connection()
+    try:
+        with conn.cursor(cursor_factory=TimedCursor) as describe_cur:
+            query = _with_cents(describe_cur, query, params, money)
+        cur = conn.cursor(name=f"iter_{uuid.uuid4().hex}", cursor_factory=TimedCursor)
+        cur.itersize = itersize
         cur.execute(query, params or ())
-        if fetch:
-            return cur.fetchall()
-        return None
+        yield from iter_frames(cur, itersize)
+        cur.close()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        metrics.DB_QUERY_ERRORS.inc()
+        logger.error(f"Erro de banco de dados: {e}")
+        raise e
+    finally:
+        _release_connection(conn)
 
 
 def execute_many(query: str, data: list):
     """Executa query com múltiplos registros."""
     with db_cursor() as cur:
         psycopg2.extras.execute_batch(cur, query, data)
+    mark_data_changed()
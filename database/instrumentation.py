@@ -0,0 +1,144 @@
+"""
+database/instrumentation.py
+Cursores cronometrados e observadores de queries — base para contagem de
+queries em benchmarks e métricas
+"""
+
+import sys
+import time
+import threading
+from collections import Counter, defaultdict
+
+import psycopg2.extensions
+import psycopg2.extras
+
+# Módulos ignorados ao identificar quem emitiu a query
+_INTERNAL_MODULES = frozenset({__name__, "database.connection", "database.columnar", "contextlib"})
+
+_observers = []
+_statement_listeners = []
+_lock = threading.Lock()
+
+
+def add_observer(fn):
+    """Registra `fn(statement, elapsed_seconds)`, chamado após cada execute."""
+    with _lock:
+        _observers.append(fn)
+
+
+def remove_observer(fn):
+    with _lock:
+        if fn in _observers:
+            _observers.remove(fn)
+
+
+def add_statement_listener(fn):
+    """Registra `fn(statement, sql)` com o SQL já interpolado (captura de planos)."""
+    with _lock:
+        _statement_listeners.append(fn)
+
+
+def remove_statement_listener(fn):
+    with _lock:
+        if fn in _statement_listeners:
+            _statement_listeners.remove(fn)
+
+
+def statement_name() -> str:
+    """'modulo.funcao' do primeiro chamador fora da camada de conexão."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _INTERNAL_MODULES and not module.startswith("psycopg2"):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _notify(started: float, cursor=None, query=None, vars=None):
+    if not _observers and not _statement_listeners:
+        return
+    elapsed = time.perf_counter() - started
+    name = statement_name()
+    for fn in list(_observers):
+        fn(name, elapsed)
+    if _statement_listeners and query is not None:
+        sql = cursor.mogrify(query, vars)
+        sql = sql.decode("utf-8", errors="replace") if isinstance(sql, bytes) else sql
+        for fn in list(_statement_listeners):
+            fn(name, sql)
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor de tuplas que notifica os observadores a cada execute."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _notify(started, self, query, vars)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _notify(started)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _notify(started, self, sql)
+
+
+class TimedDictCursor(psycopg2.extras.RealDictCursor):
+    """RealDictCursor que notifica os observadores a cada execute."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _notify(started, self, query, vars)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _notify(started)
+
+
+class QueryRecorder:
+    """
+    Conta as queries executadas (em qualquer thread) enquanto ativo:
+
+        with QueryRecorder() as rec:
+            get_transactions()
+        rec.count, rec.total_time, rec.by_statement
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total_time = 0.0
+        self.by_statement = Counter()
+        self.time_by_statement = defaultdict(float)
+
+    def __call__(self, statement: str, elapsed: float):
+        with self.lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.by_statement[statement] += 1
+            self.time_by_statement[statement] += elapsed
+
+    def __enter__(self):
+        add_observer(self)
+        return self
+
+    def __exit__(self, *exc):
+        remove_observer(self)
+        return False
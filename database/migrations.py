@@ -8,6 +8,12 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Colunas graváveis de transactions (total_value é gerada) — usadas ao mover linhas entre partições
+_TRANSACTION_COLUMNS = (
+    "id, flow_type, category_id, subcategory_id, supplier_id, bank_id, description, value, interest, "
+    "due_date, payment_date, status, is_recurrent, recurrence_type, recurrence_group_id, notes, "
+    "is_forecast, created_at, updated_at"
+)
 
 MIGRATIONS = [
     # ─── FORNECEDORES ───────────────────────────────────────────────────────────
@@ -65,9 +71,22 @@ MIGRATIONS = [
     """,
 
     # ─── MOVIMENTAÇÕES ──────────────────────────────────────────────────────────
+    # Particionada por ano de vencimento (transactions_yAAAA + transactions_default).
+    # Instalações com a tabela comum: renomeia aqui, copia mais abaixo
+    """
+    DO $$
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('transactions')) = 'r' THEN
+            ALTER TABLE transactions RENAME TO transactions_unpartitioned;
+            ALTER TABLE transactions_unpartitioned RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey;
+            ALTER SEQUENCE transactions_id_seq RENAME TO transactions_unpartitioned_id_seq;
+        END IF;
+    END
+    $$
+    """,
     """
     CREATE TABLE IF NOT EXISTS transactions (
-        id SERIAL PRIMARY KEY,
+        id SERIAL,
         flow_type VARCHAR(10) NOT NULL CHECK (flow_type IN ('Entrada', 'Saída')),
         category_id INTEGER REFERENCES categories(id),
         subcategory_id INTEGER REFERENCES subcategories(id),
@@ -86,8 +105,73 @@ MIGRATIONS = [
         notes TEXT,
         is_forecast BOOLEAN DEFAULT TRUE,
         created_at TIMESTAMP DEFAULT NOW(),
-        updated_at TIMESTAMP DEFAULT NOW()
-    )
+        updated_at TIMESTAMP DEFAULT NOW(),
+        PRIMARY KEY (id, due_date)
+    ) PARTITION BY RANGE (due_date)
+    """,
+
+    # ─── PARTIÇÕES DE MOVIMENTAÇÕES ─────────────────────────────────────────────
+    # Cria as partições anuais que faltam: anos com lançamentos na default, os
+    # anos pedidos e do atual até o atual + years_ahead. Lançamentos do ano que
+    # estavam na default saem e voltam pela tabela-mãe (o delta de saldo se anula)
+    f"""
+    CREATE OR REPLACE FUNCTION ensure_transactions_partitions(
+        extra_years INTEGER[] DEFAULT ARRAY[]::INTEGER[], years_ahead INTEGER DEFAULT 2
+    ) RETURNS INTEGER AS $$
+    DECLARE
+        this_year INTEGER := EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER;
+        years INTEGER[];
+        y INTEGER;
+        part TEXT;
+        created INTEGER := 0;
+    BEGIN
+        IF to_regclass('transactions_default') IS NULL THEN
+            CREATE TABLE transactions_default PARTITION OF transactions DEFAULT;
+        END IF;
+        SELECT array_agg(DISTINCT x ORDER BY x) INTO years FROM (
+            SELECT EXTRACT(YEAR FROM due_date)::INTEGER AS x FROM transactions_default
+            UNION ALL SELECT unnest(extra_years)
+            UNION ALL SELECT generate_series(this_year, this_year + years_ahead)
+        ) ys;
+        FOREACH y IN ARRAY years LOOP
+            part := 'transactions_y' || y;
+            CONTINUE WHEN to_regclass(part) IS NOT NULL;
+            CREATE TEMP TABLE IF NOT EXISTS transactions_moving (LIKE transactions) ON COMMIT DROP;
+            TRUNCATE transactions_moving;
+            WITH moved AS (
+                DELETE FROM transactions_default
+                WHERE due_date >= make_date(y, 1, 1) AND due_date < make_date(y + 1, 1, 1)
+                RETURNING *
+            )
+            INSERT INTO transactions_moving SELECT * FROM moved;
+            EXECUTE format('CREATE TABLE %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+                           part, make_date(y, 1, 1), make_date(y + 1, 1, 1));
+            INSERT INTO transactions ({_TRANSACTION_COLUMNS})
+            SELECT {_TRANSACTION_COLUMNS} FROM transactions_moving;
+            created := created + 1;
+        END LOOP;
+        RETURN created;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "SELECT ensure_transactions_partitions()",
+    # Migração da tabela comum: partições para todos os anos com lançamentos e
+    # cópia na mesma transação (o saldo dos bancos não muda: o trigger é
+    # recriado só depois, na tabela nova)
+    f"""
+    DO $$
+    BEGIN
+        IF to_regclass('transactions_unpartitioned') IS NOT NULL THEN
+            PERFORM ensure_transactions_partitions(ARRAY(
+                SELECT DISTINCT EXTRACT(YEAR FROM due_date)::INTEGER FROM transactions_unpartitioned));
+            INSERT INTO transactions ({_TRANSACTION_COLUMNS})
+            SELECT {_TRANSACTION_COLUMNS} FROM transactions_unpartitioned;
+            PERFORM setval(pg_get_serial_sequence('transactions', 'id'),
+                           (SELECT GREATEST(MAX(id), 1) FROM transactions));
+            DROP TABLE transactions_unpartitioned;
+        END IF;
+    END
+    $$
     """,
 
     # ─── METAS (SMART) ──────────────────────────────────────────────────────────
@@ -162,12 +246,176 @@ MIGRATIONS = [
     )
     """,
 
+    # ─── FILA DE JOBS ───────────────────────────────────────────────────────────
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id BIGSERIAL PRIMARY KEY,
+        kind VARCHAR(50) NOT NULL,
+        payload JSONB NOT NULL DEFAULT '{}',
+        status VARCHAR(10) NOT NULL DEFAULT 'queued'
+            CHECK (status IN ('queued', 'running', 'done', 'failed')),
+        priority SMALLINT NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 3,
+        run_after TIMESTAMP NOT NULL DEFAULT NOW(),
+        dedupe_key VARCHAR(200),
+        progress REAL NOT NULL DEFAULT 0,
+        progress_message TEXT,
+        result JSONB,
+        last_error TEXT,
+        locked_by VARCHAR(100),
+        locked_at TIMESTAMP,
+        created_at TIMESTAMP DEFAULT NOW(),
+        updated_at TIMESTAMP DEFAULT NOW(),
+        finished_at TIMESTAMP
+    )
+    """,
+
+    # ─── SNAPSHOTS DE SALDO ─────────────────────────────────────────────────────
+    # Saldo no fim de cada dia por banco ativo (bank_id NULL = sem banco ou banco
+    # inativo), gravado pelo job noturno snapshot_balances
+    """
+    CREATE TABLE IF NOT EXISTS balance_snapshots (
+        snapshot_date DATE NOT NULL,
+        bank_id INTEGER REFERENCES banks(id),
+        balance NUMERIC(15,2) NOT NULL,
+        created_at TIMESTAMP DEFAULT NOW()
+    )
+    """,
+    """CREATE UNIQUE INDEX IF NOT EXISTS idx_balance_snapshots_key
+       ON balance_snapshots(snapshot_date, (COALESCE(bank_id, 0)))""",
+
+    # ─── ARQUIVO FRIO DE MOVIMENTAÇÕES ──────────────────────────────────────────
+    # Lançamentos pagos arquivados em Parquet (database/archive.py): um registro
+    # por arquivo, com o conteúdo (lido por todos os processos), e os totais
+    # diários por banco, que entram nos saldos
+    """
+    CREATE TABLE IF NOT EXISTS transaction_archive (
+        month DATE NOT NULL,
+        file VARCHAR(100) PRIMARY KEY,
+        rows INTEGER NOT NULL,
+        data BYTEA,
+        archived_at TIMESTAMP DEFAULT NOW()
+    )
+    """,
+    "ALTER TABLE transaction_archive ADD COLUMN IF NOT EXISTS data BYTEA",
+    """
+    CREATE TABLE IF NOT EXISTS archived_flows (
+        due_date DATE NOT NULL,
+        bank_id INTEGER REFERENCES banks(id),
+        is_forecast BOOLEAN NOT NULL,
+        income NUMERIC(15,2) NOT NULL DEFAULT 0,
+        expense NUMERIC(15,2) NOT NULL DEFAULT 0
+    )
+    """,
+    """CREATE UNIQUE INDEX IF NOT EXISTS idx_archived_flows_key
+       ON archived_flows(due_date, (COALESCE(bank_id, 0)), is_forecast)""",
+
+    # ─── SALDO CORRENTE DOS BANCOS ──────────────────────────────────────────────
+    # banks.current_balance = initial_balance + lançamentos pagos do banco,
+    # mantido por delta a cada INSERT/UPDATE/DELETE (reconciliado por
+    # database.queries.reconcile_bank_balances). O mesmo delta corrige os
+    # snapshots de saldo a partir do vencimento do lançamento. Exclusões do
+    # arquivamento (bk.archiving) não mexem no saldo: ele passa a archived_flows.
+    """
+    CREATE OR REPLACE FUNCTION transactions_bank_balance() RETURNS trigger AS $$
+    DECLARE
+        old_effect NUMERIC(15,2) := 0;
+        new_effect NUMERIC(15,2) := 0;
+    BEGIN
+        IF current_setting('bk.archiving', TRUE) = 'on' THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'Pago' THEN
+            old_effect := CASE WHEN OLD.flow_type = 'Entrada' THEN OLD.total_value ELSE -OLD.total_value END;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'Pago' THEN
+            new_effect := CASE WHEN NEW.flow_type = 'Entrada' THEN NEW.total_value ELSE -NEW.total_value END;
+        END IF;
+        IF TG_OP = 'UPDATE' AND new_effect = old_effect AND OLD.due_date = NEW.due_date
+           AND OLD.bank_id IS NOT DISTINCT FROM NEW.bank_id THEN
+            RETURN NULL;
+        END IF;
+        IF old_effect <> 0 THEN
+            IF OLD.bank_id IS NOT NULL THEN
+                UPDATE banks SET current_balance = current_balance - old_effect WHERE id = OLD.bank_id;
+            END IF;
+            UPDATE balance_snapshots SET balance = balance - old_effect
+            WHERE snapshot_date >= OLD.due_date
+              AND bank_id IS NOT DISTINCT FROM (SELECT id FROM banks WHERE id = OLD.bank_id AND active);
+        END IF;
+        IF new_effect <> 0 THEN
+            IF NEW.bank_id IS NOT NULL THEN
+                UPDATE banks SET current_balance = current_balance + new_effect WHERE id = NEW.bank_id;
+            END IF;
+            UPDATE balance_snapshots SET balance = balance + new_effect
+            WHERE snapshot_date >= NEW.due_date
+              AND bank_id IS NOT DISTINCT FROM (SELECT id FROM banks WHERE id = NEW.bank_id AND active);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger
+                       WHERE tgname = 'trg_transactions_bank_balance' AND tgrelid = 'transactions'::regclass) THEN
+            CREATE TRIGGER trg_transactions_bank_balance
+                AFTER INSERT OR UPDATE OR DELETE ON transactions
+                FOR EACH ROW EXECUTE FUNCTION transactions_bank_balance();
+        END IF;
+    END
+    $$
+    """,
+
+    # ─── VERSÃO DOS DADOS ───────────────────────────────────────────────────────
+    # Toda escrita nas tabelas que alimentam relatórios avança a sequence, em
+    # qualquer processo (app, worker de jobs, scripts) — chave dos caches de
+    # relatórios via database.connection.data_version(). Sequence não trava:
+    # escritores concorrentes não disputam uma linha de contador.
+    "CREATE SEQUENCE IF NOT EXISTS data_version_seq",
+    """
+    CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+    BEGIN
+        PERFORM nextval('data_version_seq');
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    DO $$
+    DECLARE
+        tbl TEXT;
+    BEGIN
+        FOREACH tbl IN ARRAY ARRAY['transactions', 'categories', 'subcategories', 'suppliers',
+                                   'banks', 'budget', 'goals', 'archived_flows',
+                                   'transaction_archive'] LOOP
+            IF NOT EXISTS (SELECT 1 FROM pg_trigger
+                           WHERE tgname = 'trg_' || tbl || '_data_version' AND tgrelid = tbl::regclass) THEN
+                EXECUTE format('CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                               'FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()',
+                               'trg_' || tbl || '_data_version', tbl);
+            END IF;
+        END LOOP;
+    END
+    $$
+    """,
+
     # ─── ÍNDICES ────────────────────────────────────────────────────────────────
     "CREATE INDEX IF NOT EXISTS idx_transactions_due_date ON transactions(due_date)",
     "CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions(status)",
     "CREATE INDEX IF NOT EXISTS idx_transactions_flow_type ON transactions(flow_type)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_bank_id ON transactions(bank_id)",
     "CREATE INDEX IF NOT EXISTS idx_activities_end_date ON activities(end_date)",
     "CREATE INDEX IF NOT EXISTS idx_activities_parent ON activities(parent_id)",
+    """CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(priority DESC, run_after, id)
+       WHERE status = 'queued'""",
+    """CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs(dedupe_key)
+       WHERE status IN ('queued', 'running')""",
+    # Jobs diários (schedule_daily): um por tipo e dia, mesmo depois de concluído
+    """CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_daily ON jobs(dedupe_key)
+       WHERE dedupe_key LIKE 'daily:%'""",
 ]
 
 
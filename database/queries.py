@@ -4,8 +4,14 @@ Camada de acesso a dados - todas as queries SQL do sistema
 """
 
 import pandas as pd
+import pyarrow as pa
 from datetime import date, datetime, timedelta
-from database.connection import execute_query, db_cursor
+from dateutil.relativedelta import relativedelta
+from database.connection import (
+    execute_query, execute_arrow, iter_query, db_cursor, mark_data_changed, get_db_itersize,
+)
+from database import archive
+from utils.money import scalar_to_cents
 from typing import Optional
 import uuid
 
@@ -15,7 +21,11 @@ import uuid
 # ═══════════════════════════════════════════════════════════════════
 
 def get_home_summary():
-    """Retorna indicadores para o painel Home."""
+    """
+    Retorna indicadores para o painel Home. Só lê a tabela quente: em aberto
+    nunca é arquivado e o arquivamento não leva pagamentos do mês corrente
+    (database/archive.py); o saldo dos bancos já inclui o arquivado.
+    """
     today = date.today()
     in_3_days = today + timedelta(days=3)
 
@@ -25,33 +35,48 @@ def get_home_summary():
             COALESCE(SUM(CASE WHEN flow_type='Saída' AND status='Não pago' AND due_date BETWEEN CURRENT_DATE AND CURRENT_DATE+3 THEN total_value END), 0) AS due_soon,
             COALESCE(SUM(CASE WHEN flow_type='Entrada' AND status='Não pago' THEN total_value END), 0) AS receivable,
             COALESCE(SUM(CASE WHEN flow_type='Entrada' AND status='Pago' AND payment_date = CURRENT_DATE THEN total_value END), 0) AS income_today,
-            COALESCE(SUM(CASE WHEN flow_type='Saída' AND status='Pago' AND payment_date = CURRENT_DATE THEN total_value END), 0) AS expense_today
+            COALESCE(SUM(CASE WHEN flow_type='Saída' AND status='Pago' AND payment_date = CURRENT_DATE THEN total_value END), 0) AS expense_today,
+            (SELECT COALESCE(SUM(current_balance), 0) FROM banks WHERE active=TRUE) AS bank_balance
         FROM transactions
     """)
-    r = dict(rows[0]) if rows else {}
-    r['balance_today'] = r.get('income_today', 0) - r.get('expense_today', 0)
+    r = {f"{k}_cents": scalar_to_cents(v) for k, v in dict(rows[0]).items()} if rows else {}
+    r['balance_today_cents'] = r.get('income_today_cents', 0) - r.get('expense_today_cents', 0)
     return r
 
 
 def get_cashflow_chart_data(months: int = 6):
-    """Dados do gráfico de barras + linha para os últimos N meses."""
-    rows = execute_query("""
-        SELECT
-            DATE_TRUNC('month', due_date)::date AS month,
-            SUM(CASE WHEN flow_type='Entrada' AND status='Pago' THEN total_value ELSE 0 END) AS income,
-            SUM(CASE WHEN flow_type='Saída' AND status='Pago' THEN total_value ELSE 0 END) AS expense
-        FROM transactions
-        WHERE due_date >= DATE_TRUNC('month', NOW() - INTERVAL '%s months')
+    """Dados do gráfico de barras + linha para os últimos N meses (com os totais arquivados)."""
+    df = execute_query("""
+        SELECT month, SUM(income) AS income, SUM(expense) AS expense
+        FROM (
+            SELECT
+                DATE_TRUNC('month', due_date)::date AS month,
+                CASE WHEN flow_type='Entrada' AND status='Pago' THEN total_value ELSE 0 END AS income,
+                CASE WHEN flow_type='Saída' AND status='Pago' THEN total_value ELSE 0 END AS expense
+            FROM transactions
+            WHERE due_date >= DATE_TRUNC('month', NOW() - INTERVAL '%s months')
+            UNION ALL
+            SELECT DATE_TRUNC('month', due_date)::date, income, expense
+            FROM archived_flows
+            WHERE due_date >= DATE_TRUNC('month', NOW() - INTERVAL '%s months')
+        ) f
         GROUP BY 1
         ORDER BY 1
-    """, (months,))
-    df = pd.DataFrame(rows) if rows else pd.DataFrame(columns=['month', 'income', 'expense'])
+    """, (months, months), columnar=True, money=("income", "expense"))
     if not df.empty:
-        df['balance'] = df['income'] - df['expense']
-        df['accumulated'] = df['balance'].cumsum()
+        df['balance_cents'] = df['income_cents'] - df['expense_cents']
+        df['accumulated_cents'] = df['balance_cents'].cumsum()
     return df
 
 
+def get_cashflow_series(start_date: date, end_date: date, grain: str = "day"):
+    """
+    Fluxo realizado (Pago) por dia ou semana no intervalo, sem buracos, com o
+    saldo corrente — o livro-razão total (get_ledger) restrito ao que foi pago.
+    """
+    return get_ledger(start_date, end_date, grain, status='Pago')
+
+
 def get_today_activities():
     """Atividades que vencem hoje, ordenadas por prioridade."""
     priority_order = """
@@ -62,13 +87,12 @@ def get_today_activities():
             WHEN 'Não importante-Não urgente' THEN 4
         END
     """
-    rows = execute_query(f"""
+    return execute_query(f"""
         SELECT id, title, priority, status, end_date, parent_id
         FROM activities
         WHERE end_date = CURRENT_DATE AND status != 'Concluído'
         ORDER BY {priority_order}, title
-    """)
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    """, columnar=True)
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -76,8 +100,7 @@ def get_today_activities():
 # ═══════════════════════════════════════════════════════════════════
 
 def get_suppliers():
-    rows = execute_query("SELECT * FROM suppliers WHERE active=TRUE ORDER BY name")
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    return execute_query("SELECT * FROM suppliers WHERE active=TRUE ORDER BY name", columnar=True)
 
 
 def upsert_supplier(data: dict):
@@ -105,20 +128,19 @@ def delete_supplier(supplier_id: int):
 
 def get_categories(flow_type: Optional[str] = None):
     if flow_type and flow_type != 'Todos':
-        rows = execute_query("""
+        df = execute_query("""
             SELECT * FROM categories WHERE active=TRUE
             AND (flow_type=%s OR flow_type='Ambos') ORDER BY name
-        """, (flow_type,))
+        """, (flow_type,), columnar=True)
     else:
-        rows = execute_query("SELECT * FROM categories WHERE active=TRUE ORDER BY flow_type, name")
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+        df = execute_query("SELECT * FROM categories WHERE active=TRUE ORDER BY flow_type, name", columnar=True)
+    return df
 
 
 def get_subcategories(category_id: int):
-    rows = execute_query("""
+    return execute_query("""
         SELECT * FROM subcategories WHERE category_id=%s AND active=TRUE ORDER BY name
-    """, (category_id,))
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    """, (category_id,), columnar=True)
 
 
 def upsert_category(flow_type: str, name: str, cat_id: int = None):
@@ -155,38 +177,116 @@ def delete_subcategory(sub_id: int):
 # ═══════════════════════════════════════════════════════════════════
 
 def get_banks():
-    rows = execute_query("SELECT * FROM banks WHERE active=TRUE ORDER BY name")
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    return execute_query("SELECT * FROM banks WHERE active=TRUE ORDER BY name", columnar=True,
+                         money=("initial_balance", "current_balance"))
 
 
-def get_total_initial_balance():
+def get_total_initial_balance_cents() -> int:
     rows = execute_query("SELECT COALESCE(SUM(initial_balance),0) AS total FROM banks WHERE active=TRUE")
-    return float(rows[0]['total']) if rows else 0.0
+    return scalar_to_cents(rows[0]['total']) if rows else 0
 
 
 def upsert_bank(data: dict):
     if data.get('id'):
+        # O saldo corrente acompanha a mudança do saldo inicial (SET usa os valores antigos);
+        # nesse caso os snapshots de saldo deixam de valer e são descartados
         execute_query("""
-            UPDATE banks SET name=%s, account=%s, agency=%s, initial_balance=%s WHERE id=%s
-        """, (data['name'], data.get('account'), data.get('agency'), data.get('initial_balance', 0), data['id']),
-                      fetch=False)
+            WITH old AS (SELECT id, initial_balance FROM banks WHERE id=%s),
+            upd AS (
+                UPDATE banks SET name=%s, account=%s, agency=%s, initial_balance=%s,
+                       current_balance = current_balance + (%s - initial_balance)
+                WHERE id=%s
+                RETURNING id
+            )
+            DELETE FROM balance_snapshots
+            WHERE EXISTS (SELECT 1 FROM old JOIN upd USING (id) WHERE old.initial_balance <> %s)
+        """, (data['id'], data['name'], data.get('account'), data.get('agency'), data.get('initial_balance', 0),
+               data.get('initial_balance', 0), data['id'], data.get('initial_balance', 0)), fetch=False)
     else:
+        # Banco novo entra nos snapshots existentes com o saldo inicial, para que o
+        # trigger tenha onde aplicar lançamentos retroativos movidos para ele
         execute_query("""
-            INSERT INTO banks (name, account, agency, initial_balance, current_balance)
-            VALUES (%s,%s,%s,%s,%s)
+            WITH ins AS (
+                INSERT INTO banks (name, account, agency, initial_balance, current_balance)
+                VALUES (%s,%s,%s,%s,%s)
+                RETURNING id, initial_balance
+            )
+            INSERT INTO balance_snapshots (snapshot_date, bank_id, balance)
+            SELECT d.snapshot_date, ins.id, ins.initial_balance
+            FROM (SELECT DISTINCT snapshot_date FROM balance_snapshots) d CROSS JOIN ins
         """, (data['name'], data.get('account'), data.get('agency'),
                data.get('initial_balance', 0), data.get('initial_balance', 0)), fetch=False)
 
 
 def delete_bank(bank_id: int):
     execute_query("UPDATE banks SET active=FALSE WHERE id=%s", (bank_id,), fetch=False)
+    # Os lançamentos do banco passam para "Sem banco": snapshots por banco deixam de valer
+    invalidate_balance_snapshots()
+
+
+def reconcile_bank_balances() -> list:
+    """
+    Recalcula banks.current_balance (saldo inicial + lançamentos pagos,
+    inclusive os arquivados) e
+    corrige divergências do saldo mantido pelo trigger. Os bancos ficam
+    bloqueados durante o recálculo, então pagamentos concorrentes aplicam
+    seu delta depois, sobre o valor já corrigido. Retorna as correções.
+    """
+    with db_cursor() as cur:
+        cur.execute("SELECT id FROM banks ORDER BY id FOR UPDATE")
+        cur.execute("""
+            UPDATE banks b SET current_balance = x.expected
+            FROM (
+                SELECT bk.id, bk.current_balance AS previous,
+                       bk.initial_balance + COALESCE(SUM(
+                           CASE WHEN t.flow_type='Entrada' THEN t.total_value ELSE -t.total_value END
+                       ) FILTER (WHERE t.status='Pago'), 0)
+                         + COALESCE((SELECT SUM(af.income - af.expense) FROM archived_flows af
+                                     WHERE af.bank_id = bk.id), 0) AS expected
+                FROM banks bk
+                LEFT JOIN transactions t ON t.bank_id = bk.id
+                GROUP BY bk.id
+            ) x
+            WHERE b.id = x.id AND b.current_balance IS DISTINCT FROM x.expected
+            RETURNING b.id, b.name, x.previous, x.expected
+        """)
+        fixed = [dict(id=r['id'], name=r['name'], previous_cents=scalar_to_cents(r['previous']),
+                      expected_cents=scalar_to_cents(r['expected'])) for r in cur.fetchall()]
+    if fixed:
+        mark_data_changed()
+    return fixed
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PARTIÇÕES
+# ═══════════════════════════════════════════════════════════════════
+
+# transactions é particionada por ano de vencimento; anos futuros são criados
+# com antecedência e o que cair fora deles vai para transactions_default
+PARTITION_YEARS_AHEAD = 2
+
+
+def ensure_transaction_partitions(years=(), years_ahead: int = PARTITION_YEARS_AHEAD) -> int:
+    """
+    Cria as partições anuais que faltam (do ano atual até +years_ahead, os
+    `years` pedidos e os anos presentes na partição default, cujas linhas são
+    movidas para a partição nova). Retorna quantas partições foram criadas.
+    """
+    rows = execute_query("SELECT ensure_transactions_partitions(%s::integer[], %s) AS created",
+                         (list(years), years_ahead))
+    return rows[0]['created'] if rows else 0
 
 
 # ═══════════════════════════════════════════════════════════════════
 # MOVIMENTAÇÕES
 # ═══════════════════════════════════════════════════════════════════
 
-def get_transactions(start_date=None, end_date=None, status=None, flow_type=None, is_forecast=None):
+# Colunas em reais de _transactions_query — chegam como <nome>_cents
+_TRANSACTION_MONEY = ("value", "interest", "total_value")
+
+
+def _transactions_query(start_date=None, end_date=None, status=None, flow_type=None, is_forecast=None):
+    """Monta (sql, params) da listagem de movimentações com os filtros informados."""
     conditions = ["1=1"]
     params = []
     if start_date:
@@ -201,7 +301,7 @@ def get_transactions(start_date=None, end_date=None, status=None, flow_type=None
         conditions.append("t.is_forecast = %s"); params.append(is_forecast)
 
     where = " AND ".join(conditions)
-    rows = execute_query(f"""
+    sql = f"""
         SELECT
             t.id, t.flow_type, t.category_id, t.subcategory_id,
             t.supplier_id, t.bank_id, t.description,
@@ -220,12 +320,54 @@ def get_transactions(start_date=None, end_date=None, status=None, flow_type=None
         LEFT JOIN banks b ON t.bank_id = b.id
         WHERE {where}
         ORDER BY due_date, flow_type
-    """, params)
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    """
+    return sql, params
+
+
+def get_transactions(start_date=None, end_date=None, status=None, flow_type=None, is_forecast=None):
+    """Movimentações do intervalo, inclusive as arquivadas em Parquet (database/archive.py)."""
+    sql, params = _transactions_query(start_date, end_date, status, flow_type, is_forecast)
+    df = execute_query(sql, params, columnar=True, money=_TRANSACTION_MONEY)
+    return archive.with_archived(df, start_date, end_date, status, flow_type, is_forecast)
 
 
-def insert_transaction(data: dict, recurrence_months: int = 0):
-    """Insere movimentação, criando recorrências se necessário."""
+def get_transactions_table(start_date=None, end_date=None, status=None, flow_type=None,
+                           is_forecast=None, include_archived: bool = True) -> pa.Table:
+    """
+    Mesmas colunas/filtros de get_transactions em pyarrow.Table (execute_arrow),
+    para os grids grandes — vai direto para st.dataframe/st.data_editor sem
+    passar por pandas. flow_type/status ficam string (não `category`).
+    Grids editáveis passam include_archived=False: arquivados são somente leitura.
+    """
+    sql, params = _transactions_query(start_date, end_date, status, flow_type, is_forecast)
+    table = execute_arrow(sql, params, money=_TRANSACTION_MONEY)
+    if not include_archived:
+        return table
+    archived = archive.read_archived_table(start_date, end_date, status, flow_type, is_forecast)
+    if archived is None:
+        return table
+    table = pa.concat_tables([archived.select(table.column_names).cast(table.schema), table])
+    return table.sort_by([("due_date", "ascending"), ("flow_type", "ascending")])
+
+
+def iter_transactions(start_date=None, end_date=None, status=None, flow_type=None, is_forecast=None,
+                      itersize: int = None):
+    """
+    Mesmas colunas/filtros de get_transactions, mas gera DataFrames em blocos
+    de `itersize` linhas via cursor server-side (exportações e agregações longas).
+    Os blocos arquivados vêm primeiro; a ordem por vencimento vale dentro de cada parte.
+    """
+    yield from archive.iter_archived(start_date, end_date, status, flow_type, is_forecast,
+                                     batch_size=itersize or get_db_itersize())
+    sql, params = _transactions_query(start_date, end_date, status, flow_type, is_forecast)
+    yield from iter_query(sql, params, itersize=itersize, money=_TRANSACTION_MONEY)
+
+
+def insert_transaction(data: dict, recurrence_months: int = 0, on_progress=None):
+    """
+    Insere movimentação, criando recorrências se necessário.
+    `on_progress(fração)` é chamado a cada 500 registros (usado pelos jobs).
+    """
     group_id = str(uuid.uuid4()) if data.get('is_recurrent') else None
 
     base_due = data['due_date']
@@ -249,7 +391,9 @@ def insert_transaction(data: dict, recurrence_months: int = 0):
             records.append((next_data, next_due))
 
     with db_cursor() as cur:
-        for rec_data, due in records:
+        for i, (rec_data, due) in enumerate(records):
+            if on_progress and i % 500 == 0:
+                on_progress(i / len(records))
             cur.execute("""
                 INSERT INTO transactions
                 (flow_type, category_id, subcategory_id, supplier_id, bank_id,
@@ -273,38 +417,265 @@ def insert_transaction(data: dict, recurrence_months: int = 0):
                 rec_data.get('notes'),
                 rec_data.get('is_forecast', True)
             ))
+    mark_data_changed()
 
 
-def update_transaction(transaction_id: int, data: dict):
-    execute_query("""
-        UPDATE transactions SET flow_type=%s, category_id=%s, subcategory_id=%s,
-        value=%s, interest=%s, due_date=%s, status=%s, payment_date=%s,
-        description=%s, updated_at=NOW() WHERE id=%s
-    """, (data['flow_type'], data.get('category_id'), data.get('subcategory_id'),
-           data.get('value', 0), data.get('interest', 0), data['due_date'],
-           data.get('status', 'Não pago'), data.get('payment_date'),
-           data.get('description'), transaction_id), fetch=False)
-
-
-def delete_transaction(transaction_id: int):
-    execute_query("DELETE FROM transactions WHERE id=%s", (transaction_id,), fetch=False)
+def update_transaction(transaction_id: int, data: dict) -> bool:
+    """Atualiza a movimentação; False se o id não está na tabela (excluído ou arquivado)."""
+    with db_cursor() as cur:
+        cur.execute("""
+            UPDATE transactions SET flow_type=%s, category_id=%s, subcategory_id=%s,
+            value=%s, interest=%s, due_date=%s, status=%s, payment_date=%s,
+            description=%s, updated_at=NOW() WHERE id=%s
+        """, (data['flow_type'], data.get('category_id'), data.get('subcategory_id'),
+              data.get('value', 0), data.get('interest', 0), data['due_date'],
+              data.get('status', 'Não pago'), data.get('payment_date'),
+              data.get('description'), transaction_id))
+        updated = cur.rowcount > 0
+    mark_data_changed()
+    return updated
+
+
+def delete_transaction(transaction_id: int) -> bool:
+    """Exclui a movimentação; False se o id não está na tabela (excluído ou arquivado)."""
+    with db_cursor() as cur:
+        cur.execute("DELETE FROM transactions WHERE id=%s", (transaction_id,))
+        deleted = cur.rowcount > 0
+    mark_data_changed()
+    return deleted
 
 
 def get_cashflow_planned_vs_actual(months: int = 24):
-    """Retorna dados de previsto x realizado por mês."""
-    rows = execute_query("""
-        SELECT
-            DATE_TRUNC('month', due_date)::date AS month,
-            flow_type,
-            is_forecast,
-            SUM(total_value) AS total
-        FROM transactions
-        WHERE due_date >= DATE_TRUNC('month', NOW()) - INTERVAL '1 month'
-          AND due_date < DATE_TRUNC('month', NOW()) + INTERVAL '%s months'
+    """Retorna dados de previsto x realizado por mês (com os totais arquivados)."""
+    return execute_query("""
+        SELECT month, flow_type, is_forecast, SUM(total) AS total
+        FROM (
+            SELECT DATE_TRUNC('month', due_date)::date AS month, flow_type, is_forecast, total_value AS total
+            FROM transactions
+            WHERE due_date >= DATE_TRUNC('month', NOW()) - INTERVAL '1 month'
+              AND due_date < DATE_TRUNC('month', NOW()) + INTERVAL '%s months'
+            UNION ALL
+            SELECT DATE_TRUNC('month', af.due_date)::date, f.flow_type, af.is_forecast, f.total
+            FROM archived_flows af
+            CROSS JOIN LATERAL (VALUES ('Entrada', af.income), ('Saída', af.expense)) f(flow_type, total)
+            WHERE af.due_date >= DATE_TRUNC('month', NOW()) - INTERVAL '1 month'
+              AND af.due_date < DATE_TRUNC('month', NOW()) + INTERVAL '%s months'
+              AND f.total <> 0
+        ) x
         GROUP BY 1, 2, 3
         ORDER BY 1, 2
-    """, (months,))
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    """, (months, months), columnar=True, money=("total",))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# LIVRO-RAZÃO (SALDOS)
+# ═══════════════════════════════════════════════════════════════════
+
+# Intervalo do generate_series por granularidade do livro-razão
+LEDGER_GRAINS = {"day": "1 day", "week": "1 week", "month": "1 month"}
+
+
+def _ledger_query(start_date: date, end_date: date, grain: str, by_bank: bool,
+                  status: str = None, is_forecast: bool = None, from_snapshots: bool = True) -> tuple:
+    """
+    Monta (sql, params) do livro-razão — ver get_ledger. Com
+    from_snapshots=False o saldo é sempre recalculado desde o início.
+    """
+    if grain not in LEDGER_GRAINS:
+        raise ValueError(f"granularidade inválida: {grain}")
+    conditions, filter_params = ["1=1"], []
+    if status and status != 'Todos':
+        conditions.append("t.status = %s"); filter_params.append(status)
+    if is_forecast is not None:
+        conditions.append("t.is_forecast = %s"); filter_params.append(is_forecast)
+    where = " AND ".join(conditions)
+    # Lançamentos arquivados (database/archive.py) entram pelos totais diários — todos pagos
+    archived_conditions, archived_params = ["1=1"], []
+    if status and status not in ('Todos', 'Pago'):
+        archived_conditions.append("FALSE")
+    if is_forecast is not None:
+        archived_conditions.append("af.is_forecast = %s"); archived_params.append(is_forecast)
+    archived_where = " AND ".join(archived_conditions)
+    # Snapshots guardam o saldo realizado (Pago) — só servem de ponto de partida sem outros filtros
+    use_snapshots = "TRUE" if from_snapshots and status == 'Pago' and is_forecast is None else "FALSE"
+
+    if by_bank:
+        accounts = """
+            SELECT id AS bank_id, name AS bank_name, initial_balance FROM banks WHERE active=TRUE
+            UNION ALL
+            SELECT NULL, 'Sem banco', 0
+        """
+        bank, snapshot_bank = "b.id", "s.bank_id"
+    else:
+        accounts = """
+            SELECT NULL::integer AS bank_id, 'Total' AS bank_name, COALESCE(SUM(initial_balance), 0) AS initial_balance
+            FROM banks WHERE active=TRUE
+        """
+        bank, snapshot_bank = "NULL::integer", "NULL::integer"
+
+    sql = f"""
+        WITH accounts AS ({accounts}),
+        buckets AS (
+            SELECT generate_series(DATE_TRUNC(%s, %s::date), %s::date, %s::interval)::date AS period
+        ),
+        base AS (
+            SELECT MAX(snapshot_date) AS d FROM balance_snapshots WHERE snapshot_date < %s AND {use_snapshots}
+        ),
+        entries AS (
+            SELECT
+                {bank} AS bank_id,
+                t.due_date,
+                CASE WHEN t.flow_type='Entrada' THEN t.total_value ELSE 0 END AS income,
+                CASE WHEN t.flow_type='Saída' THEN t.total_value ELSE 0 END AS expense
+            FROM transactions t
+            LEFT JOIN banks b ON b.id = t.bank_id AND b.active
+            WHERE t.due_date <= %s
+              AND t.due_date > COALESCE((SELECT d FROM base), '-infinity'::date)
+              AND {where}
+            UNION ALL
+            SELECT {bank}, af.due_date, af.income, af.expense
+            FROM archived_flows af
+            LEFT JOIN banks b ON b.id = af.bank_id AND b.active
+            WHERE af.due_date <= %s
+              AND af.due_date > COALESCE((SELECT d FROM base), '-infinity'::date)
+              AND {archived_where}
+        ),
+        opening AS (
+            SELECT bank_id, SUM(net) AS net
+            FROM (
+                SELECT {snapshot_bank} AS bank_id, s.balance - COALESCE(sb.initial_balance, 0) AS net
+                FROM balance_snapshots s
+                LEFT JOIN banks sb ON sb.id = s.bank_id
+                WHERE s.snapshot_date = (SELECT d FROM base)
+                UNION ALL
+                SELECT bank_id, income - expense FROM entries WHERE due_date < %s
+            ) x
+            GROUP BY 1
+        ),
+        flows AS (
+            SELECT bank_id, DATE_TRUNC(%s, due_date)::date AS period,
+                   SUM(income) AS income, SUM(expense) AS expense
+            FROM entries WHERE due_date >= %s
+            GROUP BY 1, 2
+        )
+        SELECT
+            bk.period,
+            a.bank_id,
+            a.bank_name,
+            COALESCE(f.income, 0) AS income,
+            COALESCE(f.expense, 0) AS expense,
+            a.initial_balance + COALESCE(o.net, 0)
+              + SUM(COALESCE(f.income, 0) - COALESCE(f.expense, 0))
+                OVER (PARTITION BY a.bank_id ORDER BY bk.period) AS balance
+        FROM accounts a
+        CROSS JOIN buckets bk
+        LEFT JOIN flows f ON f.bank_id IS NOT DISTINCT FROM a.bank_id AND f.period = bk.period
+        LEFT JOIN opening o ON o.bank_id IS NOT DISTINCT FROM a.bank_id
+    """
+    params = [grain, start_date, end_date, LEDGER_GRAINS[grain], start_date, end_date, *filter_params,
+              end_date, *archived_params, start_date, grain, start_date]
+    return sql, params
+
+
+def get_ledger(start_date: date, end_date: date, grain: str = "month", by_bank: bool = False,
+               status: str = None, is_forecast: bool = None):
+    """
+    Saldo corrente por período (dia, semana ou mês) em uma query: um ponto por
+    período do intervalo, sem buracos, com entradas, saídas e o saldo no fim
+    do período — saldo inicial dos bancos ativos + tudo antes do intervalo +
+    SUM() OVER (ORDER BY período). Com by_bank=True, uma série por banco
+    (PARTITION BY); lançamentos sem banco ou de banco inativo ficam em
+    "Sem banco", de modo que a soma das séries é o saldo total.
+    `status`/`is_forecast` filtram os lançamentos como em get_transactions.
+    Com status='Pago', o saldo anterior ao intervalo parte do último snapshot
+    (balance_snapshots) e só os lançamentos posteriores a ele são lidos.
+    """
+    sql, params = _ledger_query(start_date, end_date, grain, by_bank, status, is_forecast)
+    df = execute_query(sql + " ORDER BY a.bank_name, bk.period", params, columnar=True,
+                       money=("income", "expense", "balance"))
+    if not by_bank and not df.empty:
+        df = df.drop(columns=['bank_id', 'bank_name'])
+    return df
+
+
+def get_balance_on(day: date) -> int:
+    """Saldo realizado total no fim de `day`, em centavos (snapshot + delta)."""
+    df = get_ledger(day, day, "day", status='Pago')
+    return int(df['balance_cents'].iloc[-1]) if not df.empty else 0
+
+
+def take_balance_snapshots(start_date: date = None, end_date: date = None) -> int:
+    """
+    Grava (ou regrava) os snapshots diários por banco de `start_date` a
+    `end_date` (padrão: ontem). Sem `start_date`, continua do dia seguinte ao
+    último snapshot — ou do primeiro lançamento, o que faz o backfill completo.
+    Retorna o número de linhas gravadas.
+    """
+    end_date = end_date or date.today() - timedelta(days=1)
+    if start_date is None:
+        rows = execute_query("""
+            SELECT COALESCE((SELECT MAX(snapshot_date) + 1 FROM balance_snapshots),
+                            LEAST((SELECT MIN(due_date) FROM transactions),
+                                  (SELECT MIN(due_date) FROM archived_flows))) AS start
+        """)
+        start_date = rows[0]['start'] if rows else None
+    if start_date is None or start_date > end_date:
+        return 0
+    sql, params = _ledger_query(start_date, end_date, "day", by_bank=True, status='Pago')
+    with db_cursor() as cur:
+        # Pagamentos concorrentes só atualizam os snapshots já existentes (trigger):
+        # o lock os faz esperar o fim da gravação, e os dias novos já os incluem
+        cur.execute("LOCK TABLE balance_snapshots IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(f"""
+            INSERT INTO balance_snapshots (snapshot_date, bank_id, balance)
+            SELECT period, bank_id, balance FROM ({sql}) ledger
+            ON CONFLICT (snapshot_date, (COALESCE(bank_id, 0)))
+            DO UPDATE SET balance = EXCLUDED.balance, created_at = NOW()
+        """, params)
+        return cur.rowcount
+
+
+def reconcile_balance_snapshots(start_date: date = None) -> list:
+    """
+    Recalcula os snapshots de `start_date` (padrão: o primeiro) até o último a
+    partir dos lançamentos pagos — sem partir de snapshot anterior — e corrige
+    os divergentes do que o trigger manteve. A tabela fica bloqueada para
+    escrita durante o recálculo, como os bancos em reconcile_bank_balances.
+    Retorna as correções.
+    """
+    with db_cursor() as cur:
+        cur.execute("LOCK TABLE balance_snapshots IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute("SELECT MIN(snapshot_date) AS first, MAX(snapshot_date) AS last FROM balance_snapshots")
+        bounds = cur.fetchone()
+        if bounds['last'] is None:
+            return []
+        start = max(start_date or bounds['first'], bounds['first'])
+        sql, params = _ledger_query(start, bounds['last'], "day", by_bank=True, status='Pago',
+                                    from_snapshots=False)
+        cur.execute(f"""
+            WITH expected AS ({sql}),
+            drift AS (
+                SELECT s.snapshot_date, s.bank_id, s.balance AS previous, e.balance AS expected
+                FROM balance_snapshots s
+                JOIN expected e ON e.period = s.snapshot_date AND e.bank_id IS NOT DISTINCT FROM s.bank_id
+                WHERE s.balance IS DISTINCT FROM e.balance
+            )
+            UPDATE balance_snapshots s SET balance = d.expected, created_at = NOW()
+            FROM drift d
+            WHERE s.snapshot_date = d.snapshot_date AND s.bank_id IS NOT DISTINCT FROM d.bank_id
+            RETURNING d.snapshot_date, d.bank_id, d.previous, d.expected
+        """, params)
+        fixed = [dict(snapshot_date=r['snapshot_date'], bank_id=r['bank_id'],
+                      previous_cents=scalar_to_cents(r['previous']),
+                      expected_cents=scalar_to_cents(r['expected'])) for r in cur.fetchall()]
+    if fixed:
+        mark_data_changed()
+    return fixed
+
+
+def invalidate_balance_snapshots():
+    """Descarta os snapshots (mudança de bancos altera a composição do saldo); o job refaz."""
+    execute_query("DELETE FROM balance_snapshots", fetch=False)
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -312,8 +683,8 @@ def get_cashflow_planned_vs_actual(months: int = 24):
 # ═══════════════════════════════════════════════════════════════════
 
 def get_goals():
-    rows = execute_query("SELECT * FROM goals ORDER BY time_bound, title")
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    return execute_query("SELECT * FROM goals ORDER BY time_bound, title", columnar=True,
+                         money=("target_value", "current_value"))
 
 
 def upsert_goal(data: dict):
@@ -344,15 +715,14 @@ def delete_goal(goal_id: int):
 # ═══════════════════════════════════════════════════════════════════
 
 def get_budget(year_month: date):
-    rows = execute_query("""
+    return execute_query("""
         SELECT b.*, c.name AS category_name, c.flow_type, s.name AS subcategory_name
         FROM budget b
         JOIN categories c ON b.category_id = c.id
         LEFT JOIN subcategories s ON b.subcategory_id = s.id
         WHERE b.year_month = %s
         ORDER BY c.flow_type, c.name, s.name
-    """, (year_month,))
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    """, (year_month,), columnar=True, money=("planned_value",))
 
 
 def upsert_budget(category_id: int, subcategory_id: Optional[int], year_month: date, planned_value: float):
@@ -365,21 +735,27 @@ def upsert_budget(category_id: int, subcategory_id: Optional[int], year_month: d
 
 
 def get_budget_vs_actual(year_month: date):
-    """Orçado x Realizado por categoria."""
-    rows = execute_query("""
-        SELECT c.name AS category, c.flow_type,
+    """Orçado x Realizado por categoria — o realizado inclui o arquivado do mês."""
+    df = execute_query("""
+        SELECT c.id AS category_id, c.name AS category, c.flow_type,
                COALESCE(b.planned_value, 0) AS planned,
                COALESCE(SUM(t.total_value), 0) AS actual
         FROM categories c
         LEFT JOIN budget b ON b.category_id = c.id AND b.year_month = %s
         LEFT JOIN transactions t ON t.category_id = c.id
-            AND DATE_TRUNC('month', t.due_date) = %s
+            AND t.due_date >= %s AND t.due_date < %s::date + INTERVAL '1 month'
             AND t.status = 'Pago'
         WHERE c.active = TRUE
-        GROUP BY c.name, c.flow_type, b.planned_value
+        GROUP BY c.id, c.name, c.flow_type, b.planned_value
         ORDER BY c.flow_type, c.name
-    """, (year_month, year_month))
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    """, (year_month, year_month, year_month), columnar=True, money=("planned", "actual"))
+    month_end = year_month + relativedelta(months=1) - timedelta(days=1)
+    archived = archive.read_archived_table(year_month, month_end, status='Pago')
+    if archived is not None and not df.empty:
+        by_category = archived.group_by("category_id").aggregate([("total_value_cents", "sum")]).to_pandas()
+        by_category = by_category.set_index("category_id")["total_value_cents_sum"]
+        df['actual_cents'] += df['category_id'].map(by_category).fillna(0).astype('int64')
+    return df
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -387,11 +763,10 @@ def get_budget_vs_actual(year_month: date):
 # ═══════════════════════════════════════════════════════════════════
 
 def get_activities():
-    rows = execute_query("""
+    return execute_query("""
         SELECT * FROM activities ORDER BY
             COALESCE(parent_id, id), parent_id NULLS FIRST, order_index, title
-    """)
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    """, columnar=True)
 
 
 def _safe_int(val):
@@ -443,6 +818,7 @@ def upsert_activity(data: dict):
             INSERT INTO activities (title, description, start_date, end_date, priority, status, parent_id)
             VALUES (%s,%s,%s,%s,%s,%s,%s) RETURNING id
         """, (title, desc, start_d, end_d, priority, status, parent_id))
+        mark_data_changed()
         return rows[0]['id'] if rows else None
 
 
@@ -455,13 +831,12 @@ def delete_activity(activity_id: int):
 # ═══════════════════════════════════════════════════════════════════
 
 def get_action_plans():
-    rows = execute_query("""
+    return execute_query("""
         SELECT ap.*, a.title AS activity_title
         FROM action_plan ap
         LEFT JOIN activities a ON ap.activity_id = a.id
         ORDER BY ap.when_date, ap.id
-    """)
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+    """, columnar=True, money=("how_much",))
 
 
 def upsert_action_plan(data: dict):
@@ -0,0 +1,44 @@
+"""
+jobs/archive.py
+Arquivamento do histórico frio — lançamentos pagos de meses fechados vão
+para Parquet guardado no Postgres (database/archive.py) e saem da tabela
+transactions:
+
+    python -m jobs.archive                         # meses com mais de 24 meses
+    python -m jobs.archive --before 2023-01-01 --dry-run
+    python -m jobs.archive --import-dir archive    # arquivo em disco da versão anterior
+"""
+
+import time
+import logging
+import argparse
+from datetime import date
+
+from database.archive import archive_transactions, import_archive_dir, DEFAULT_KEEP_MONTHS
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arquivamento de movimentações BK Finance em Parquet")
+    parser.add_argument("--before", type=date.fromisoformat,
+                        help=f"arquiva os meses anteriores ao desta data (padrão: {DEFAULT_KEEP_MONTHS} meses atrás)")
+    parser.add_argument("--dry-run", action="store_true", help="só lista o que seria arquivado")
+    parser.add_argument("--import-dir", help="carrega no banco os Parquet de um diretório de arquivo antigo")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    t0 = time.perf_counter()
+    if args.import_dir:
+        logger.info(f"{import_archive_dir(args.import_dir)} arquivos carregados de {args.import_dir}")
+        return
+    results = archive_transactions(args.before, dry_run=args.dry_run)
+    for r in results:
+        logger.info(f"{r['month']:%Y-%m}: {r['rows']:,} lançamentos" + (f" → {r['file']}" if r['file'] else ""))
+    total = sum(r['rows'] for r in results)
+    verb = "seriam arquivados" if args.dry_run else "arquivados no banco"
+    logger.info(f"{total:,} lançamentos de {len(results)} meses {verb} ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
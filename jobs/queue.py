@@ -0,0 +1,168 @@
+"""
+jobs/queue.py
+Fila de jobs durável sobre PostgreSQL (tabela `jobs`, claim com FOR UPDATE SKIP LOCKED)
+"""
+
+import os
+import json
+import logging
+from datetime import date
+
+import psycopg2.extras
+import streamlit as st
+
+from database.connection import db_cursor, execute_query
+
+logger = logging.getLogger(__name__)
+
+
+def _json(value):
+    return psycopg2.extras.Json(value, dumps=lambda o: json.dumps(o, default=str))
+
+
+def use_job_queue() -> bool:
+    """Se tarefas longas vão para a fila: secrets.toml [jobs] queue → JOB_QUEUE → desligado."""
+    try:
+        value = st.secrets["jobs"]["queue"]
+        return bool(value)
+    except Exception:
+        pass
+    return os.getenv("JOB_QUEUE", "").lower() in ("1", "true", "yes")
+
+
+def enqueue(kind: str, payload: dict = None, priority: int = 0, max_attempts: int = 3,
+            dedupe_key: str = None, delay_seconds: int = 0):
+    """
+    Enfileira um job e retorna seu id. Com `dedupe_key`, um job igual ainda
+    pendente/em execução não é duplicado (retorna None nesse caso).
+    """
+    rows = execute_query("""
+        INSERT INTO jobs (kind, payload, priority, max_attempts, dedupe_key, run_after)
+        VALUES (%s, %s, %s, %s, %s, NOW() + make_interval(secs => %s))
+        ON CONFLICT (dedupe_key) WHERE status IN ('queued', 'running') DO NOTHING
+        RETURNING id
+    """, (kind, _json(payload or {}), priority, max_attempts, dedupe_key, delay_seconds))
+    return rows[0]['id'] if rows else None
+
+
+def schedule_daily(kinds, day: date = None, worker: str = None) -> list:
+    """
+    Enfileira uma vez por dia cada tipo de `kinds` (dedupe_key
+    "daily:<tipo>:<data>", única em idx_jobs_daily mesmo depois de o job
+    terminar) — chamado pelo loop dos workers e pelo timer dos servidores
+    Streamlit (jobs/scheduler.py); réplicas concorrentes criam um job só.
+    Com `worker`, o job já nasce 'running' reservado para ele (execução
+    local, sem fila, tentativa única). Retorna os jobs criados (id, kind).
+    """
+    day = (day or date.today()).isoformat()
+    rows = execute_query("""
+        INSERT INTO jobs (kind, dedupe_key, status, locked_by, locked_at, attempts, max_attempts)
+        SELECT k, 'daily:' || k || ':' || %s,
+               CASE WHEN %s::text IS NULL THEN 'queued' ELSE 'running' END,
+               %s, CASE WHEN %s::text IS NULL THEN NULL ELSE NOW() END,
+               CASE WHEN %s::text IS NULL THEN 0 ELSE 1 END,
+               CASE WHEN %s::text IS NULL THEN 3 ELSE 1 END
+        FROM unnest(%s::text[]) AS k
+        ON CONFLICT DO NOTHING
+        RETURNING id, kind
+    """, (day, worker, worker, worker, worker, worker, list(kinds)))
+    return [dict(r) for r in rows or []]
+
+
+def claim_job(worker: str, kinds: list = None):
+    """
+    Reserva o próximo job pronto (maior prioridade, mais antigo) para este
+    worker. SKIP LOCKED permite vários workers concorrentes sem bloqueio.
+    """
+    kind_filter = "AND kind = ANY(%s)" if kinds else ""
+    params = [list(kinds)] if kinds else []
+    rows = execute_query(f"""
+        UPDATE jobs SET status='running', attempts=attempts+1,
+               locked_by=%s, locked_at=NOW(), updated_at=NOW()
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE status='queued' AND run_after <= NOW() {kind_filter}
+            ORDER BY priority DESC, run_after, id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING *
+    """, [worker] + params)
+    return dict(rows[0]) if rows else None
+
+
+def heartbeat_job(job_id: int, worker: str) -> bool:
+    """
+    Renova o lease (locked_at) de um job em execução por este worker. False se
+    o job não é mais dele (devolvido à fila por requeue_stale).
+    """
+    rows = execute_query("""
+        UPDATE jobs SET locked_at=NOW()
+        WHERE id=%s AND locked_by=%s AND status='running'
+        RETURNING id
+    """, (job_id, worker))
+    return bool(rows)
+
+
+def _update_job(query: str, params) -> bool:
+    """
+    UPDATE na tabela jobs sem passar por execute_query(fetch=False): a fila
+    não alimenta relatórios, então não invalida os caches (mark_data_changed).
+    """
+    with db_cursor() as cur:
+        cur.execute(query, params)
+        return cur.rowcount > 0
+
+
+def report_progress(job_id: int, fraction: float, message: str = None):
+    _update_job("""
+        UPDATE jobs SET progress=%s, progress_message=COALESCE(%s, progress_message), updated_at=NOW()
+        WHERE id=%s
+    """, (max(0.0, min(float(fraction), 1.0)), message, job_id))
+
+
+def complete_job(job_id: int, worker: str, result=None) -> bool:
+    """Conclui o job se ainda for deste worker; False se o lease foi perdido."""
+    return _update_job("""
+        UPDATE jobs SET status='done', progress=1, result=%s, locked_by=NULL,
+               finished_at=NOW(), updated_at=NOW()
+        WHERE id=%s AND locked_by=%s AND status='running'
+    """, (_json(result), job_id, worker))
+
+
+def fail_job(job_id: int, worker: str, error: str) -> bool:
+    """
+    Reagenda com backoff quadrático (30s × tentativas²) ou marca como
+    'failed', se o job ainda for deste worker; False se o lease foi perdido.
+    """
+    return _update_job("""
+        UPDATE jobs SET
+            status     = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            run_after  = NOW() + make_interval(secs => 30 * attempts * attempts),
+            finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END,
+            last_error = %s, locked_by=NULL, updated_at=NOW()
+        WHERE id=%s AND locked_by=%s AND status='running'
+    """, (error[:4000], job_id, worker))
+
+
+def requeue_stale(timeout_seconds: int = 600) -> int:
+    """
+    Devolve à fila jobs 'running' cujo lease (locked_at, renovado pelo
+    heartbeat do worker independente do handler) venceu — worker morto.
+    """
+    rows = execute_query("""
+        UPDATE jobs SET
+            status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            last_error = COALESCE(last_error, 'worker interrompido'),
+            locked_by=NULL, updated_at=NOW()
+        WHERE status='running' AND locked_at < NOW() - make_interval(secs => %s)
+        RETURNING id
+    """, (timeout_seconds,))
+    if rows:
+        logger.warning(f"{len(rows)} job(s) órfão(s) devolvido(s) à fila")
+    return len(rows)
+
+
+def get_job(job_id: int):
+    rows = execute_query("SELECT * FROM jobs WHERE id=%s", (job_id,))
+    return dict(rows[0]) if rows else None
@@ -0,0 +1,76 @@
+"""
+jobs/scheduler.py
+Timer da manutenção diária (DAILY_JOBS) no processo do servidor Streamlit —
+independe de sessões abertas. Com a fila ligada só agenda os jobs do dia;
+sem fila reserva o dia na tabela jobs e roda os handlers ali mesmo. Nos dois
+casos schedule_daily garante um job por tipo e dia entre todas as réplicas
+"""
+
+import os
+import socket
+import logging
+import threading
+import traceback
+from datetime import date
+
+import streamlit as st
+
+from jobs.queue import complete_job, fail_job, schedule_daily, use_job_queue
+from jobs.tasks import DAILY_JOBS, TASKS
+
+logger = logging.getLogger(__name__)
+
+# Verificação de virada do dia
+CHECK_INTERVAL_SECONDS = 600
+
+
+def use_daily_scheduler() -> bool:
+    """Se o servidor roda o timer: secrets.toml [jobs] scheduler → JOB_SCHEDULER → ligado."""
+    try:
+        value = st.secrets["jobs"]["scheduler"]
+        return bool(value)
+    except Exception:
+        pass
+    return os.getenv("JOB_SCHEDULER", "1").lower() in ("1", "true", "yes")
+
+
+class DailyScheduler(threading.Thread):
+    def __init__(self, interval: float = CHECK_INTERVAL_SECONDS):
+        super().__init__(name="daily-scheduler", daemon=True)
+        self.worker = f"{socket.gethostname()}:{os.getpid()}:scheduler"
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def tick(self):
+        """
+        Agenda (com fila) ou executa (sem fila) os jobs diários que nenhuma
+        réplica criou hoje. Retorna os jobs criados por este timer.
+        """
+        if use_job_queue():
+            return schedule_daily(DAILY_JOBS, date.today())
+        jobs = schedule_daily(DAILY_JOBS, date.today(), worker=self.worker)
+        for job in jobs:
+            kind = job['kind']
+            try:
+                result = TASKS[kind]({}, lambda f, msg=None: None)
+                complete_job(job['id'], self.worker, result)
+                logger.info(f"Job diário {kind}: {result}")
+            except Exception as e:
+                logger.warning(f"Job diário {kind} falhou: {e}")
+                fail_job(job['id'], self.worker, traceback.format_exc())
+        return jobs
+
+    def run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.warning(f"Falha ao agendar a manutenção diária: {e}")
+            if self.stop_event.wait(self.interval):
+                return
+
+
+def start_daily_scheduler(interval: float = CHECK_INTERVAL_SECONDS) -> DailyScheduler:
+    scheduler = DailyScheduler(interval)
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,34 @@
+"""
+jobs/snapshots.py
+Backfill dos snapshots diários de saldo (balance_snapshots) — o job noturno
+snapshot_balances só completa os dias que faltam:
+
+    python -m jobs.snapshots                       # do último snapshot (ou do 1º lançamento) até ontem
+    python -m jobs.snapshots --from 2020-01-01 --to 2025-12-31
+"""
+
+import time
+import logging
+import argparse
+from datetime import date
+
+from database.queries import take_balance_snapshots
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill dos snapshots de saldo BK Finance")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat,
+                        help="primeiro dia (padrão: dia seguinte ao último snapshot)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="último dia (padrão: ontem)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    t0 = time.perf_counter()
+    rows = take_balance_snapshots(args.start, args.end)
+    logger.info(f"{rows:,} snapshots gravados em {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
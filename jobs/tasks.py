@@ -0,0 +1,109 @@
+"""
+jobs/tasks.py
+Tipos de job executáveis pelo worker — cada handler recebe (payload, progress)
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+# Manutenção diária — agendada pelos workers (schedule_daily), com ou sem sessões abertas
+DAILY_JOBS = ("notify_due_items", "reconcile_bank_balances", "snapshot_balances", "ensure_partitions")
+
+
+def task(kind: str):
+    """Registra a função como handler do tipo de job `kind`."""
+    def register(fn):
+        TASKS[kind] = fn
+        return fn
+    return register
+
+
+@task("notify_due_items")
+def notify_due_items_task(payload: dict, progress):
+    from database.queries import get_items_for_notification
+    from utils.notifications import notify_due_items
+    items = list(get_items_for_notification())
+    progress(0.5, f"{len(items)} item(s) a notificar")
+    if items:
+        notify_due_items(items)
+    return {"items": len(items)}
+
+
+@task("insert_transaction")
+def insert_transaction_task(payload: dict, progress):
+    """Recorrências longas: payload = {"data": {...}, "recurrence_months": N}."""
+    from database.queries import insert_transaction
+    months = int(payload.get("recurrence_months", 0))
+    insert_transaction(payload["data"], recurrence_months=months,
+                       on_progress=lambda f: progress(f, "Gravando recorrências"))
+    return {"records": months + 1}
+
+
+@task("export_extrato")
+def export_extrato_task(payload: dict, progress):
+    """
+    Gera o extrato em arquivo no host do worker:
+    payload = {"start_date", "end_date", "is_forecast", "fmt"}.
+    """
+    from utils.reports import export_extrato
+    progress(0.1, "Lendo movimentações")
+    path = export_extrato(payload.get("start_date"), payload.get("end_date"),
+                          payload.get("is_forecast"), payload.get("fmt", "Excel"))
+    return {"path": path}
+
+
+@task("reconcile_bank_balances")
+def reconcile_bank_balances_task(payload: dict, progress):
+    """
+    Verificação periódica do saldo corrente e dos snapshots de saldo mantidos
+    pelo trigger: payload = {"snapshots_from"} (ISO) limita os snapshots
+    verificados; padrão: todos.
+    """
+    from datetime import date
+    from database.queries import reconcile_bank_balances, reconcile_balance_snapshots
+    fixed = reconcile_bank_balances()
+    for f in fixed:
+        logger.warning(f"Saldo do banco {f['name']} (id {f['id']}) divergente: "
+                       f"{f['previous_cents']} → {f['expected_cents']} centavos")
+    progress(0.5, "Verificando snapshots de saldo")
+    start = payload.get("snapshots_from")
+    snapshots = reconcile_balance_snapshots(date.fromisoformat(start) if start else None)
+    for f in snapshots:
+        logger.warning(f"Snapshot de {f['snapshot_date']} (banco {f['bank_id']}) divergente: "
+                       f"{f['previous_cents']} → {f['expected_cents']} centavos")
+    return {"fixed": len(fixed), "snapshots_fixed": len(snapshots)}
+
+
+@task("ensure_partitions")
+def ensure_partitions_task(payload: dict, progress):
+    """Partições anuais de transactions com antecedência (e as que a default pedir)."""
+    from database.queries import ensure_transaction_partitions
+    return {"created": ensure_transaction_partitions()}
+
+
+@task("archive_transactions")
+def archive_transactions_task(payload: dict, progress):
+    """Arquivamento em Parquet: payload = {"before"} (ISO; padrão 24 meses atrás)."""
+    from datetime import date
+    from database.archive import archive_transactions
+    before = payload.get("before")
+    results = archive_transactions(date.fromisoformat(before) if before else None, on_progress=progress)
+    return {"months": len(results), "rows": sum(r["rows"] for r in results)}
+
+
+@task("snapshot_balances")
+def snapshot_balances_task(payload: dict, progress):
+    """
+    Snapshots diários de saldo: sem payload, completa até ontem a partir do
+    último snapshot; payload = {"start_date", "end_date"} regrava um intervalo.
+    """
+    from datetime import date
+    from database.queries import take_balance_snapshots
+    start = payload.get("start_date")
+    end = payload.get("end_date")
+    rows = take_balance_snapshots(date.fromisoformat(start) if start else None,
+                                  date.fromisoformat(end) if end else None)
+    return {"rows": rows}
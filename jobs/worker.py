@@ -0,0 +1,114 @@
+"""
+jobs/worker.py
+Worker da fila de jobs — rode quantos processos quiser, em qualquer máquina
+com acesso ao banco:
+
+    python -m jobs.worker [--kinds notify_due_items,export_extrato] [--poll 2] [--once]
+"""
+
+import os
+import time
+import signal
+import socket
+import logging
+import threading
+import argparse
+import traceback
+
+from jobs.queue import (claim_job, complete_job, fail_job, heartbeat_job, report_progress,
+                        requeue_stale, schedule_daily)
+from jobs.tasks import DAILY_JOBS, TASKS
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(self, kinds=None, poll_interval: float = 2.0, stale_after: int = 600,
+                 schedule: bool = True):
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.kinds = kinds or None
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.schedule = schedule
+        self.stopping = False
+
+    def _heartbeat(self, job_id: int, done: threading.Event):
+        """Renova o lease do job a cada stale_after/4 s enquanto o handler roda (SMTP, exportações…)."""
+        interval = max(self.stale_after / 4, 1.0)
+        while not done.wait(interval):
+            try:
+                if not heartbeat_job(job_id, self.name):
+                    logger.warning(f"Job {job_id}: lease perdido (devolvido à fila por outro worker)")
+                    return
+            except Exception as e:
+                logger.warning(f"Job {job_id}: falha no heartbeat: {e}")
+
+    def stop(self, *_):
+        logger.info(f"Worker {self.name}: encerrando após o job atual")
+        self.stopping = True
+
+    def run_one(self) -> bool:
+        """Processa um job, se houver. Retorna False quando a fila está vazia."""
+        job = claim_job(self.name, self.kinds)
+        if job is None:
+            return False
+        job_id, kind = job['id'], job['kind']
+        handler = TASKS.get(kind)
+        logger.info(f"Job {job_id} ({kind}) — tentativa {job['attempts']}/{job['max_attempts']}")
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job_id, done), daemon=True,
+                         name=f"heartbeat-{job_id}").start()
+        try:
+            if handler is None:
+                raise ValueError(f"Tipo de job desconhecido: {kind}")
+            result = handler(job['payload'] or {}, lambda f, msg=None: report_progress(job_id, f, msg))
+            if complete_job(job_id, self.name, result):
+                logger.info(f"Job {job_id} ({kind}) concluído")
+            else:
+                logger.warning(f"Job {job_id} ({kind}) concluído, mas o lease foi perdido: resultado descartado")
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) falhou: {e}")
+            if not fail_job(job_id, self.name, traceback.format_exc()):
+                logger.warning(f"Job {job_id} ({kind}): lease perdido, falha não registrada")
+        finally:
+            done.set()
+        return True
+
+    def run(self, once: bool = False):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"Worker {self.name} iniciado (tipos: {', '.join(self.kinds or TASKS)})")
+        last_reap = 0.0
+        while not self.stopping:
+            if time.time() - last_reap > self.stale_after / 2:
+                requeue_stale(self.stale_after)
+                if self.schedule:
+                    # Manutenção diária não depende de alguém abrir o app
+                    for job in schedule_daily(DAILY_JOBS):
+                        logger.info(f"Job diário {job['id']} ({job['kind']}) agendado")
+                last_reap = time.time()
+            if self.run_one():
+                continue
+            if once:
+                break
+            time.sleep(self.poll_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker da fila de jobs BK Finance")
+    parser.add_argument("--kinds", help="tipos aceitos, separados por vírgula (padrão: todos)")
+    parser.add_argument("--poll", type=float, default=2.0, help="intervalo de polling com fila vazia (s)")
+    parser.add_argument("--stale-after", type=int, default=600,
+                        help="segundos sem heartbeat até um job 'running' voltar à fila")
+    parser.add_argument("--once", action="store_true", help="esvazia a fila e sai")
+    parser.add_argument("--no-schedule", action="store_true",
+                        help="não agenda os jobs diários (notificações, saldos, partições)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    kinds = [k.strip() for k in args.kinds.split(",")] if args.kinds else None
+    Worker(kinds, args.poll, args.stale_after, schedule=not args.no_schedule).run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,10 @@ from database.queries import (
 )
 from components.styles import page_header
 from utils.helpers import priority_emoji, status_icon, fmt_date
+from utils.money import to_reais_frame
+from utils.formatting import brl, date_column
+from utils.metrics import track_tab
+from utils.tracing import traced
 
 PRIORITIES = [
     "Urgente-Urgente",
@@ -24,6 +28,7 @@ PRIORITIES = [
 STATUS_LIST = ["Não iniciado", "Em andamento", "Concluído"]
 
 
+@traced("page.atividades")
 def render():
     page_header("Atividades", "Gestão de Tarefas, Ações e Produtividade", "📋")
 
@@ -33,17 +38,18 @@ def render():
         "🍅 Pomodoro",
     ])
 
-    with tabs[0]:
+    with tabs[0], track_tab("Atividades/Atividades"):
         _tab_atividades()
-    with tabs[1]:
+    with tabs[1], track_tab("Atividades/Plano de Ação"):
         _tab_plano_acao()
-    with tabs[2]:
+    with tabs[2], track_tab("Atividades/Pomodoro"):
         _tab_pomodoro()
 
 
 # ══════════════════════════════════════════════════════════════════
 # ABA 1 — ATIVIDADES
 # ══════════════════════════════════════════════════════════════════
+@traced("tab.atividades.atividades")
 def _tab_atividades():
     st.markdown("### 📋 Gerenciamento de Atividades")
 
@@ -179,6 +185,7 @@ def _render_activity_row(row, today, indent: bool = False):
 # ══════════════════════════════════════════════════════════════════
 # ABA 2 — PLANO DE AÇÃO (5W2H)
 # ══════════════════════════════════════════════════════════════════
+@traced("tab.atividades.plano_acao")
 def _tab_plano_acao():
     st.markdown("### 🗂️ Plano de Ação — 5W2H")
 
@@ -222,6 +229,7 @@ def _tab_plano_acao():
     # Exibir tabela
     cols_show = ['id', 'activity_title', 'what', 'why', 'who', 'when_date',
                  'where_place', 'how', 'how_much', 'status']
+    df_plans = to_reais_frame(df_plans)
     existing = [c for c in cols_show if c in df_plans.columns]
     rename_map = {
         'id': 'ID', 'activity_title': 'Atividade',
@@ -231,12 +239,15 @@ def _tab_plano_acao():
     }
 
     df_show = df_plans[existing].rename(columns=rename_map)
+    if 'Quando?' in df_show.columns:
+        df_show['Quando?'] = pd.to_datetime(df_show['Quando?'], errors='coerce')
     if 'Quanto?' in df_show.columns:
-        df_show['Quando?'] = pd.to_datetime(df_show['Quando?']).dt.strftime('%d/%m/%Y') if 'Quando?' in df_show.columns else ''
+        df_show['Quanto?'] = brl(df_show['Quanto?'].to_numpy())
 
     st.dataframe(
-        df_show.style.format({'Quanto?': 'R$ {:,.2f}'}, subset=['Quanto?'] if 'Quanto?' in df_show.columns else []),
-        use_container_width=True, hide_index=True, height=400
+        df_show,
+        use_container_width=True, hide_index=True, height=400,
+        column_config={'Quando?': date_column('Quando?')},
     )
 
     del_id = st.number_input("ID para excluir", min_value=0, step=1, key="del_plan")
@@ -249,6 +260,7 @@ def _tab_plano_acao():
 # ══════════════════════════════════════════════════════════════════
 # ABA 3 — POMODORO
 # ══════════════════════════════════════════════════════════════════
+@traced("tab.atividades.pomodoro")
 def _tab_pomodoro():
     st.markdown("### 🍅 Timer Pomodoro")
 
@@ -5,7 +5,8 @@ P�gina Finanças — Cadastros, Movimentações, Gerencial, Metas e Dashboards
 
 import streamlit as st
 import pandas as pd
-from datetime import date, datetime
+import pyarrow as pa
+from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import io
 
@@ -13,20 +14,39 @@ from database.queries import (
     get_suppliers, upsert_supplier, delete_supplier,
     get_categories, get_subcategories, upsert_category, upsert_subcategory,
     delete_category, delete_subcategory,
-    get_banks, upsert_bank, delete_bank, get_total_initial_balance,
-    get_transactions, insert_transaction, update_transaction, delete_transaction,
+    get_banks, upsert_bank, delete_bank,
+    get_transactions, get_transactions_table, insert_transaction, update_transaction, delete_transaction,
     get_goals, upsert_goal, delete_goal,
-    get_budget, upsert_budget, get_budget_vs_actual,
+    get_budget, upsert_budget, get_budget_vs_actual, get_cashflow_series, get_ledger,
 )
 from components.charts import (
     cashflow_bar_line, income_expense_bar, pie_by_category,
-    budget_bar_comparison,
+    budget_bar_comparison, cashflow_timeseries,
 )
 from components.styles import page_header
-from utils.helpers import fmt_currency, fmt_date, df_to_excel_bytes, month_range, card_metric
+from components.grids import render_grid
+from utils.formatting import brl_cents, money_column, money_columns, date_column
+from utils.helpers import fmt_currency, fmt_cents, fmt_date, month_range, card_metric
+from utils.export import EXPORT_FORMATS, serve_file_button
+from utils.executor import run_job
+from utils.reports import (
+    build_cashflow_table, build_recurrence_grid, export_extrato, extrato_table,
+    period_aggregates, period_result, gerencial_data, dashboard_monthly_frame, category_totals, dashboard_html,
+)
+from database.connection import data_version
+from database.archive import archived_files
+from utils.money import to_cents, cents_to_reais, sum_cents, to_reais_frame, to_reais_table
+from jobs.queue import use_job_queue, enqueue, get_job
+from utils.metrics import track_tab
+from utils.tracing import traced
+
+# Recorrências acima disso vão para a fila de jobs (quando habilitada)
+RECURRENCE_QUEUE_THRESHOLD = 24
+MAX_QUEUED_RECURRENCES = 360
 
 
 # ══════════════════════════════════════════════════════════════════
+@traced("page.financas")
 def render():
     page_header("Finanças", "Gestão Financeira Completa", "💼")
 
@@ -38,15 +58,15 @@ def render():
         "📈 Dashboards",
     ])
 
-    with tabs[0]:
+    with tabs[0], track_tab("Finanças/Cadastros"):
         _tab_cadastros()
-    with tabs[1]:
+    with tabs[1], track_tab("Finanças/Movimentações"):
         _tab_movimentacoes()
-    with tabs[2]:
+    with tabs[2], track_tab("Finanças/Gerencial"):
         _tab_gerencial()
-    with tabs[3]:
+    with tabs[3], track_tab("Finanças/Metas & Orçamento"):
         _tab_metas_orcamento()
-    with tabs[4]:
+    with tabs[4], track_tab("Finanças/Dashboards"):
         _tab_dashboards()
 
 
@@ -63,6 +83,7 @@ def _info_edit():
 # ══════════════════════════════════════════════════════════════════
 # ABA 1 — CADASTROS
 # ══════════════════════════════════════════════════════════════════
+@traced("tab.financas.cadastros")
 def _tab_cadastros():
     sub = st.radio(
         "Selecione",
@@ -175,7 +196,7 @@ def _cadastro_categorias():
         df_cats = get_categories()
         if not df_cats.empty:
             _info_edit()
-            df_cats_edit = df_cats[['id', 'flow_type', 'name']].copy()
+            df_cats_edit = df_cats[['id', 'flow_type', 'name']].astype({'flow_type': object})
             df_cats_edit.insert(0, 'Excluir', False)
             df_cats_edit = df_cats_edit.rename(columns={'flow_type': 'Tipo', 'name': 'Nome'})
 
@@ -284,11 +305,12 @@ def _cadastro_bancos():
         return
 
     _info_edit()
-    df_edit = df[['id', 'name', 'account', 'agency', 'initial_balance']].copy()
+    df_edit = to_reais_frame(df)[['id', 'name', 'account', 'agency', 'initial_balance', 'current_balance']]
     df_edit.insert(0, 'Excluir', False)
     df_edit = df_edit.rename(columns={
         'name': 'Banco', 'account': 'Conta',
         'agency': 'Agência', 'initial_balance': 'Saldo Inicial (R$)',
+        'current_balance': 'Saldo Atual (R$)',
     })
 
     edited = st.data_editor(
@@ -302,12 +324,16 @@ def _cadastro_bancos():
             "Banco":           st.column_config.TextColumn("Banco"),
             "Conta":           st.column_config.TextColumn("Conta", width="small"),
             "Agência":         st.column_config.TextColumn("Agência", width="small"),
-            "Saldo Inicial (R$)": st.column_config.NumberColumn("Saldo Inicial (R$)", format="R$ %.2f"),
+            "Saldo Inicial (R$)": money_column("Saldo Inicial (R$)"),
+            # Mantido pelo banco a cada pagamento (trigger) — somente leitura
+            "Saldo Atual (R$)": money_column("Saldo Atual (R$)", disabled=True),
         },
     )
 
-    total = float(edited[edited['Excluir'] == False]['Saldo Inicial (R$)'].sum())
-    st.markdown(f"**Total Saldo Inicial:** `{fmt_currency(total)}`")
+    kept = edited[edited['Excluir'] == False]
+    total = sum_cents(to_cents(kept['Saldo Inicial (R$)']))
+    st.markdown(f"**Total Saldo Inicial:** `{fmt_cents(total)}` &nbsp;·&nbsp; "
+                f"**Total Saldo Atual:** `{fmt_cents(sum_cents(to_cents(kept['Saldo Atual (R$)'])))}`")
 
     if _save_btn("💾 Salvar alterações nos bancos", "save_banks"):
         for _, row in edited[edited['Excluir'] == True].iterrows():
@@ -325,6 +351,7 @@ def _cadastro_bancos():
 # ══════════════════════════════════════════════════════════════════
 # ABA 2 — MOVIMENTAÇÕES
 # ══════════════════════════════════════════════════════════════════
+@traced("tab.financas.movimentacoes")
 def _tab_movimentacoes():
     st.markdown("### 💸 Movimentações Financeiras")
     sub_tabs = st.tabs([
@@ -349,6 +376,9 @@ def _form_movimentacao():
     df_banks    = get_banks()
     df_suppliers = get_suppliers()
 
+    if st.session_state.get('recurrence_jobs'):
+        _recurrence_jobs_progress()
+
     with st.form("form_transaction", clear_on_submit=True):
         c1, c2 = st.columns(2)
         flow_type   = c1.selectbox("Tipo*", ["Saída", "Entrada"])
@@ -389,7 +419,8 @@ def _form_movimentacao():
         cr1, cr2, cr3 = st.columns(3)
         is_recurrent = cr1.selectbox("Recorrente?", ["Não", "Sim"]) == "Sim"
         rec_type     = cr2.selectbox("Tipo", ["Mensal", "Diário", "Anual"]) if is_recurrent else "Mensal"
-        rec_months   = cr3.number_input("Qtd. ocorrências", 1, 24, 12) if is_recurrent else 0
+        max_months   = MAX_QUEUED_RECURRENCES if use_job_queue() else RECURRENCE_QUEUE_THRESHOLD
+        rec_months   = cr3.number_input("Qtd. ocorrências", 1, max_months, 12) if is_recurrent else 0
 
         notes = st.text_area("Observações", height=60)
 
@@ -397,16 +428,43 @@ def _form_movimentacao():
             if value <= 0:
                 st.error("Valor deve ser maior que zero.")
             else:
-                insert_transaction(dict(
+                data = dict(
                     flow_type=flow_type, category_id=cat_id, subcategory_id=sub_id,
                     supplier_id=sup_id, bank_id=bank_id, description=description,
                     value=value, interest=interest, due_date=due_date,
                     status=status, payment_date=payment_date,
                     is_recurrent=is_recurrent, recurrence_type=rec_type,
                     notes=notes, is_forecast=True,
-                ), recurrence_months=int(rec_months) if is_recurrent else 0)
-                st.success("✅ Movimentação salva!")
-                st.rerun()
+                )
+                months = int(rec_months) if is_recurrent else 0
+                if months > RECURRENCE_QUEUE_THRESHOLD:
+                    job_id = enqueue("insert_transaction", {"data": data, "recurrence_months": months}, priority=5)
+                    st.session_state.setdefault('recurrence_jobs', []).append(job_id)
+                    st.rerun()
+                else:
+                    insert_transaction(data, recurrence_months=months)
+                    st.success("✅ Movimentação salva!")
+                    st.rerun()
+
+
+@st.fragment(run_every=2)
+def _recurrence_jobs_progress():
+    """Progresso das recorrências longas enviadas à fila de jobs."""
+    pending = []
+    for job_id in st.session_state.get('recurrence_jobs', []):
+        job = get_job(job_id)
+        if job is None:
+            continue
+        if job['status'] == 'done':
+            st.success(f"✅ Recorrência #{job_id} gravada ({job['result'].get('records', 0)} lançamentos).")
+        elif job['status'] == 'failed':
+            last_line = (job['last_error'] or '').strip().splitlines()[-1:] or ['erro desconhecido']
+            st.error(f"❌ Recorrência #{job_id} falhou: {last_line[0]}")
+        else:
+            st.progress(float(job['progress'] or 0),
+                        text=f"⏳ Recorrência #{job_id} — {job['progress_message'] or 'na fila'}")
+            pending.append(job_id)
+    st.session_state.recurrence_jobs = pending
 
 
 def _grid_lancamentos():
@@ -419,9 +477,15 @@ def _grid_lancamentos():
     end_d    = cf2.date_input("Até", value=date.today(), key="lc_end")
     f_status = cf3.selectbox("Status", ["Todos", "Pago", "Não pago"], key="lc_stat")
 
-    df = get_transactions(start_date=start_d, end_date=end_d,
-                          status=f_status if f_status != "Todos" else None)
-    if df.empty:
+    # pyarrow.Table direto do COPY (execute_arrow): o grid não passa por pandas.
+    # Lançamentos arquivados (Parquet) são somente leitura e ficam fora do editor
+    table = get_transactions_table(start_date=start_d, end_date=end_d,
+                                   status=f_status if f_status != "Todos" else None,
+                                   include_archived=False)
+    if archived_files(start_d, end_d):
+        st.caption("🗄️ Meses arquivados do período não aparecem aqui (somente leitura — "
+                   "veja o extrato na aba Gerencial).")
+    if table.num_rows == 0:
         st.info("Nenhum lançamento no período.")
         return
 
@@ -431,27 +495,22 @@ def _grid_lancamentos():
     df_cats = get_categories()
     cat_names = ["—"] + df_cats['name'].tolist() if not df_cats.empty else ["—"]
 
-    # Colunas editáveis
-    cols = ['id', 'flow_type', 'category_name', 'subcategory_name',
-            'description', 'value', 'interest', 'total_value',
-            'due_date', 'payment_date', 'status']
-    existing = [c for c in cols if c in df.columns]
-    df_edit = df[existing].copy()
-    df_edit['due_date']     = pd.to_datetime(df_edit['due_date']).dt.date
-    df_edit['payment_date'] = pd.to_datetime(df_edit['payment_date'], errors='coerce').dt.date
-    df_edit.insert(0, 'Excluir', False)
-    df_edit = df_edit.rename(columns={
-        'flow_type': 'Tipo', 'category_name': 'Categoria',
+    # Colunas editáveis — as demais (notas, timestamps, ids de cadastro) não vão ao navegador
+    labels = {
+        'id': 'id', 'flow_type': 'Tipo', 'category_name': 'Categoria',
         'subcategory_name': 'Subcategoria', 'description': 'Descrição',
         'value': 'Valor', 'interest': 'Juros', 'total_value': 'Total',
         'due_date': 'Vencimento', 'payment_date': 'Dt. Pagamento', 'status': 'Status',
-    })
+    }
+    table = to_reais_table(table)
+    table = table.rename_columns([labels.get(c, c) for c in table.column_names])
+    table = table.add_column(0, 'Excluir', pa.array([False] * table.num_rows, pa.bool_()))
 
-    edited = st.data_editor(
-        df_edit,
+    edited = render_grid(
+        "lancamentos", table, columns=['Excluir', *labels.values()], editable=True,
+        key="editor_lancamentos",
         use_container_width=True,
         hide_index=True,
-        key="editor_lancamentos",
         column_config={
             "id":           st.column_config.NumberColumn("ID", disabled=True, width="small"),
             "Excluir":      st.column_config.CheckboxColumn("🗑️", width="small"),
@@ -459,19 +518,22 @@ def _grid_lancamentos():
             "Categoria":    st.column_config.SelectboxColumn("Categoria", options=cat_names),
             "Subcategoria": st.column_config.TextColumn("Subcategoria"),
             "Descrição":    st.column_config.TextColumn("Descrição"),
-            "Valor":        st.column_config.NumberColumn("Valor", format="R$ %.2f"),
-            "Juros":        st.column_config.NumberColumn("Juros", format="R$ %.2f"),
-            "Total":        st.column_config.NumberColumn("Total", disabled=True, format="R$ %.2f"),
-            "Vencimento":   st.column_config.DateColumn("Vencimento"),
-            "Dt. Pagamento": st.column_config.DateColumn("Dt. Pagamento"),
+            "Valor":        money_column("Valor"),
+            "Juros":        money_column("Juros"),
+            "Total":        money_column("Total", disabled=True),
+            "Vencimento":   date_column("Vencimento"),
+            "Dt. Pagamento": date_column("Dt. Pagamento"),
             "Status":       st.column_config.SelectboxColumn("Status", options=["Pago", "Não pago"]),
         },
     )
 
     if _save_btn("💾 Salvar alterações nos lançamentos", "save_lanc"):
-        # Excluir
+        if isinstance(edited, pa.Table):
+            edited = edited.to_pandas()
+        # Excluir (ids que sumiram da tabela — excluídos ou arquivados — são contados)
+        missing = 0
         for _, row in edited[edited['Excluir'] == True].iterrows():
-            delete_transaction(int(row['id']))
+            missing += not delete_transaction(int(row['id']))
 
         # Atualizar (buscar cat_id pelo nome)
         df_cats_full = get_categories()
@@ -479,7 +541,7 @@ def _grid_lancamentos():
 
         for _, row in edited[edited['Excluir'] == False].iterrows():
             cat_id = cat_id_map.get(row.get('Categoria'))
-            update_transaction(int(row['id']), dict(
+            missing += not update_transaction(int(row['id']), dict(
                 flow_type=row['Tipo'],
                 category_id=cat_id,
                 subcategory_id=None,
@@ -490,8 +552,12 @@ def _grid_lancamentos():
                 payment_date=row.get('Dt. Pagamento'),
                 description=row.get('Descrição'),
             ))
-        st.success("✅ Lançamentos salvos!")
-        st.rerun()
+        if missing:
+            st.warning(f"⚠️ {missing} lançamento(s) não existem mais na tabela (excluídos ou arquivados) "
+                       "e não foram alterados. Recarregue a página.")
+        else:
+            st.success("✅ Lançamentos salvos!")
+            st.rerun()
 
 
 def _recorrencias_grid():
@@ -500,88 +566,43 @@ def _recorrencias_grid():
     if df.empty:
         st.info("Nenhuma movimentação cadastrada.")
         return
-    recurrent = df[df['is_recurrent'] == True] if 'is_recurrent' in df.columns else pd.DataFrame()
-    if recurrent.empty:
+    months = month_range(24)
+    df_pivot = build_recurrence_grid(df, months)
+    if df_pivot.empty:
         st.info("Nenhuma movimentação recorrente cadastrada.")
         return
 
-    months = month_range(24)
-    pivot_rows = []
-    for _, row in recurrent.drop_duplicates(subset=['recurrence_group_id']).iterrows():
-        r = {
-            'Tipo': row.get('flow_type', ''),
-            'Categoria': row.get('category_name', ''),
-            'Subcategoria': row.get('subcategory_name', ''),
-            'Descrição': row.get('description', ''),
-        }
-        for m in months:
-            mask = (
-                (df['recurrence_group_id'] == row['recurrence_group_id']) &
-                (pd.to_datetime(df['due_date']).dt.to_period('M') == pd.Period(m, freq='M'))
-            )
-            match = df[mask]
-            r[m.strftime("%b/%Y")] = float(match['total_value'].sum()) if not match.empty else 0.0
-        pivot_rows.append(r)
-
-    df_pivot = pd.DataFrame(pivot_rows)
-    st.dataframe(df_pivot, use_container_width=True, height=400)
-
-
-def _build_cashflow_table(is_forecast: bool):
-    today  = date.today().replace(day=1)
-    months = [today + relativedelta(months=i) for i in range(24)]
-    month_labels = [m.strftime("%b/%Y") for m in months]
-    df_cats = get_categories()
-    rows = []
-    for _, cat in df_cats.iterrows():
-        df_subs = get_subcategories(int(cat['id']))
-        entries = [(None, '—')] if df_subs.empty else [(int(s['id']), s['name']) for _, s in df_subs.iterrows()]
-        for sub_id, sub_name in entries:
-            row = {'Tipo': cat['flow_type'], 'Categoria': cat['name'], 'Subcategoria': sub_name}
-            for m in months:
-                df_t = get_transactions(
-                    start_date=m,
-                    end_date=(m + relativedelta(months=1) - relativedelta(days=1)),
-                    flow_type=cat['flow_type'],
-                    is_forecast=is_forecast,
-                )
-                if not df_t.empty:
-                    if sub_id:
-                        val = float(df_t[df_t['subcategory_id'] == sub_id]['total_value'].sum())
-                    else:
-                        val = float(df_t[df_t['category_id'] == int(cat['id'])]['total_value'].sum())
-                else:
-                    val = 0.0
-                row[m.strftime("%b/%Y")] = val
-            rows.append(row)
-    return pd.DataFrame(rows), month_labels
+    # Grid só de leitura: valores vão como texto R$ 1.234,56
+    for m in [m.strftime("%b/%Y") for m in months]:
+        df_pivot[m] = brl_cents(df_pivot[m])
+    render_grid("recorrencias", df_pivot, use_container_width=True, height=400, hide_index=True)
 
 
-def _render_cashflow_table(df_table, month_labels, label: str, editable: bool = False):
+def _render_cashflow_table(df_table, month_labels, label: str, is_forecast: bool, editable: bool = False):
     if df_table.empty:
         st.info(f"Nenhum dado {label.lower()}.")
         return
 
-    initial = get_total_initial_balance()
-    acc = initial
+    by_type = df_table.groupby('Tipo')[month_labels].sum().reindex(['Saída', 'Entrada'], fill_value=0)
+    # Saldo acumulado do livro-razão: inclui saldos iniciais e tudo antes da janela
+    start = date.today().replace(day=1)
+    ledger = get_ledger(start, start + relativedelta(months=len(month_labels), days=-1), "month",
+                        is_forecast=is_forecast)
+    balances = dict(zip(pd.to_datetime(ledger['period']).dt.strftime("%b/%Y"), ledger['balance_cents']))
 
-    totals_out  = {'Tipo': 'TOTAL SAÍDAS',    'Categoria': '', 'Subcategoria': ''}
-    totals_in   = {'Tipo': 'TOTAL ENTRADAS',  'Categoria': '', 'Subcategoria': ''}
-    saldo_mes   = {'Tipo': 'SALDO MÊS',       'Categoria': '', 'Subcategoria': ''}
-    saldo_acc   = {'Tipo': 'SALDO ACUMULADO', 'Categoria': '', 'Subcategoria': ''}
-
-    for m in month_labels:
-        out = float(df_table[df_table['Tipo'] == 'Saída'][m].sum()) if m in df_table.columns else 0
-        inc = float(df_table[df_table['Tipo'] == 'Entrada'][m].sum()) if m in df_table.columns else 0
-        bal = inc - out
-        acc += bal
-        totals_out[m] = out
-        totals_in[m]  = inc
-        saldo_mes[m]  = bal
-        saldo_acc[m]  = acc
+    totals_out  = {'Tipo': 'TOTAL SAÍDAS',    'Categoria': '', 'Subcategoria': '', **by_type.loc['Saída'].to_dict()}
+    totals_in   = {'Tipo': 'TOTAL ENTRADAS',  'Categoria': '', 'Subcategoria': '', **by_type.loc['Entrada'].to_dict()}
+    saldo_mes   = {'Tipo': 'SALDO MÊS',       'Categoria': '', 'Subcategoria': '',
+                   **(by_type.loc['Entrada'] - by_type.loc['Saída']).to_dict()}
+    saldo_acc   = {'Tipo': 'SALDO ACUMULADO', 'Categoria': '', 'Subcategoria': '',
+                   **{m: balances.get(m, 0) for m in month_labels}}
 
     df_footer  = pd.DataFrame([totals_out, totals_in, saldo_mes, saldo_acc])
     df_display = pd.concat([df_table, df_footer], ignore_index=True)
+    # Editor precisa de números; a visualização vai como texto R$ 1.234,56
+    to_display = cents_to_reais if editable else brl_cents
+    for m in month_labels:
+        df_display[m] = to_display(df_display[m])
 
     # Colunas de totais nunca editáveis
     n_data = len(df_table)
@@ -594,12 +615,11 @@ def _render_cashflow_table(df_table, month_labels, label: str, editable: bool =
             "Tipo":        st.column_config.TextColumn(disabled=True),
             "Categoria":   st.column_config.TextColumn(disabled=True),
             "Subcategoria":st.column_config.TextColumn(disabled=True),
+            **money_columns(month_labels),
         }
-        for m in month_labels:
-            col_cfg[m] = st.column_config.NumberColumn(m, format="R$ %.2f")
 
-        edited = st.data_editor(
-            df_display,
+        edited = render_grid(
+            f"fluxo_{label.lower()}", df_display, editable=True,
             use_container_width=True,
             height=520,
             hide_index=True,
@@ -612,25 +632,38 @@ def _render_cashflow_table(df_table, month_labels, label: str, editable: bool =
         st.caption("ℹ️ Para alterar valores, edite os lançamentos na aba **Lançamentos**.")
     else:
         # Apenas visualização, sem edição
-        st.dataframe(df_display, use_container_width=True, height=520, hide_index=True)
+        render_grid(f"fluxo_{label.lower()}", df_display, use_container_width=True, height=520,
+                    hide_index=True)
+
+
+def _build_cashflow_table(is_forecast: bool):
+    """Pivot de 24 meses calculado no pool de processos; None enquanto não fica pronto."""
+    label = "Fluxo de caixa previsto" if is_forecast else "Fluxo de caixa realizado"
+    return run_job(build_cashflow_table, is_forecast, date.today().replace(day=1),
+                   label=label, cache_key=data_version())
 
 
 def _tabela_previsto():
     st.markdown("#### 📋 Fluxo de Caixa Previsto")
-    df_table, month_labels = _build_cashflow_table(is_forecast=True)
-    _render_cashflow_table(df_table, month_labels, "Previsto", editable=False)
+    result = _build_cashflow_table(is_forecast=True)
+    if result is not None:
+        _render_cashflow_table(*result, "Previsto", is_forecast=True)
 
 
 def _tabela_realizado():
     st.markdown("#### ✅ Fluxo de Caixa Realizado")
-    df_table, month_labels = _build_cashflow_table(is_forecast=False)
-    _render_cashflow_table(df_table, month_labels, "Realizado", editable=False)
+    result = _build_cashflow_table(is_forecast=False)
+    if result is not None:
+        _render_cashflow_table(*result, "Realizado", is_forecast=False)
 
 
 def _tabela_diferenca():
     st.markdown("#### 📊 Diferença: Previsto × Realizado")
-    df_prev, month_labels = _build_cashflow_table(is_forecast=True)
-    df_real, _            = _build_cashflow_table(is_forecast=False)
+    prev = _build_cashflow_table(is_forecast=True)
+    real = _build_cashflow_table(is_forecast=False)
+    if prev is None or real is None:
+        return
+    (df_prev, month_labels), (df_real, _) = prev, real
     if df_prev.empty and df_real.empty:
         st.info("Sem dados para comparação.")
         return
@@ -638,13 +671,14 @@ def _tabela_diferenca():
     for m in month_labels:
         p = df_prev[m].fillna(0) if m in df_prev.columns else 0
         r = df_real[m].fillna(0) if m in df_real.columns else 0
-        df_diff[m] = p - r
-    st.dataframe(df_diff, use_container_width=True, height=500, hide_index=True)
+        df_diff[m] = brl_cents(p - r)
+    render_grid("fluxo_diferenca", df_diff, use_container_width=True, height=500, hide_index=True)
 
 
 # ══════════════════════════════════════════════════════════════════
 # ABA 3 — GERENCIAL
 # ══════════════════════════════════════════════════════════════════
+@traced("tab.financas.gerencial")
 def _tab_gerencial():
     st.markdown("### 📊 Gerencial")
     col_f1, col_f2, col_f3 = st.columns(3)
@@ -653,45 +687,36 @@ def _tab_gerencial():
     view_mode  = col_f3.selectbox("Visualização", ["Previsto", "Realizado", "Ambos"])
     is_forecast = {"Previsto": True, "Realizado": False, "Ambos": None}.get(view_mode)
 
-    df_all = get_transactions(start_date=start_date, end_date=end_date)
-    if is_forecast is not None and not df_all.empty:
-        df_all = df_all[df_all['is_forecast'] == is_forecast]
+    # Com o modo analítico (database/analytics.py) os agregados e o extrato vêm da réplica local
+    df_all, agg, agg_p, agg_r = gerencial_data(start_date, end_date, date.today(), is_forecast)
 
     st.markdown("#### 💹 Fluxo de Caixa")
-    if not df_all.empty:
-        df_all['month'] = pd.to_datetime(df_all['due_date']).dt.to_period('M').dt.to_timestamp()
-        df_cf = df_all.groupby(['month', 'flow_type'])['total_value'].sum().reset_index()
-        df_piv = df_cf.pivot(index='month', columns='flow_type', values='total_value').fillna(0).reset_index()
+    if agg is not None:
+        df_piv = agg['monthly'].unstack('flow_type', fill_value=0).reset_index()
         df_piv.columns.name = None
         df_piv['month'] = df_piv['month'].dt.strftime('%b/%Y')
         if 'Entrada' not in df_piv.columns: df_piv['Entrada'] = 0
         if 'Saída'   not in df_piv.columns: df_piv['Saída']   = 0
-        df_piv = df_piv.rename(columns={'Entrada': 'income', 'Saída': 'expense'})
-        st.plotly_chart(income_expense_bar(df_piv, f"Fluxo de Caixa — {view_mode}"), use_container_width=True)
+        df_piv = df_piv.rename(columns={'Entrada': 'income_cents', 'Saída': 'expense_cents'})
+        st.plotly_chart(income_expense_bar(to_reais_frame(df_piv), f"Fluxo de Caixa — {view_mode}"),
+                        use_container_width=True)
     else:
         st.info("Sem dados para o período.")
 
     st.markdown("#### 🥧 Distribuição por Categoria")
     col_p1, col_p2 = st.columns(2)
     with col_p1:
-        df_p = get_transactions(start_date=start_date, end_date=end_date, is_forecast=True)
-        if not df_p.empty:
-            df_p = df_p[df_p['flow_type'] == 'Saída']
-            df_agg = df_p.groupby('category_name')['total_value'].sum().reset_index()
-            df_agg.columns = ['category', 'value']
-            st.plotly_chart(pie_by_category(df_agg, "Previsto por Categoria"), use_container_width=True)
+        if agg_p is not None:
+            df_agg = category_totals(agg_p['by_category'], 'Saída')
+            st.plotly_chart(pie_by_category(to_reais_frame(df_agg), "Previsto por Categoria"), use_container_width=True)
     with col_p2:
-        df_r = get_transactions(start_date=start_date, end_date=end_date, is_forecast=False)
-        if not df_r.empty:
-            df_r = df_r[df_r['flow_type'] == 'Saída']
-            df_agg2 = df_r.groupby('category_name')['total_value'].sum().reset_index()
-            df_agg2.columns = ['category', 'value']
-            st.plotly_chart(pie_by_category(df_agg2, "Realizado por Categoria"), use_container_width=True)
+        if agg_r is not None:
+            df_agg2 = category_totals(agg_r['by_category'], 'Saída')
+            st.plotly_chart(pie_by_category(to_reais_frame(df_agg2), "Realizado por Categoria"), use_container_width=True)
 
     st.markdown("#### 📑 DRE")
-    if not df_all.empty:
-        total_in  = float(df_all[df_all['flow_type'] == 'Entrada']['total_value'].sum())
-        total_out = float(df_all[df_all['flow_type'] == 'Saída']['total_value'].sum())
+    if agg is not None:
+        total_in, total_out = agg['total_in'], agg['total_out']
         resultado = total_in - total_out
         res_color = "#10B981" if resultado >= 0 else "#EF4444"
         st.markdown(f"""
@@ -699,46 +724,51 @@ def _tab_gerencial():
             <table style="width:100%;border-collapse:collapse">
                 <tr style="border-bottom:1px solid #334155">
                     <td style="padding:10px;color:#94A3B8">Receitas Totais</td>
-                    <td style="padding:10px;text-align:right;color:#10B981;font-weight:600">{fmt_currency(total_in)}</td>
+                    <td style="padding:10px;text-align:right;color:#10B981;font-weight:600">{fmt_cents(total_in)}</td>
                 </tr>
                 <tr style="border-bottom:1px solid #334155">
                     <td style="padding:10px;color:#94A3B8">(-) Despesas Totais</td>
-                    <td style="padding:10px;text-align:right;color:#EF4444;font-weight:600">({fmt_currency(total_out)})</td>
+                    <td style="padding:10px;text-align:right;color:#EF4444;font-weight:600">({fmt_cents(total_out)})</td>
                 </tr>
                 <tr style="background:#0F172A">
                     <td style="padding:12px;color:#F1F5F9;font-weight:700;font-size:16px">= Resultado Líquido</td>
-                    <td style="padding:12px;text-align:right;color:{res_color};font-weight:700;font-size:18px">{fmt_currency(resultado)}</td>
+                    <td style="padding:12px;text-align:right;color:{res_color};font-weight:700;font-size:18px">{fmt_cents(resultado)}</td>
                 </tr>
             </table>
         </div>
         """, unsafe_allow_html=True)
 
     st.markdown("#### 📜 Extrato do Período")
-    if not df_all.empty:
-        cols_show = ['due_date', 'flow_type', 'category_name', 'subcategory_name',
-                     'description', 'total_value', 'status', 'bank_name']
-        existing  = [c for c in cols_show if c in df_all.columns]
-        df_show   = df_all[existing].copy()
-        df_show['due_date'] = pd.to_datetime(df_show['due_date']).dt.strftime('%d/%m/%Y')
-        st.dataframe(
-            df_show.rename(columns={
-                'due_date': 'Vencimento', 'flow_type': 'Tipo', 'category_name': 'Categoria',
-                'subcategory_name': 'Subcategoria', 'description': 'Descrição',
-                'total_value': 'Valor Total', 'status': 'Status', 'bank_name': 'Banco',
-            }).style.format({'Valor Total': 'R$ {:,.2f}'}),
-            use_container_width=True, hide_index=True,
+    extrato = extrato_table(df_all)
+    if extrato.num_rows:
+        render_grid(
+            "extrato", extrato, use_container_width=True, hide_index=True,
+            column_config={
+                "Vencimento":  date_column("Vencimento"),
+                "Valor Total": money_column("Valor Total"),
+            },
         )
-        excel_bytes = df_to_excel_bytes(df_show)
-        st.download_button("📥 Exportar Excel", data=excel_bytes,
-                           file_name=f"extrato_{start_date}_{end_date}.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        # Exportação roda no pool de processos: lê o período em blocos e grava em arquivo temporário
+        ce1, ce2 = st.columns(2)
+        fmt = ce1.selectbox("Formato", list(EXPORT_FORMATS), key="extrato_fmt", label_visibility="collapsed")
+        params = (start_date, end_date, is_forecast, fmt)
+        if ce2.button("📥 Gerar exportação", key="extrato_export", use_container_width=True):
+            st.session_state.extrato_export = params
+        if st.session_state.get("extrato_export") == params:
+            path = run_job(export_extrato, *params, label="Exportação do extrato",
+                           cache_key=data_version(), cleanup_file=True)
+            if path:
+                serve_file_button(path, fmt, f"extrato_{start_date}_{end_date}",
+                                  key="extrato_download", cleanup=False)
     else:
         st.info("Nenhum lançamento no período.")
 
 
+
 # ══════════════════════════════════════════════════════════════════
 # ABA 4 — METAS & ORÇAMENTO
 # ══════════════════════════════════════════════════════════════════
+@traced("tab.financas.metas_orcamento")
 def _tab_metas_orcamento():
     st.markdown("### 🎯 Metas e Orçamento")
     sub = st.radio("Seção", ["🎯 Metas SMART", "💰 Orçamento"], horizontal=True, label_visibility="collapsed")
@@ -781,7 +811,8 @@ def _metas_smart():
 
     # Grid editável de metas
     _info_edit()
-    df_edit = df[['id', 'title', 'target_value', 'current_value', 'time_bound', 'status']].copy()
+    df_edit = to_reais_frame(df)[['id', 'title', 'target_value', 'current_value', 'time_bound', 'status']]
+    df_edit = df_edit.astype({'status': object})
     df_edit.insert(0, 'Excluir', False)
     df_edit['time_bound'] = pd.to_datetime(df_edit['time_bound'], errors='coerce').dt.date
     df_edit = df_edit.rename(columns={
@@ -803,9 +834,9 @@ def _metas_smart():
             "id":        st.column_config.NumberColumn("ID", disabled=True, width="small"),
             "Excluir":   st.column_config.CheckboxColumn("🗑️", width="small"),
             "Meta":      st.column_config.TextColumn("Meta"),
-            "Alvo (R$)": st.column_config.NumberColumn("Alvo (R$)", format="R$ %.2f"),
-            "Atual (R$)":st.column_config.NumberColumn("Atual (R$)", format="R$ %.2f"),
-            "Prazo":     st.column_config.DateColumn("Prazo"),
+            "Alvo (R$)": money_column("Alvo (R$)"),
+            "Atual (R$)":money_column("Atual (R$)"),
+            "Prazo":     date_column("Prazo"),
             "Status":    st.column_config.SelectboxColumn("Status", options=["Em andamento", "Concluída", "Cancelada"]),
             "% Progresso": st.column_config.ProgressColumn("Progresso", min_value=0, max_value=100, format="%.1f%%"),
         },
@@ -843,12 +874,12 @@ def _orcamento():
     # Montar grid
     rows = []
     for _, cat in df_cats.iterrows():
-        existing = df_budget[df_budget['category_id'] == cat['id']]['planned_value'].values
+        existing = df_budget[df_budget['category_id'] == cat['id']]['planned_value_cents'].values if not df_budget.empty else []
         rows.append({
             'cat_id': int(cat['id']),
             'Tipo': cat['flow_type'],
             'Categoria': cat['name'],
-            'Orçado (R$)': float(existing[0]) if len(existing) > 0 else 0.0,
+            'Orçado (R$)': existing[0] / 100 if len(existing) > 0 else 0.0,
         })
     df_bud_edit = pd.DataFrame(rows)
 
@@ -861,7 +892,7 @@ def _orcamento():
             "cat_id":      st.column_config.NumberColumn("ID", disabled=True, width="small"),
             "Tipo":        st.column_config.TextColumn("Tipo", disabled=True),
             "Categoria":   st.column_config.TextColumn("Categoria", disabled=True),
-            "Orçado (R$)": st.column_config.NumberColumn("Orçado (R$)", format="R$ %.2f"),
+            "Orçado (R$)": money_column("Orçado (R$)"),
         },
     )
 
@@ -874,12 +905,13 @@ def _orcamento():
     st.markdown("---")
     df_compare = get_budget_vs_actual(selected_month)
     if not df_compare.empty:
-        st.plotly_chart(budget_bar_comparison(df_compare), use_container_width=True)
+        st.plotly_chart(budget_bar_comparison(to_reais_frame(df_compare)), use_container_width=True)
 
 
 # ══════════════════════════════════════════════════════════════════
 # ABA 5 — DASHBOARDS
 # ══════════════════════════════════════════════════════════════════
+@traced("tab.financas.dashboards")
 def _tab_dashboards():
     st.markdown("### 📈 Dashboards Gerenciais")
     today = date.today()
@@ -887,58 +919,52 @@ def _tab_dashboards():
     start_d = c1.date_input("De", value=today.replace(month=1, day=1))
     end_d   = c2.date_input("Até", value=today)
 
-    df = get_transactions(start_date=start_d, end_date=end_d)
-    if df.empty:
+    agg = period_aggregates(start_d, end_d, today)
+    if agg is None:
         st.warning("Nenhum dado no período.")
         return
 
-    total_in  = float(df[df['flow_type'] == 'Entrada']['total_value'].sum())
-    total_out = float(df[df['flow_type'] == 'Saída']['total_value'].sum())
-    resultado = total_in - total_out
-    inadimplencia = float(df[
-        (df['flow_type'] == 'Saída') & (df['status'] == 'Não pago') &
-        (pd.to_datetime(df['due_date']).dt.date < today)
-    ]['total_value'].sum())
+    total_in, total_out = agg['total_in'], agg['total_out']
+    resultado, saldo_ini, saldo_fim = period_result(start_d, end_d)
+    inadimplencia = agg['inadimplencia']
 
     kc1, kc2, kc3, kc4 = st.columns(4)
-    with kc1: card_metric("Total Receitas", fmt_currency(total_in), "", "#10B981", "📥")
-    with kc2: card_metric("Total Despesas", fmt_currency(total_out), "", "#EF4444", "📤")
-    with kc3: card_metric("Resultado", fmt_currency(resultado), "", "#3B82F6" if resultado >= 0 else "#EF4444", "💹")
-    with kc4: card_metric("Inadimplência", fmt_currency(inadimplencia), "Contas vencidas", "#F59E0B", "⚠️")
+    with kc1: card_metric("Total Receitas", fmt_cents(total_in), "", "#10B981", "📥")
+    with kc2: card_metric("Total Despesas", fmt_cents(total_out), "", "#EF4444", "📤")
+    with kc3: card_metric("Resultado", fmt_cents(resultado), f"Saldo {fmt_cents(saldo_ini)} → {fmt_cents(saldo_fim)}",
+                          "#3B82F6" if resultado >= 0 else "#EF4444", "💹")
+    with kc4: card_metric("Inadimplência", fmt_cents(inadimplencia), "Contas vencidas", "#F59E0B", "⚠️")
 
     st.markdown("---")
-    df['month'] = pd.to_datetime(df['due_date']).dt.to_period('M').dt.to_timestamp()
-    df_monthly  = df.groupby(['month', 'flow_type'])['total_value'].sum().reset_index()
-    df_piv      = df_monthly.pivot(index='month', columns='flow_type', values='total_value').fillna(0).reset_index()
-    df_piv.columns.name = None
-    df_piv['month'] = df_piv['month'].dt.strftime('%b/%Y')
-    if 'Entrada' in df_piv.columns and 'Saída' in df_piv.columns:
-        df_piv['balance']     = df_piv['Entrada'] - df_piv['Saída']
-        df_piv['accumulated'] = df_piv['balance'].cumsum()
-        df_piv = df_piv.rename(columns={'Entrada': 'income', 'Saída': 'expense'})
-        st.plotly_chart(cashflow_bar_line(df_piv), use_container_width=True)
+    # Acumulado = saldo realizado no fim do mês, como o KPI de Resultado (period_result)
+    df_piv = dashboard_monthly_frame(agg, get_ledger(start_d, end_d, "month", status='Pago'))
+    if df_piv is not None:
+        st.plotly_chart(cashflow_bar_line(to_reais_frame(df_piv)), use_container_width=True)
+
+    grain_label = st.radio("Granularidade", ["Diário", "Semanal"], horizontal=True, key="dash_grain")
+    df_series = get_cashflow_series(start_d, end_d, "day" if grain_label == "Diário" else "week")
+    st.plotly_chart(cashflow_timeseries(to_reais_frame(df_series), f"Fluxo de Caixa {grain_label} e Saldo"),
+                    use_container_width=True)
 
     col_p1, col_p2 = st.columns(2)
     with col_p1:
-        df_out = df[df['flow_type'] == 'Saída'].groupby('category_name')['total_value'].sum().reset_index()
-        df_out.columns = ['category', 'value']
-        st.plotly_chart(pie_by_category(df_out, "Saídas por Categoria"), use_container_width=True)
+        df_out = category_totals(agg['by_category'], 'Saída')
+        st.plotly_chart(pie_by_category(to_reais_frame(df_out), "Saídas por Categoria"), use_container_width=True)
     with col_p2:
-        df_in = df[df['flow_type'] == 'Entrada'].groupby('category_name')['total_value'].sum().reset_index()
-        df_in.columns = ['category', 'value']
-        st.plotly_chart(pie_by_category(df_in, "Entradas por Categoria"), use_container_width=True)
+        df_in = category_totals(agg['by_category'], 'Entrada')
+        st.plotly_chart(pie_by_category(to_reais_frame(df_in), "Entradas por Categoria"), use_container_width=True)
 
     st.markdown("---")
     st.markdown("### 💡 Insights & Dicas de Gestão Financeira")
     tips = []
     if inadimplencia > 0:
-        tips.append(f"⚠️ **Inadimplência detectada:** {fmt_currency(inadimplencia)} em contas vencidas. Regularize para evitar juros.")
+        tips.append(f"⚠️ **Inadimplência detectada:** {fmt_cents(inadimplencia)} em contas vencidas. Regularize para evitar juros.")
     if resultado < 0:
-        tips.append(f"🔴 **Resultado negativo:** Despesas superaram receitas em {fmt_currency(abs(resultado))}.")
-    if total_out > 0 and (total_out / max(total_in, 1)) > 0.8:
+        tips.append(f"🔴 **Resultado negativo:** Despesas superaram receitas em {fmt_cents(abs(resultado))}.")
+    if total_out > 0 and (total_out / max(total_in, 100)) > 0.8:
         tips.append("🟡 **Comprometimento alto:** Mais de 80% das receitas comprometidas com despesas.")
     if not tips:
-        tips.append(f"✅ **Parabéns!** Resultado positivo: {fmt_currency(resultado)}. Continue assim!")
+        tips.append(f"✅ **Parabéns!** Resultado positivo: {fmt_cents(resultado)}. Continue assim!")
     tips += [
         "📌 **Dica:** Revise o orçamento mensalmente e compare com o realizado.",
         "💡 **Dica:** Metas SMART ajudam a manter o foco financeiro.",
@@ -951,3 +977,13 @@ def _tab_dashboards():
             {tip}
         </div>
         """, unsafe_allow_html=True)
+
+    st.markdown("---")
+    if st.button("🖨️ Gerar relatório HTML", key="dash_html"):
+        st.session_state.dash_html = (start_d, end_d)
+    if st.session_state.get("dash_html") == (start_d, end_d):
+        html = run_job(dashboard_html, start_d, end_d, today, label="Relatório HTML",
+                       cache_key=data_version())
+        if html:
+            st.download_button("💾 Baixar HTML", data=html.encode("utf-8"),
+                               file_name=f"dashboard_{start_d}_{end_d}.html", mime="text/html")
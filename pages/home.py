@@ -4,17 +4,22 @@ Página Home — Painel de Controle BK Finance
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import date
 from database.queries import (
     get_home_summary, get_cashflow_chart_data, get_today_activities,
-    get_goals, get_budget_vs_actual
+    get_goals, get_budget_vs_actual, get_balance_on
 )
 from components.charts import cashflow_bar_line, gauge_goal, budget_bar_comparison
 from components.styles import page_header
-from utils.helpers import fmt_currency, priority_emoji, fmt_date, card_metric
+from utils.helpers import fmt_cents, priority_emoji, fmt_date, card_metric
+from utils.money import to_reais_frame
+from utils.formatting import brl
+from utils.tracing import traced
 
 
+@traced("page.home")
 def render():
     page_header(
         "Painel Financeiro",
@@ -25,11 +30,11 @@ def render():
     # ─── KPIs do dia ────────────────────────────────────────────────────
     summary = get_home_summary()
 
-    c1, c2, c3, c4 = st.columns(4)
+    c1, c2, c3, c4, c5 = st.columns(5)
     with c1:
         card_metric(
             "Contas em Atraso",
-            fmt_currency(summary.get('overdue', 0)),
+            fmt_cents(summary.get('overdue_cents', 0)),
             "⚠️ Vencidas e não pagas",
             color="#EF4444",
             icon="🚨",
@@ -37,7 +42,7 @@ def render():
     with c2:
         card_metric(
             "Vencem em 3 dias",
-            fmt_currency(summary.get('due_soon', 0)),
+            fmt_cents(summary.get('due_soon_cents', 0)),
             "Atenção ao prazo",
             color="#F59E0B",
             icon="⏳",
@@ -45,7 +50,7 @@ def render():
     with c3:
         card_metric(
             "Contas a Receber",
-            fmt_currency(summary.get('receivable', 0)),
+            fmt_cents(summary.get('receivable_cents', 0)),
             "Entradas pendentes",
             color="#10B981",
             icon="📥",
@@ -53,11 +58,19 @@ def render():
     with c4:
         card_metric(
             "Saldo do Dia",
-            fmt_currency(summary.get('balance_today', 0)),
-            "Entradas – Saídas hoje",
+            fmt_cents(get_balance_on(date.today())),
+            f"Entradas – Saídas hoje: {fmt_cents(summary.get('balance_today_cents', 0))}",
             color="#3B82F6",
             icon="💰",
         )
+    with c5:
+        card_metric(
+            "Saldo em Bancos",
+            fmt_cents(summary.get('bank_balance_cents', 0)),
+            "Saldo corrente das contas",
+            color="#8B5CF6",
+            icon="🏦",
+        )
 
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -67,7 +80,7 @@ def render():
     with col_chart:
         st.markdown("#### 📊 Fluxo de Caixa — Últimos 6 Meses")
         df_cf = get_cashflow_chart_data(6)
-        fig = cashflow_bar_line(df_cf)
+        fig = cashflow_bar_line(to_reais_frame(df_cf))
         st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
 
     # ─── Atividades do dia ───────────────────────────────────────────────
@@ -89,7 +102,7 @@ def render():
                 'Importante não Urgente': 3,
                 'Não importante-Não urgente': 4,
             }
-            df_act['_order'] = df_act['priority'].map(priority_order)
+            df_act['_order'] = df_act['priority'].astype(str).map(priority_order)
             df_act = df_act.sort_values('_order')
 
             for _, row in df_act.iterrows():
@@ -125,8 +138,8 @@ def render():
         cols = st.columns(min(len(active_goals), 3))
         for i, (_, goal) in enumerate(active_goals.iterrows()):
             with cols[i % 3]:
-                target = float(goal.get('target_value') or 0)
-                current = float(goal.get('current_value') or 0)
+                target = goal.get('target_value_cents', 0) / 100
+                current = goal.get('current_value_cents', 0) / 100
                 if target > 0:
                     fig_gauge = gauge_goal(current, target, goal['title'])
                     st.plotly_chart(fig_gauge, use_container_width=True, config={"displayModeBar": False})
@@ -153,7 +166,9 @@ def render():
     today_month = date.today().replace(day=1)
     df_bva = get_budget_vs_actual(today_month)
 
-    if not df_bva.empty and df_bva['planned'].sum() > 0:
+    if not df_bva.empty and df_bva['planned_cents'].sum() > 0:
+        df_bva['diff_cents'] = df_bva['planned_cents'] - df_bva['actual_cents']
+        df_bva = to_reais_frame(df_bva)
         col_pie, col_bar = st.columns([1, 2])
         with col_bar:
             from components.charts import budget_bar_comparison
@@ -161,17 +176,12 @@ def render():
             st.plotly_chart(fig_bar, use_container_width=True, config={"displayModeBar": False})
 
         with col_pie:
-            df_display = df_bva.copy()
-            df_display['Diferença'] = df_display['planned'] - df_display['actual']
-            df_display['Status'] = df_display['Diferença'].apply(
-                lambda x: "✅ Ok" if x >= 0 else "❌ Excedeu"
-            )
-            st.dataframe(
-                df_display[['category', 'planned', 'actual', 'Diferença', 'Status']].rename(columns={
-                    'category': 'Categoria', 'planned': 'Orçado', 'actual': 'Realizado'
-                }).style.format({'Orçado': 'R$ {:,.2f}', 'Realizado': 'R$ {:,.2f}', 'Diferença': 'R$ {:,.2f}'}),
-                hide_index=True,
-                use_container_width=True,
-            )
+            df_display = df_bva[['category', 'planned', 'actual', 'diff']].rename(columns={
+                'category': 'Categoria', 'planned': 'Orçado', 'actual': 'Realizado', 'diff': 'Diferença'
+            })
+            df_display['Status'] = np.where(df_display['Diferença'] >= 0, "✅ Ok", "❌ Excedeu")
+            for col in ['Orçado', 'Realizado', 'Diferença']:
+                df_display[col] = brl(df_display[col].to_numpy())
+            st.dataframe(df_display, hide_index=True, use_container_width=True)
     else:
         st.info("Configure o orçamento mensal na aba Finanças > Metas e Orçamento.")
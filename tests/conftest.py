@@ -0,0 +1,22 @@
+"""
+tests/conftest.py
+Fixtures compartilhadas — os testes de banco só rodam com BK_TEST_DATABASE_URL
+apontando para um PostgreSQL descartável (nunca a URL padrão do app)
+"""
+
+import os
+
+import pytest
+
+TEST_DB_ENV = "BK_TEST_DATABASE_URL"
+
+
+@pytest.fixture(scope="session")
+def db_url():
+    """URL do banco de teste, fixada para o processo; pula o teste sem ela."""
+    url = os.getenv(TEST_DB_ENV)
+    if not url:
+        pytest.skip(f"{TEST_DB_ENV} não configurada")
+    from database.connection import set_db_url
+    set_db_url(url)
+    return url
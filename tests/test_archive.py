@@ -0,0 +1,84 @@
+"""
+tests/test_archive.py
+Arquivo frio: o Parquet fica no banco (qualquer processo lê) e os agregados
+por período não mudam quando um mês é arquivado
+"""
+
+from datetime import date
+
+import pytest
+
+TAG = "test_archive"
+MONTH, MONTH_END = date(2001, 3, 1), date(2001, 3, 31)
+
+
+def _cleanup():
+    from database import archive
+    from database.connection import execute_query
+    execute_query("DELETE FROM transactions WHERE notes = %s", (TAG,), fetch=False)
+    execute_query("DELETE FROM transaction_archive WHERE month = %s", (MONTH,), fetch=False)
+    execute_query("DELETE FROM archived_flows WHERE due_date BETWEEN %s AND %s", (MONTH, MONTH_END), fetch=False)
+    archive.clear_cache()
+
+
+@pytest.fixture
+def archive_db(db_url):
+    from database.connection import execute_query
+    from database.migrations import run_migrations
+    from database.queries import ensure_transaction_partitions, insert_transaction
+    run_migrations()
+    ensure_transaction_partitions(years=(MONTH.year,))
+    _cleanup()
+    category_id = execute_query("""
+        INSERT INTO categories (flow_type, name) VALUES ('Entrada', %s)
+        ON CONFLICT (flow_type, name) DO UPDATE SET active = TRUE
+        RETURNING id
+    """, (TAG,), fetch=True)[0]['id']
+    for flow_type, value, due, status in [
+        ('Entrada', 500.50, date(2001, 3, 5), 'Pago'),
+        ('Saída', 200.25, date(2001, 3, 10), 'Pago'),
+        ('Entrada', 80.00, date(2001, 3, 20), 'Pago'),
+        ('Saída', 30.00, date(2001, 3, 25), 'Não pago'),
+    ]:
+        insert_transaction({'flow_type': flow_type, 'value': value, 'due_date': due, 'status': status,
+                            'category_id': category_id, 'notes': TAG, 'is_forecast': False})
+    # Pago hoje, vencido no mês arquivado: continua na tabela (indicadores da Home)
+    execute_query("""
+        UPDATE transactions SET payment_date = CASE WHEN due_date = %s THEN CURRENT_DATE ELSE due_date END
+        WHERE notes = %s AND status = 'Pago'
+    """, (date(2001, 3, 20), TAG), fetch=False)
+    yield category_id
+    _cleanup()
+
+
+def _snapshot(category_id):
+    from database.queries import get_budget_vs_actual, get_cashflow_chart_data, get_home_summary, get_transactions
+    from utils.reports import period_result
+    months = (date.today().year - MONTH.year) * 12 + date.today().month
+    chart = get_cashflow_chart_data(months)
+    budget = get_budget_vs_actual(MONTH)
+    return dict(
+        ids=sorted(get_transactions(MONTH, MONTH_END)['id'].astype(int)),
+        chart=chart[chart['month'] == MONTH][['income_cents', 'expense_cents']].values.tolist(),
+        budget=int(budget.loc[budget['category_id'] == category_id, 'actual_cents'].iloc[0]),
+        home=get_home_summary(),
+        result=period_result(MONTH, MONTH_END)[0],
+    )
+
+
+def test_archived_month_keeps_aggregates(archive_db):
+    from database import archive
+    from database.connection import execute_query
+    before = _snapshot(archive_db)
+    assert before['budget'] == 50050 + 20025 + 8000
+
+    results = archive.archive_transactions(date(2001, 4, 1))
+    assert [(r['month'], r['rows']) for r in results] == [(MONTH, 2)]
+    hot = execute_query("SELECT due_date FROM transactions WHERE notes = %s ORDER BY due_date", (TAG,))
+    assert [r['due_date'] for r in hot] == [date(2001, 3, 20), date(2001, 3, 25)]
+    assert archive.archived_files(MONTH, MONTH_END) == [results[0]['file']]
+    assert _snapshot(archive_db) == before
+
+    # Outro processo: nada em memória, tudo vem do banco
+    archive.clear_cache()
+    assert _snapshot(archive_db) == before
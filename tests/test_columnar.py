@@ -0,0 +1,32 @@
+"""
+tests/test_columnar.py
+execute_arrow (COPY CSV → Arrow) com textos que o CSV precisa citar
+"""
+
+from hypothesis import given, settings, strategies as st
+
+# Quebras de linha, aspas, ';' e ',' — o que notes/description trazem de verdade
+texts = st.text(alphabet=st.sampled_from("ab ç\n\r\";,"), max_size=40)
+
+_TEXT_SQL = """
+    SELECT t AS description, i::int AS position
+    FROM unnest(%s::text[]) WITH ORDINALITY AS u(t, i)
+    ORDER BY i
+"""
+
+
+def test_arrow_reads_multiline_description(db_url):
+    from database.connection import execute_arrow
+    # Vários blocos do leitor CSV (1 MB cada): a quebra cai dentro de um campo citado
+    values = ["Obs \"linha 1\"; a\nlinha 2", "", None, "x;y\r\nz"] * 50000
+    table = execute_arrow(_TEXT_SQL, (values,))
+    assert table.column("description").to_pylist() == values
+    assert table.column("position").to_pylist() == list(range(1, len(values) + 1))
+
+
+@settings(max_examples=25, deadline=None)
+@given(st.lists(st.one_of(st.none(), texts), min_size=1, max_size=200))
+def test_arrow_text_round_trip(db_url, values):
+    from database.connection import execute_arrow
+    table = execute_arrow(_TEXT_SQL, (values,))
+    assert table.column("description").to_pylist() == values
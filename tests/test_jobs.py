@@ -0,0 +1,66 @@
+"""
+tests/test_jobs.py
+Fila de jobs no PostgreSQL: lease por worker
+"""
+
+import pytest
+
+KIND = "test_job"
+
+
+@pytest.fixture
+def jobs_db(db_url):
+    from database.connection import execute_query
+    from database.migrations import run_migrations
+    run_migrations()
+    execute_query("DELETE FROM jobs WHERE kind = %s", (KIND,), fetch=False)
+    yield
+    execute_query("DELETE FROM jobs WHERE kind = %s", (KIND,), fetch=False)
+
+
+def test_lost_lease_cannot_finish_job(jobs_db):
+    from database.connection import execute_query
+    from jobs.queue import claim_job, complete_job, enqueue, fail_job, get_job, requeue_stale
+    job_id = enqueue(KIND)
+    assert claim_job("old", [KIND])["id"] == job_id
+    # Lease vencido: o job volta à fila e outro worker o pega
+    execute_query("UPDATE jobs SET locked_at = NOW() - INTERVAL '1 hour' WHERE id = %s", (job_id,), fetch=False)
+    assert requeue_stale(60) == 1
+    assert claim_job("new", [KIND])["id"] == job_id
+    assert not complete_job(job_id, "old", {"from": "old"})
+    assert not fail_job(job_id, "old", "erro antigo")
+    assert get_job(job_id)["status"] == "running"
+    assert complete_job(job_id, "new", {"from": "new"})
+    job = get_job(job_id)
+    assert (job["status"], job["result"]) == ("done", {"from": "new"})
+
+
+def test_progress_keeps_data_version(jobs_db):
+    from database.connection import data_version
+    from jobs.queue import claim_job, enqueue, report_progress
+    job_id = enqueue(KIND)
+    claim_job("w", [KIND])
+    before = data_version()
+    report_progress(job_id, 0.5, "metade")
+    assert data_version() == before
+
+
+# ═══════════════════════════════════════════════════════════════════
+# JOBS DIÁRIOS
+# ═══════════════════════════════════════════════════════════════════
+
+@pytest.mark.parametrize("queue", [True, False])
+def test_two_schedulers_create_one_daily_job(jobs_db, monkeypatch, queue):
+    from database.connection import execute_query
+    from jobs import scheduler
+    runs = []
+    monkeypatch.setattr(scheduler, "DAILY_JOBS", (KIND,))
+    monkeypatch.setitem(scheduler.TASKS, KIND, lambda payload, progress: runs.append(1) or {"ok": True})
+    monkeypatch.setattr(scheduler, "use_job_queue", lambda: queue)
+    first, second = scheduler.DailyScheduler(), scheduler.DailyScheduler()
+    second.worker += ":replica"
+    assert len(first.tick()) == 1
+    assert second.tick() == [] and first.tick() == []
+    jobs = execute_query("SELECT status FROM jobs WHERE kind = %s", (KIND,))
+    assert [j["status"] for j in jobs] == ["queued" if queue else "done"]
+    assert len(runs) == (0 if queue else 1)
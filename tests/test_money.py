@@ -0,0 +1,81 @@
+"""
+tests/test_money.py
+to_cents/sum_cents contra somas exatas (Decimal em memória e NUMERIC no PostgreSQL)
+"""
+
+from decimal import Decimal
+
+from hypothesis import given, settings, strategies as st
+
+from utils.money import scalar_to_cents, sum_cents, to_cents
+
+# NUMERIC(15,2): 13 dígitos de reais + 2 de centavos
+_LIMIT = Decimal("9999999999999.99")
+
+amounts = st.decimals(min_value=-_LIMIT, max_value=_LIMIT, places=2,
+                      allow_nan=False, allow_infinity=False)
+amount_lists = st.lists(amounts, max_size=200)
+
+
+def _exact_cents(values) -> int:
+    return int(sum(values, Decimal(0)) * 100)
+
+
+@given(amount_lists)
+def test_sum_cents_matches_decimal_sum(values):
+    assert sum_cents(to_cents(values)) == _exact_cents(values)
+
+
+@given(amount_lists)
+def test_to_cents_from_float_is_exact(values):
+    # Valores de grid voltam como float64; um NUMERIC(15,2) tem |centavos| < 2**50
+    assert to_cents([float(v) for v in values]).tolist() == [int(v * 100) for v in values]
+
+
+@given(amount_lists)
+def test_to_cents_of_totals_is_exact(values):
+    # Totais passam de 2**53 centavos: não podem passar por float64
+    total = sum(values, Decimal(0))
+    assert to_cents([total, -total]).tolist() == [_exact_cents(values), -_exact_cents(values)]
+
+
+@given(st.lists(st.one_of(st.none(), amounts), max_size=50))
+def test_nulls_count_as_zero(values):
+    assert sum_cents(to_cents(values)) == _exact_cents(v for v in values if v is not None)
+    assert [scalar_to_cents(v) for v in values] == to_cents(values).tolist()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# POSTGRESQL (BK_TEST_DATABASE_URL)
+# ═══════════════════════════════════════════════════════════════════
+
+_VALUES_SQL = """
+    SELECT v AS value, SUM(v) OVER () AS total
+    FROM unnest(%s::numeric(15,2)[]) WITH ORDINALITY AS u(v, i)
+    ORDER BY i
+"""
+
+
+@settings(max_examples=25, deadline=None)
+@given(st.lists(amounts, min_size=1, max_size=200))
+def test_columnar_cents_match_numeric_sum(db_url, values):
+    from database.connection import execute_query
+    df = execute_query(_VALUES_SQL, ([str(v) for v in values],), columnar=True, money=("value", "total"))
+    assert sum_cents(df["value_cents"]) == int(df["total_cents"].iloc[0]) == _exact_cents(values)
+
+
+@settings(max_examples=25, deadline=None)
+@given(st.lists(amounts, min_size=1, max_size=200))
+def test_arrow_cents_match_numeric_sum(db_url, values):
+    from database.connection import execute_arrow
+    table = execute_arrow(_VALUES_SQL, ([str(v) for v in values],), money=("value", "total"))
+    assert sum_cents(table.column("value_cents").to_numpy()) == _exact_cents(values)
+    assert table.column("total_cents")[0].as_py() == _exact_cents(values)
+
+
+def test_only_listed_columns_become_cents(db_url):
+    from database.connection import execute_query
+    df = execute_query("SELECT 1.5::numeric AS value, 2.25::numeric(15,2) AS amount", columnar=True,
+                       money=("amount",))
+    assert list(df.columns) == ["value", "amount_cents"]
+    assert int(df["amount_cents"].iloc[0]) == 225
@@ -0,0 +1,38 @@
+"""
+tests/test_page_budgets.py
+Orçamentos por página (bench/budgets.json) como testes: semeia o cenário
+BENCH_SCENARIO (padrão 10k) no banco de BENCH_DATABASE_URL — que é apagado —
+e renderiza cada página/aba com AppTest. Sem BENCH_DATABASE_URL, pulados.
+O pico de memória fica só no `python -m bench.pages`: sob o pytest o
+tracemalloc também conta o que os outros testes deixaram carregado.
+"""
+
+import os
+
+import pytest
+
+from bench.pages import APP_PAGES, TABS, check_budgets, configure, load_budgets, measure_target
+
+SCENARIO = os.getenv("BENCH_SCENARIO", "10k")
+GATED = ("seconds", "queries", "arrow_kb")
+TARGETS = list(APP_PAGES) + list(TABS)
+
+
+@pytest.fixture(scope="module")
+def bench_db():
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        pytest.skip("BENCH_DATABASE_URL não configurada")
+    from bench.seed import SCENARIOS, seed
+    configure(url)
+    seed(SCENARIOS[SCENARIO], years=5, seed_value=42, reset=True)
+    return url
+
+
+@pytest.mark.parametrize("target", TARGETS)
+def test_page_within_budget(bench_db, target):
+    budget = load_budgets().get(SCENARIO, {}).get(target)
+    if budget is None:
+        pytest.skip(f"sem orçamento para {target} em {SCENARIO}")
+    result = measure_target(target, repeat=3)
+    assert check_budgets({SCENARIO: {target: result}}, {SCENARIO: {target: budget}}, GATED) == []
@@ -0,0 +1,42 @@
+"""
+tests/test_reports.py
+Relatórios: o HTML exportado do Dashboards mostra os mesmos KPIs da página
+"""
+
+from datetime import date
+
+import pytest
+
+TAG = "test_reports"
+START, END = date(2003, 1, 1), date(2003, 1, 31)
+
+
+@pytest.fixture
+def period_db(db_url):
+    from database.connection import execute_query
+    from database.migrations import run_migrations
+    from database.queries import ensure_transaction_partitions, insert_transaction
+    run_migrations()
+    ensure_transaction_partitions(years=(START.year,))
+    execute_query("DELETE FROM transactions WHERE notes = %s", (TAG,), fetch=False)
+    # Um lançamento antes do período (saldo inicial) e um em aberto (fora do realizado)
+    for flow_type, value, due, status in [
+        ('Entrada', 1000.00, date(2002, 12, 15), 'Pago'),
+        ('Entrada', 350.25, date(2003, 1, 10), 'Pago'),
+        ('Saída', 120.10, date(2003, 1, 20), 'Pago'),
+        ('Saída', 999.99, date(2003, 1, 25), 'Não pago'),
+    ]:
+        insert_transaction({'flow_type': flow_type, 'value': value, 'due_date': due, 'status': status,
+                            'notes': TAG, 'is_forecast': False})
+    yield
+    execute_query("DELETE FROM transactions WHERE notes = %s", (TAG,), fetch=False)
+
+
+def test_dashboard_html_result_matches_page(period_db):
+    from utils.helpers import fmt_cents
+    from utils.reports import dashboard_html, period_result
+    resultado, opening, closing = period_result(START, END)
+    assert resultado == closing - opening == 35025 - 12010
+    assert f'<small>Resultado</small><br><b style="font-size:18px">{fmt_cents(resultado)}</b>' in (
+        dashboard_html(START, END, END)
+    )
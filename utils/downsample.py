@@ -0,0 +1,49 @@
+"""
+utils/downsample.py
+Redução de séries temporais para o número de pontos que o gráfico consegue
+mostrar — Largest-Triangle-Three-Buckets (Steinarsson, 2013), que preserva
+picos e vales ao contrário de médias ou amostragem a cada N
+"""
+
+import numpy as np
+import pandas as pd
+
+# ~1 ponto por pixel na largura típica do gráfico em layout wide
+DEFAULT_MAX_POINTS = 1200
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Índices dos `n_out` pontos escolhidos pelo LTTB (sempre inclui o primeiro
+    e o último). `x` precisa ser numérico e crescente.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (n_out - 2)
+    edges = (np.floor(np.arange(n_out - 1) * every) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Vértice C: média do bucket seguinte (o último ponto, no último bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def lttb_series(x, y, n_out: int = DEFAULT_MAX_POINTS) -> tuple:
+    """(x, y) reduzidos; datas são convertidas para ns só para o cálculo das áreas."""
+    x = np.asarray(x)
+    x_values = x if np.issubdtype(x.dtype, np.number) else pd.DatetimeIndex(x).asi8
+    idx = lttb_indices(x_values, y, n_out)
+    return x[idx], np.asarray(y)[idx]
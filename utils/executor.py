@@ -0,0 +1,186 @@
+"""
+utils/executor.py
+Executor de jobs pesados (exportações, pivots) em pool de processos,
+fora da thread do script Streamlit, com resultados cacheados por parâmetros
+"""
+
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import streamlit as st
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Resultados concluídos mantidos no registro (LRU) e por quanto tempo valem
+MAX_FINISHED_JOBS = 32
+JOB_TTL_SECONDS = 300
+
+
+def _get_workers() -> int:
+    """
+    Processos do pool: secrets.toml [jobs] workers → REPORT_WORKERS → 2.
+    0 executa os jobs na própria thread do script (benchmarks, depuração).
+    """
+    try:
+        value = st.secrets["jobs"]["workers"]
+        if value is not None:
+            return int(value)
+    except Exception:
+        pass
+    return int(os.getenv("REPORT_WORKERS", "2"))
+
+
+@st.cache_resource
+def get_executor() -> ProcessPoolExecutor:
+    """Pool de processos compartilhado por todas as sessões do servidor."""
+    # spawn: não herdar as threads do servidor Tornado via fork
+    return ProcessPoolExecutor(max_workers=_get_workers(),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def _submit(fn, args: tuple) -> Future:
+    if _get_workers() > 0:
+        return get_executor().submit(fn, *args)
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class _Job:
+    def __init__(self, future, cleanup_file: bool):
+        self.future = future
+        self.cleanup_file = cleanup_file
+        self.submitted_at = time.time()
+
+    def expired(self) -> bool:
+        return self.future.done() and time.time() - self.submitted_at > JOB_TTL_SECONDS
+
+    def discard(self):
+        """Remove o arquivo temporário produzido pelo job, se houver."""
+        if not self.cleanup_file or not self.future.done() or self.future.exception():
+            return
+        path = self.future.result()
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+class _JobRegistry:
+    """Jobs indexados pelos parâmetros (função + argumentos)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+
+    def submit(self, fn, args: tuple, cache_key, cleanup_file: bool) -> tuple:
+        job_id = (fn.__module__, fn.__qualname__, args, cache_key)
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.expired():
+                self.jobs.pop(job_id).discard()
+                job = None
+            metrics.cache_hit("report_jobs", job is not None)
+            if job is None:
+                job = _Job(_submit(fn, args), cleanup_file)
+                self.jobs[job_id] = job
+            self.jobs.move_to_end(job_id)
+            self._evict()
+        return job_id
+
+    def _evict(self):
+        finished = [k for k, j in self.jobs.items() if j.future.done()]
+        for key in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            self.jobs.pop(key).discard()
+
+    def get(self, job_id: tuple):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def clear(self):
+        with self.lock:
+            jobs, self.jobs = list(self.jobs.values()), OrderedDict()
+        for job in jobs:
+            job.discard()
+
+    def forget(self, job_id: tuple):
+        with self.lock:
+            job = self.jobs.pop(job_id, None)
+        if job is not None:
+            job.discard()
+
+
+@st.cache_resource
+def _get_registry() -> _JobRegistry:
+    return _JobRegistry()
+
+
+def submit_job(fn, *args, cache_key=None, cleanup_file: bool = False) -> tuple:
+    """
+    Enfileira `fn(*args)` no pool (ou reaproveita job idêntico ainda válido).
+    `fn` e `args` precisam ser picklable. `cache_key` entra na identidade do
+    job sem ser repassado (ex.: data_version()); use cleanup_file=True quando
+    o resultado for o caminho de um arquivo temporário.
+    """
+    return _get_registry().submit(fn, tuple(args), cache_key, cleanup_file)
+
+
+def clear_jobs():
+    """Descarta todos os jobs registrados (benchmarks medem sempre a frio)."""
+    _get_registry().clear()
+
+
+def job_status(job_id: tuple) -> str:
+    """'pending' | 'running' | 'done' | 'error' | 'unknown'."""
+    job = _get_registry().get(job_id)
+    if job is None:
+        return "unknown"
+    f = job.future
+    if not f.done():
+        return "running" if f.running() else "pending"
+    return "error" if f.exception() else "done"
+
+
+def job_result(job_id: tuple):
+    job = _get_registry().get(job_id)
+    return job.future.result() if job else None
+
+
+@st.fragment(run_every=1)
+def _poll_job(job_id: tuple, label: str):
+    """Fragmento que acompanha o job e dispara um rerun da página ao terminar."""
+    status = job_status(job_id)
+    if status in ("done", "error", "unknown"):
+        st.rerun()
+    job = _get_registry().get(job_id)
+    elapsed = time.time() - job.submitted_at if job else 0
+    state = "na fila" if status == "pending" else "processando"
+    st.info(f"⏳ {label} — {state} ({elapsed:.0f}s)")
+
+
+def run_job(fn, *args, label: str = "Gerando relatório", cache_key=None, cleanup_file: bool = False):
+    """
+    Submete o job e retorna o resultado se já estiver pronto; caso contrário
+    exibe o acompanhamento (fragmento) e retorna None.
+    """
+    job_id = submit_job(fn, *args, cache_key=cache_key, cleanup_file=cleanup_file)
+    status = job_status(job_id)
+    if status == "done":
+        return job_result(job_id)
+    if status == "error":
+        exc = _get_registry().get(job_id).future.exception()
+        logger.error(f"Job {job_id[1]} falhou: {exc}")
+        # Erros não ficam em cache: o próximo rerun tenta de novo
+        _get_registry().forget(job_id)
+        st.error(f"❌ {label}: falha ao gerar ({exc}).")
+        return None
+    _poll_job(job_id, label)
+    return None
@@ -0,0 +1,144 @@
+"""
+utils/export.py
+Exportação em streaming (Excel / CSV / Parquet) a partir de blocos de DataFrame
+"""
+
+import os
+import tempfile
+import logging
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "Excel":   ("xlsx",    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV":     ("csv",     "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# st.download_button guarda o arquivo inteiro na memória do servidor (media file
+# manager) enquanto a sessão o exibe — acima do limite o download é recusado
+DEFAULT_MAX_DOWNLOAD_MB = 50
+
+
+def get_max_download_bytes() -> int:
+    """Limite de download: secrets.toml [export] max_download_mb → EXPORT_MAX_DOWNLOAD_MB → 50 MB."""
+    try:
+        value = st.secrets["export"]["max_download_mb"]
+        if value:
+            return int(float(value) * 2**20)
+    except Exception:
+        pass
+    return int(float(os.getenv("EXPORT_MAX_DOWNLOAD_MB", DEFAULT_MAX_DOWNLOAD_MB)) * 2**20)
+
+
+def write_excel(frames, path: str) -> int:
+    """
+    Grava os blocos num .xlsx com xlsxwriter em modo `constant_memory`:
+    cada linha é descarregada em disco assim que a próxima começa.
+    """
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Dados")
+    header_fmt = workbook.add_format({
+        "bold": True, "bg_color": "#1E40AF", "font_color": "white",
+        "border": 1, "align": "center",
+    })
+    row = 0
+    try:
+        for df in frames:
+            if row == 0:
+                worksheet.set_column(0, max(len(df.columns) - 1, 0), 18)
+                worksheet.write_row(0, 0, list(df.columns), header_fmt)
+                row = 1
+            df = df.astype(object).where(df.notna(), None)
+            for values in df.itertuples(index=False, name=None):
+                worksheet.write_row(row, 0, values)
+                row += 1
+    finally:
+        workbook.close()
+    return max(row - 1, 0)
+
+
+def write_csv(frames, path: str) -> int:
+    """Grava os blocos em CSV (padrão BR: `;` e vírgula decimal, UTF-8 com BOM)."""
+    rows = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as fh:
+        for df in frames:
+            df.to_csv(fh, index=False, header=rows == 0, sep=";", decimal=",")
+            rows += len(df)
+    return rows
+
+
+def write_parquet(frames, path: str) -> int:
+    """Grava os blocos em Parquet (zstd), um row group por bloco."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    rows = 0
+    try:
+        for df in frames:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                # Colunas só com nulos no primeiro bloco viram string
+                schema = pa.schema([
+                    f.with_type(pa.string()) if pa.types.is_null(f.type) else f
+                    for f in table.schema
+                ])
+                writer = pq.ParquetWriter(path, schema, compression="zstd")
+            writer.write_table(table.cast(writer.schema))
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+_WRITERS = {"xlsx": write_excel, "csv": write_csv, "parquet": write_parquet}
+
+
+def export_to_tempfile(frames, fmt: str) -> str:
+    """Grava os blocos num arquivo temporário no formato indicado e retorna o caminho."""
+    ext, _ = EXPORT_FORMATS[fmt]
+    fd, path = tempfile.mkstemp(prefix="bk_export_", suffix=f".{ext}")
+    os.close(fd)
+    try:
+        rows = _WRITERS[ext](frames, path)
+        logger.info(f"Exportação {fmt}: {rows} linhas, {os.path.getsize(path)} bytes")
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def serve_file_button(path: str, fmt: str, file_stem: str, label: str = "💾 Baixar",
+                      key: str = None, cleanup: bool = True):
+    """
+    Entrega um arquivo já gerado via st.download_button; por padrão remove-o em
+    seguida. Arquivos acima de get_max_download_bytes() não são carregados:
+    o usuário é avisado para reduzir o período ou usar Parquet.
+    """
+    ext, mime = EXPORT_FORMATS[fmt]
+    try:
+        size, limit = os.path.getsize(path), get_max_download_bytes()
+        if size > limit:
+            logger.warning(f"Download de {size} bytes recusado (limite {limit})")
+            st.warning(f"⚠️ O arquivo ({size / 2**20:.0f} MB) passa do limite de download "
+                       f"({limit / 2**20:.0f} MB). Reduza o período ou exporte em Parquet.")
+            return
+        with open(path, "rb") as fh:
+            st.download_button(f"{label} {fmt}", data=fh, file_name=f"{file_stem}.{ext}",
+                               mime=mime, key=key)
+    finally:
+        if cleanup:
+            os.remove(path)
+
+
+def export_download_button(frames, fmt: str, file_stem: str, label: str = "💾 Baixar", key: str = None):
+    """
+    Gera o arquivo em disco a partir dos blocos, entrega via st.download_button
+    e remove o temporário logo em seguida.
+    """
+    serve_file_button(export_to_tempfile(frames, fmt), fmt, file_stem, label, key)
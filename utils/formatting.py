@@ -0,0 +1,116 @@
+"""
+utils/formatting.py
+Formatação pt-BR por coluna — Real (R$ 1.234,56) e datas DD/MM/AAAA montados
+byte a byte em matrizes NumPy (divisões inteiras + tabelas de dígitos) para as
+tabelas só de leitura, e column_config dos grids que precisam continuar
+numéricos (editores, extrato ordenável), formatados pelo navegador — sem
+Styler nem chamadas Python por célula
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.money import to_cents
+
+# Formatos do front-end do Streamlit. Os formatos printf ("R$ %,.2f") saem sempre
+# com separadores americanos; "localized" usa o idioma do navegador (1.234,56 em
+# pt-BR), sem o símbolo R$ — onde o texto pronto serve, use brl/brl_cents
+MONEY_GRID_FORMAT = "localized"
+MONEY_GRID_STEP = 0.01
+DATE_GRID_FORMAT = "DD/MM/YYYY"
+
+# NUMERIC(15,2): até 13 dígitos de reais → 5 grupos de milhar
+_GROUPS = 5
+_WIDTH = len("R$ -") + _GROUPS * 4 - 1 + len(",00")
+
+# Bytes ASCII de "000"…"999" e "00"…"99" — cada grupo vira uma consulta de tabela
+_DIGITS3 = np.frombuffer("".join(f"{i:03d}" for i in range(1000)).encode(), dtype=np.uint8).reshape(1000, 3)
+_DIGITS2 = _DIGITS3[:100, 1:]
+_POWERS = 10 ** np.arange(1, _GROUPS * 3, dtype=np.int64)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# TEXTO (COLUNAS INTEIRAS)
+# ═══════════════════════════════════════════════════════════════════
+
+def _to_str(chars: np.ndarray) -> np.ndarray:
+    """Matriz de bytes ASCII (linha = texto, zeros à direita) → array de str."""
+    return chars.view(f"S{chars.shape[1]}").ravel().astype(str)
+
+
+def brl_cents(cents) -> np.ndarray:
+    """
+    Centavos int64 → "R$ 1.234,56" (negativos como "R$ -1.234,56", igual a
+    fmt_cents). Os dígitos saem de divisões inteiras e de uma tabela de bytes,
+    alinhados à direita numa matriz; cada comprimento distinto (poucos) é
+    copiado para a esquerda num único fatiamento.
+    """
+    cents = np.asarray(cents, dtype=np.int64).ravel()
+    absolute = np.abs(cents)
+    reais = absolute // 100
+    chars = np.empty((len(cents), _WIDTH), dtype=np.uint8)
+    chars[:, -2:] = _DIGITS2[absolute % 100]
+    chars[:, -3] = ord(",")
+    rest, col = reais, _WIDTH - 3
+    for i in range(_GROUPS):
+        chars[:, col - 3:col] = _DIGITS3[rest % 1000]
+        rest = rest // 1000
+        if i < _GROUPS - 1:
+            chars[:, col - 4] = ord(".")
+        col -= 4
+    n_digits = np.searchsorted(_POWERS, reais, side="right") + 1
+    negative = cents < 0
+    length = len("R$ ") + negative + n_digits + (n_digits - 1) // 3 + len(",00")
+    out = np.zeros_like(chars)
+    for size in np.unique(length):
+        rows = np.flatnonzero(length == size)
+        out[rows, :size] = chars[rows, _WIDTH - size:]
+    out[:, :3] = np.frombuffer(b"R$ ", dtype=np.uint8)
+    out[negative, 3] = ord("-")
+    return _to_str(out)
+
+
+def brl(values) -> np.ndarray:
+    """Valores em reais (Decimal/float/None) → "R$ 1.234,56"; None vira R$ 0,00, como to_cents."""
+    return brl_cents(to_cents(values))
+
+
+def dates(values) -> np.ndarray:
+    """Datas (date, datetime64, texto ISO) → "DD/MM/AAAA"; nulos viram ""."""
+    days = np.asarray(values)
+    if days.dtype.kind != "M":
+        days = pd.to_datetime(pd.Series(days, dtype=object), errors="coerce").to_numpy()
+    days = days.astype("datetime64[D]").ravel()
+    missing = np.isnat(days)
+    days = np.where(missing, np.datetime64("1970-01-01"), days)
+    months = days.astype("datetime64[M]")
+    year = months.astype("datetime64[Y]").astype(np.int64) + 1970
+    chars = np.empty((len(days), 10), dtype=np.uint8)
+    chars[:, 0:2] = _DIGITS2[(days - months).astype(np.int64) + 1]
+    chars[:, 3:5] = _DIGITS2[months.astype(np.int64) % 12 + 1]
+    chars[:, 6:8] = _DIGITS2[year // 100]
+    chars[:, 8:10] = _DIGITS2[year % 100]
+    chars[:, [2, 5]] = ord("/")
+    chars[missing] = 0
+    return _to_str(chars)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# COLUMN_CONFIG
+# ═══════════════════════════════════════════════════════════════════
+
+def money_column(label: str = None, **kwargs):
+    """NumberColumn em reais, formatada no navegador com duas casas (step de centavo)."""
+    kwargs.setdefault("step", MONEY_GRID_STEP)
+    return st.column_config.NumberColumn(label, format=MONEY_GRID_FORMAT, **kwargs)
+
+
+def date_column(label: str = None, **kwargs):
+    """DateColumn DD/MM/AAAA."""
+    return st.column_config.DateColumn(label, format=DATE_GRID_FORMAT, **kwargs)
+
+
+def money_columns(labels, **kwargs) -> dict:
+    """column_config com money_column para cada coluna de `labels`."""
+    return {label: money_column(label, **kwargs) for label in labels}
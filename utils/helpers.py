@@ -9,6 +9,8 @@ from datetime import date, datetime
 import io
 import locale
 
+from utils.money import scalar_to_cents
+
 try:
     locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
 except Exception:
@@ -16,11 +18,16 @@ except Exception:
 
 
 def fmt_currency(value: float) -> str:
-    """Formata valor em Real Brasileiro."""
-    try:
-        return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except Exception:
-        return f"R$ {value:.2f}"
+    """Formata valor em Real Brasileiro (colunas inteiras: utils.formatting.brl)."""
+    return fmt_cents(scalar_to_cents(value))
+
+
+def fmt_cents(cents: int) -> str:
+    """Formata valor em centavos como Real Brasileiro (aritmética inteira, exata; colunas: brl_cents)."""
+    cents = int(cents)
+    sign = "-" if cents < 0 else ""
+    reais, cent = divmod(abs(cents), 100)
+    return f"R$ {sign}{reais:,}".replace(",", ".") + f",{cent:02d}"
 
 
 def fmt_date(d) -> str:
@@ -0,0 +1,249 @@
+"""
+utils/metrics.py
+Métricas operacionais no formato texto do Prometheus — contadores,
+gauges e histogramas em memória do processo, expostos por uma thread HTTP
+lateral ou gravados periodicamente em arquivo
+"""
+
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value:g}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self, key: tuple, value) -> list:
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            bucket_labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {total:g}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render_text() -> str:
+    """Todas as métricas do processo no formato de exposição do Prometheus."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MÉTRICAS DA APLICAÇÃO
+# ═══════════════════════════════════════════════════════════════════
+
+DB_QUERY_SECONDS = Histogram("bk_db_query_duration_seconds",
+                             "Duração de cada execute, por função emissora", ("statement",))
+DB_QUERY_ERRORS = Counter("bk_db_query_errors_total", "Transações de banco desfeitas por erro")
+DB_CONNECT_SECONDS = Histogram("bk_db_connect_wait_seconds", "Tempo para obter uma conexão com o banco")
+DB_CONNECTIONS_OPENED = Counter("bk_db_connections_opened_total", "Conexões abertas com o banco")
+# Sem pool: cada operação abre a própria conexão, então "em uso" = abertas
+DB_CONNECTIONS_IN_USE = Gauge("bk_db_connections_in_use", "Conexões em uso neste processo")
+
+PAGE_RENDER_SECONDS = Histogram("bk_page_render_seconds", "Duração do render() de cada página", ("page",))
+TAB_RENDER_SECONDS = Histogram("bk_tab_render_seconds", "Duração de cada aba das páginas", ("tab",))
+PAGE_ERRORS = Counter("bk_page_errors_total", "Exceções no render das páginas", ("page",))
+
+GRID_PAYLOAD_BYTES = Histogram("bk_grid_payload_bytes", "Bytes Arrow enviados ao navegador por grid",
+                               ("grid",), buckets=(1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7))
+
+CACHE_REQUESTS = Counter("bk_cache_requests_total", "Consultas aos caches da aplicação", ("cache", "result"))
+
+EMAIL_SEND_SECONDS = Histogram("bk_email_send_seconds", "Duração do envio de e-mails")
+EMAIL_SENT = Counter("bk_email_sent_total", "E-mails enviados")
+EMAIL_FAILURES = Counter("bk_email_failures_total", "Falhas no envio de e-mails", ("reason",))
+
+
+def observe_query(statement: str, elapsed: float):
+    """Observador de database.instrumentation → histograma de latência por statement."""
+    DB_QUERY_SECONDS.observe(elapsed, statement=statement)
+
+
+def cache_hit(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def track_page(page: str):
+    """Cronometra o render de uma página (e conta exceções)."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        PAGE_ERRORS.inc(page=page)
+        raise
+    finally:
+        PAGE_RENDER_SECONDS.observe(time.perf_counter() - started, page=page)
+
+
+@contextmanager
+def track_tab(tab: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        TAB_RENDER_SECONDS.observe(time.perf_counter() - started, tab=tab)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# EXPOSIÇÃO
+# ═══════════════════════════════════════════════════════════════════
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics numa thread daemon ao lado do servidor Streamlit."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Métricas em http://{host}:{port}/metrics")
+    return server
+
+
+def start_file_writer(path: str, interval: float = 15.0) -> threading.Thread:
+    """Regrava `path` a cada `interval` s (troca atômica) — para o textfile collector do node_exporter."""
+    def loop():
+        while True:
+            tmp = f"{path}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(render_text())
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.warning(f"Falha ao gravar métricas em {path}: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="metrics-file", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_metrics_config() -> dict:
+    """secrets.toml [metrics] port/file/host → METRICS_PORT/METRICS_FILE → desligado."""
+    import streamlit as st
+    config = {}
+    try:
+        config = dict(st.secrets["metrics"])
+    except Exception:
+        pass
+    if "port" not in config and os.getenv("METRICS_PORT"):
+        config["port"] = int(os.environ["METRICS_PORT"])
+    if "file" not in config and os.getenv("METRICS_FILE"):
+        config["file"] = os.environ["METRICS_FILE"]
+    return config
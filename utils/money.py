@@ -0,0 +1,77 @@
+"""
+utils/money.py
+Representação monetária em centavos (int64) para cálculos em memória
+"""
+
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Sufixo das colunas em centavos produzidas na fronteira de leitura do banco
+# (execute_query/execute_arrow com `money=`, ver database/columnar.cents_query)
+CENTS_SUFFIX = "_cents"
+
+# Até aqui float64 → ×100 → rint é exato; cobre um valor NUMERIC(15,2) (< 1e15 centavos)
+_FLOAT_EXACT_CENTS = 2 ** 50
+
+
+def to_cents(values) -> np.ndarray:
+    """
+    Converte valores monetários (Decimal, float, None) em centavos int64.
+    Um valor NUMERIC(15,2) tem |centavos| < 1e15 < 2**50: o caminho float64 →
+    ×100 → rint é exato e vetorizado. Acima disso (totais) os valores vão um
+    a um por Decimal.
+    """
+    objects = pd.Series(values, dtype=object)
+    arr = pd.to_numeric(objects, errors="coerce").to_numpy(dtype="float64", na_value=0.0)
+    cents = np.rint(arr * 100)
+    large = np.abs(cents) >= _FLOAT_EXACT_CENTS
+    out = cents.astype(np.int64)
+    if large.any():
+        out[large] = [scalar_to_cents(v) for v in objects.to_numpy()[large]]
+    return out
+
+
+def scalar_to_cents(value) -> int:
+    """Converte um único valor monetário (Decimal/float/None) em centavos."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return 0
+    return int((Decimal(str(value)) * 100).to_integral_value())
+
+
+def cents_to_reais(cents) -> np.ndarray:
+    """Converte centavos int64 em reais float64 (apenas para gráficos e grids)."""
+    return np.asarray(cents, dtype=np.int64) / 100
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    """Converte centavos em Decimal exato, para gravação no banco."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def sum_cents(values) -> int:
+    """Soma exata em centavos (NumPy int64)."""
+    return int(np.asarray(values, dtype=np.int64).sum())
+
+
+def to_reais_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cópia do DataFrame com as colunas `<nome>_cents` convertidas de volta para
+    reais (float64) com o nome original — usar só na renderização.
+    """
+    out = df.copy()
+    for col in [c for c in out.columns if str(c).endswith(CENTS_SUFFIX)]:
+        out[col[:-len(CENTS_SUFFIX)]] = cents_to_reais(out.pop(col).to_numpy())
+    return out
+
+
+def to_reais_table(table: pa.Table) -> pa.Table:
+    """Como to_reais_frame, para pyarrow.Table (grids alimentados por execute_arrow)."""
+    for i, name in enumerate(table.column_names):
+        if name.endswith(CENTS_SUFFIX):
+            reais = pc.divide(pc.cast(table.column(i), pa.float64()), 100.0)
+            table = table.set_column(i, name[:-len(CENTS_SUFFIX)], reais)
+    return table
@@ -10,11 +10,15 @@ from email.mime.multipart import MIMEMultipart
 from datetime import date
 import streamlit as st
 
+from utils import metrics
+from utils.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 RECIPIENTS = ["marcio@bk-engenharia.com", "mnknopp@gmail.com"]
 
 
+@traced("email.send")
 def send_email(subject: str, body_html: str):
     """Envia e-mail HTML para os destinatários configurados."""
     try:
@@ -26,6 +30,7 @@ def send_email(subject: str, body_html: str):
 
         if not smtp_password:
             logger.warning("Senha SMTP não configurada, e-mail não enviado.")
+            metrics.EMAIL_FAILURES.inc(reason="not_configured")
             return False
 
         msg = MIMEMultipart("alternative")
@@ -34,14 +39,17 @@ def send_email(subject: str, body_html: str):
         msg["To"] = ", ".join(RECIPIENTS)
         msg.attach(MIMEText(body_html, "html", "utf-8"))
 
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.ehlo()
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.sendmail(smtp_user, RECIPIENTS, msg.as_string())
+        with metrics.EMAIL_SEND_SECONDS.time():
+            with smtplib.SMTP(smtp_host, smtp_port) as server:
+                server.ehlo()
+                server.starttls()
+                server.login(smtp_user, smtp_password)
+                server.sendmail(smtp_user, RECIPIENTS, msg.as_string())
+        metrics.EMAIL_SENT.inc()
         return True
     except Exception as e:
         logger.error(f"Erro ao enviar e-mail: {e}")
+        metrics.EMAIL_FAILURES.inc(reason=type(e).__name__)
         return False
 
 
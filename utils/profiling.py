@@ -0,0 +1,143 @@
+"""
+utils/profiling.py
+Perfil sob demanda de um rerun (cProfile) — com [profiling] enabled (ou
+PROFILING=1), ativado por ?profile=1 ou pelo toggle da sidebar, com resumo
+das funções mais custosas no fim da página e o perfil bruto (.prof, abre no
+snakeviz/pstats) para download
+"""
+
+import os
+import io
+import time
+import pstats
+import cProfile
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+TOP_FUNCTIONS = 30
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# No Python ≥ 3.12 só um cProfile pode estar ativo por processo
+_profiler_lock = threading.Lock()
+
+
+def profiling_allowed() -> bool:
+    """
+    secrets.toml [profiling] enabled → PROFILING → desligado. Desligado por
+    padrão: qualquer usuário com ?profile=1 perfilaria reruns de produção.
+    """
+    try:
+        return bool(st.secrets["profiling"]["enabled"])
+    except Exception:
+        pass
+    return os.getenv("PROFILING", "").lower() in ("1", "true", "yes")
+
+
+def profile_requested() -> bool:
+    """?profile=1 na URL ou toggle da sidebar (key 'profile_run')."""
+    if not profiling_allowed():
+        return False
+    return st.query_params.get("profile") == "1" or bool(st.session_state.get("profile_run"))
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(PROJECT_ROOT):
+        return os.path.relpath(filename, PROJECT_ROOT)
+    parts = filename.replace("\\", "/").split("/site-packages/")
+    return parts[-1] if len(parts) > 1 else filename
+
+
+def summarize_stats(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> pd.DataFrame:
+    """Top funções por tempo acumulado, com % do total do rerun."""
+    total = max(stats.total_tt, 1e-9)
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _callers) in stats.stats.items():
+        location = func if filename == "~" else f"{_short_path(filename)}:{line}"
+        rows.append({
+            "Função": func,
+            "Local": location,
+            "Chamadas": nc,
+            "Próprio (s)": tt,
+            "Acumulado (s)": ct,
+            "% do rerun": min(ct / total, 1.0),
+            "App": filename.startswith(PROJECT_ROOT),
+        })
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    return df.sort_values("Acumulado (s)", ascending=False).head(limit).reset_index(drop=True)
+
+
+def _dump(profiler: cProfile.Profile) -> bytes:
+    fd, path = tempfile.mkstemp(suffix=".prof")
+    os.close(fd)
+    try:
+        profiler.dump_stats(path)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+
+def render_profile(profiler: cProfile.Profile, elapsed: float):
+    """Expander recolhido no fim da página com o resumo e o download do perfil."""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    df = summarize_stats(stats)
+    with st.expander(f"🔬 Perfil do rerun — {elapsed:.2f}s, {stats.total_calls:,} chamadas", expanded=False):
+        only_app = st.checkbox("Só funções do app", key="profile_only_app")
+        view = df[df["App"]] if only_app and not df.empty else df
+        st.dataframe(
+            view.drop(columns=["App"]),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Próprio (s)": st.column_config.NumberColumn(format="%.3f"),
+                "Acumulado (s)": st.column_config.NumberColumn(format="%.3f"),
+                "% do rerun": st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+            },
+        )
+        st.download_button(
+            "⬇️ Baixar perfil (.prof)",
+            data=_dump(profiler),
+            file_name=f"profile_{datetime.now():%Y%m%d_%H%M%S}.prof",
+            mime="application/octet-stream",
+            key="profile_download",
+        )
+        st.caption("Abra com `snakeviz arquivo.prof` ou `python -m pstats arquivo.prof`.")
+
+
+@contextmanager
+def profile_run(enabled: bool):
+    """
+    Perfila o bloco quando `enabled`. Em st.rerun()/st.stop() o profiler é
+    desligado sem renderizar (o rerun seguinte perfila de novo).
+    """
+    if not enabled:
+        yield
+        return
+    if not _profiler_lock.acquire(blocking=False):
+        st.caption("🔬 Outro rerun está sendo perfilado neste servidor; tente novamente.")
+        yield
+        return
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    finished = False
+    try:
+        profiler.enable()
+        try:
+            yield
+            finished = True
+        finally:
+            profiler.disable()
+    finally:
+        _profiler_lock.release()
+    if finished:
+        render_profile(profiler, time.perf_counter() - started)
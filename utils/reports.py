@@ -0,0 +1,295 @@
+"""
+utils/reports.py
+Construção de relatórios pesados (pivots, agregações, exportações) sem UI —
+chamáveis tanto pelas páginas quanto pelos processos do executor de jobs
+"""
+
+import logging
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+from dateutil.relativedelta import relativedelta
+
+from database import analytics
+from database.columnar import CATEGORY_COLUMNS
+from database.queries import (
+    get_categories, get_subcategories, get_transactions, iter_transactions, get_ledger, get_balance_on,
+)
+from utils.helpers import fmt_cents
+from utils.formatting import dates
+from utils.money import sum_cents, to_reais_frame, to_reais_table
+
+logger = logging.getLogger(__name__)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# FLUXO DE CAIXA 24 MESES (Previsto / Realizado)
+# ═══════════════════════════════════════════════════════════════════
+
+def build_cashflow_table(is_forecast: bool, start_month: date = None):
+    """
+    Pivot categoria/subcategoria × 24 meses, em centavos. Retorna (df, month_labels).
+    Os 24 meses são lidos de uma vez e somados por (tipo, subcategoria ou
+    categoria, mês) — antes era uma query por célula.
+    """
+    start_month = start_month or date.today().replace(day=1)
+    months = [start_month + relativedelta(months=i) for i in range(24)]
+    month_labels = [m.strftime("%b/%Y") for m in months]
+    df_t = get_transactions(start_date=start_month,
+                            end_date=months[-1] + relativedelta(months=1) - relativedelta(days=1),
+                            is_forecast=is_forecast)
+    by_sub, by_cat = {}, {}
+    if not df_t.empty:
+        keys = [df_t['flow_type'].astype(object), pd.to_datetime(df_t['due_date']).dt.strftime("%b/%Y")]
+        cents = df_t['total_value_cents']
+        by_sub = cents.groupby([keys[0], df_t['subcategory_id'], keys[1]]).sum().to_dict()
+        by_cat = cents.groupby([keys[0], df_t['category_id'], keys[1]]).sum().to_dict()
+    df_cats = get_categories()
+    rows = []
+    for _, cat in df_cats.iterrows():
+        df_subs = get_subcategories(int(cat['id']))
+        entries = [(None, '—')] if df_subs.empty else [(int(s['id']), s['name']) for _, s in df_subs.iterrows()]
+        for sub_id, sub_name in entries:
+            row = {'Tipo': cat['flow_type'], 'Categoria': cat['name'], 'Subcategoria': sub_name}
+            totals, key = (by_sub, sub_id) if sub_id else (by_cat, int(cat['id']))
+            for label in month_labels:
+                row[label] = int(totals.get((cat['flow_type'], key, label), 0))
+            rows.append(row)
+    return pd.DataFrame(rows), month_labels
+
+
+# ═══════════════════════════════════════════════════════════════════
+# RECORRÊNCIAS
+# ═══════════════════════════════════════════════════════════════════
+
+def build_recurrence_grid(df: pd.DataFrame, months: list) -> pd.DataFrame:
+    """
+    Uma linha por série recorrente × meses, em centavos (vazio se não houver
+    séries). Somas por (série, mês) num único groupby.
+    """
+    recurrent = df[df['is_recurrent'] == True] if 'is_recurrent' in df.columns else pd.DataFrame()
+    if recurrent.empty:
+        return pd.DataFrame()
+    month_labels = [m.strftime("%b/%Y") for m in months]
+    due_month = pd.to_datetime(df['due_date']).dt.strftime("%b/%Y")
+    totals = df['total_value_cents'].groupby([df['recurrence_group_id'], due_month]).sum().to_dict()
+    pivot_rows = []
+    for _, row in recurrent.drop_duplicates(subset=['recurrence_group_id']).iterrows():
+        r = {
+            'Tipo': row.get('flow_type', ''),
+            'Categoria': row.get('category_name', ''),
+            'Subcategoria': row.get('subcategory_name', ''),
+            'Descrição': row.get('description', ''),
+        }
+        for label in month_labels:
+            r[label] = int(totals.get((row['recurrence_group_id'], label), 0))
+        pivot_rows.append(r)
+    return pd.DataFrame(pivot_rows)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# EXTRATO
+# ═══════════════════════════════════════════════════════════════════
+
+EXTRATO_COLUMNS = ['due_date', 'flow_type', 'category_name', 'subcategory_name',
+                   'description', 'total_value', 'status', 'bank_name']
+EXTRATO_LABELS = {
+    'due_date': 'Vencimento', 'flow_type': 'Tipo', 'category_name': 'Categoria',
+    'subcategory_name': 'Subcategoria', 'description': 'Descrição',
+    'total_value': 'Valor Total', 'status': 'Status', 'bank_name': 'Banco',
+}
+
+
+def extrato_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas do extrato com valores em reais e vencimento DD/MM/AAAA."""
+    df_show  = to_reais_frame(df)
+    existing = [c for c in EXTRATO_COLUMNS if c in df_show.columns]
+    df_show  = df_show[existing]
+    df_show['due_date'] = dates(df_show['due_date'].to_numpy())
+    return df_show
+
+
+# Tipos das colunas do grid do extrato (vencimento como data: o grid formata)
+EXTRATO_SCHEMA = pa.schema([
+    ('due_date', pa.date32()), ('flow_type', pa.string()), ('category_name', pa.string()),
+    ('subcategory_name', pa.string()), ('description', pa.string()), ('total_value', pa.float64()),
+    ('status', pa.string()), ('bank_name', pa.string()),
+])
+
+
+def extrato_table(data) -> pa.Table:
+    """
+    Grid do extrato em pyarrow.Table (colunas de EXTRATO_LABELS, valores em
+    reais) a partir de um Table (modo analítico) ou DataFrame — segue direto
+    para st.dataframe; as exportações continuam em extrato_frame.
+    """
+    if isinstance(data, pd.DataFrame):
+        cents = [c + '_cents' if c == 'total_value' else c for c in EXTRATO_COLUMNS]
+        data = data[[c for c in cents if c in data.columns]]
+        data = pa.Table.from_pandas(
+            data.astype({c: object for c in CATEGORY_COLUMNS.intersection(data.columns)}), preserve_index=False)
+    table = to_reais_table(data).select(EXTRATO_COLUMNS).cast(EXTRATO_SCHEMA)
+    return table.rename_columns([EXTRATO_LABELS[c] for c in EXTRATO_COLUMNS])
+
+
+def export_extrato(start_date, end_date, is_forecast, fmt: str) -> str:
+    """Grava o extrato do período em arquivo temporário (lido em blocos) e retorna o caminho."""
+    from utils.export import export_to_tempfile
+    chunks = (extrato_frame(c) for c in iter_transactions(
+        start_date=start_date, end_date=end_date, is_forecast=is_forecast))
+    return export_to_tempfile(chunks, fmt)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# DASHBOARDS
+# ═══════════════════════════════════════════════════════════════════
+
+def dashboard_aggregates(chunks, today: date):
+    """
+    Agrega o período bloco a bloco (totais, mensal por tipo e por categoria),
+    em centavos. Retorna None se não houver nenhuma linha.
+    """
+    total_in = total_out = inadimplencia = 0
+    monthly, by_category = [], []
+    for df in chunks:
+        cents  = df['total_value_cents'].to_numpy()
+        is_in  = (df['flow_type'] == 'Entrada').to_numpy()
+        is_out = (df['flow_type'] == 'Saída').to_numpy()
+        due    = pd.to_datetime(df['due_date'])
+        overdue = is_out & (df['status'] == 'Não pago').to_numpy() & (due.dt.date < today).to_numpy()
+        total_in      += sum_cents(cents[is_in])
+        total_out     += sum_cents(cents[is_out])
+        inadimplencia += sum_cents(cents[overdue])
+        df = df.assign(month=due.dt.to_period('M').dt.to_timestamp(), flow_type=df['flow_type'].astype(object))
+        monthly.append(df.groupby(['month', 'flow_type'])['total_value_cents'].sum())
+        by_category.append(df.groupby(['flow_type', 'category_name'])['total_value_cents'].sum())
+    if not monthly:
+        return None
+    return dict(
+        total_in=total_in, total_out=total_out, inadimplencia=inadimplencia,
+        monthly=pd.concat(monthly).groupby(level=['month', 'flow_type']).sum(),
+        by_category=pd.concat(by_category).groupby(level=['flow_type', 'category_name']).sum(),
+    )
+
+
+def period_aggregates(start_date, end_date, today: date, is_forecast: bool = None):
+    """
+    dashboard_aggregates do período: na réplica local com o modo analítico
+    (database/analytics.py), senão lendo o Postgres em blocos.
+    """
+    if analytics.analytics_enabled():
+        try:
+            return analytics.aggregates(start_date, end_date, today, is_forecast)
+        except Exception as e:
+            logger.warning(f"Modo analítico indisponível, lendo do banco: {e}")
+    return dashboard_aggregates(iter_transactions(start_date=start_date, end_date=end_date,
+                                                  is_forecast=is_forecast), today)
+
+
+def gerencial_data(start_date, end_date, today: date, is_forecast: bool = None) -> tuple:
+    """
+    Dados da aba Gerencial: (extrato, agregado da visualização, agregado
+    previsto, agregado realizado) — agregados como dashboard_aggregates, None
+    sem linhas; o extrato é pyarrow.Table no modo analítico e DataFrame sem
+    ele (os dois servem a extrato_table). Com o modo analítico tudo sai da réplica local; sem ele, uma
+    única leitura do período alimenta os três agregados.
+    """
+    if analytics.analytics_enabled():
+        try:
+            return (analytics.extrato(start_date, end_date, is_forecast),
+                    analytics.aggregates(start_date, end_date, today, is_forecast),
+                    analytics.aggregates(start_date, end_date, today, True),
+                    analytics.aggregates(start_date, end_date, today, False))
+        except Exception as e:
+            logger.warning(f"Modo analítico indisponível, lendo do banco: {e}")
+    df = get_transactions(start_date=start_date, end_date=end_date)
+
+    def aggregate(frame):
+        return dashboard_aggregates([frame], today) if not frame.empty else None
+
+    df_view = df if is_forecast is None else df[df['is_forecast'] == is_forecast]
+    return (df_view, aggregate(df_view),
+            aggregate(df[df['is_forecast'] == True]), aggregate(df[df['is_forecast'] == False]))
+
+
+def period_result(start_date, end_date) -> tuple:
+    """
+    Resultado realizado do período em centavos — variação do saldo (snapshots
+    + delta, sem varrer o histórico): (resultado, saldo inicial, saldo final).
+    Usado pelo KPI do Dashboards e pelo HTML exportado.
+    """
+    opening = get_balance_on(start_date - timedelta(days=1))
+    closing = get_balance_on(end_date)
+    return closing - opening, opening, closing
+
+
+def dashboard_monthly_frame(agg: dict, ledger: pd.DataFrame = None):
+    """
+    Frame mensal (income/expense/balance/accumulated em centavos) ou None sem os
+    dois tipos. Com `ledger` (get_ledger mensal e status='Pago' do mesmo
+    período), o acumulado é o saldo realizado no fim de cada mês; sem ele, a
+    soma acumulada da janela.
+    """
+    df_piv = agg['monthly'].unstack('flow_type', fill_value=0).reset_index()
+    df_piv.columns.name = None
+    if 'Entrada' not in df_piv.columns or 'Saída' not in df_piv.columns:
+        return None
+    df_piv = df_piv.rename(columns={'Entrada': 'income_cents', 'Saída': 'expense_cents'}).astype(
+        {'income_cents': 'int64', 'expense_cents': 'int64'})
+    df_piv['balance_cents'] = df_piv['income_cents'] - df_piv['expense_cents']
+    if ledger is not None and not ledger.empty:
+        balances = pd.Series(ledger['balance_cents'].to_numpy(), index=pd.to_datetime(ledger['period']))
+        df_piv['accumulated_cents'] = balances.reindex(df_piv['month']).ffill().fillna(0).astype('int64').to_numpy()
+    else:
+        df_piv['accumulated_cents'] = df_piv['balance_cents'].cumsum()
+    df_piv['month'] = df_piv['month'].dt.strftime('%b/%Y')
+    return df_piv
+
+
+def category_totals(by_category: pd.Series, flow_type: str) -> pd.DataFrame:
+    """Fatia (category, value_cents) de um tipo de fluxo do agregado por categoria."""
+    if flow_type not in by_category.index.get_level_values('flow_type'):
+        return pd.DataFrame(columns=['category', 'value_cents'])
+    df = by_category.xs(flow_type, level='flow_type').reset_index()
+    df.columns = ['category', 'value_cents']
+    return df
+
+
+def dashboard_html(start_date, end_date, today: date) -> str:
+    """Relatório HTML do Dashboards (KPIs + gráficos) para impressão."""
+    from components.charts import cashflow_bar_line, pie_by_category
+
+    agg = dashboard_aggregates(iter_transactions(start_date=start_date, end_date=end_date), today)
+    if agg is None:
+        return "<html><body><p>Nenhum dado no período.</p></body></html>"
+
+    resultado, _, _ = period_result(start_date, end_date)
+    kpis = [
+        ("Total Receitas", agg['total_in']), ("Total Despesas", agg['total_out']),
+        ("Resultado", resultado), ("Inadimplência", agg['inadimplencia']),
+    ]
+    kpi_html = "".join(
+        f'<td style="padding:12px;border:1px solid #CBD5E1"><small>{label}</small><br>'
+        f'<b style="font-size:18px">{fmt_cents(value)}</b></td>'
+        for label, value in kpis
+    )
+    figures = []
+    df_piv = dashboard_monthly_frame(agg, get_ledger(start_date, end_date, "month", status='Pago'))
+    if df_piv is not None:
+        figures.append(cashflow_bar_line(to_reais_frame(df_piv)))
+    for flow_type, title in [('Saída', "Saídas por Categoria"), ('Entrada', "Entradas por Categoria")]:
+        figures.append(pie_by_category(to_reais_frame(category_totals(agg['by_category'], flow_type)), title))
+    charts_html = "".join(
+        fig.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False)
+        for i, fig in enumerate(figures)
+    )
+    return f"""
+    <html><head><meta charset="utf-8"><title>BK Finance — Dashboards</title></head>
+    <body style="font-family:Arial,sans-serif">
+        <h2>BK Finance — Dashboards Gerenciais</h2>
+        <p>Período: {start_date:%d/%m/%Y} a {end_date:%d/%m/%Y}</p>
+        <table style="border-collapse:collapse"><tr>{kpi_html}</tr></table>
+        {charts_html}
+    </body></html>
+    """
@@ -0,0 +1,233 @@
+"""
+utils/tracing.py
+Tracing estruturado compatível com OpenTelemetry — spans aninhados por
+rerun (página → aba → query/gráfico), amostrados por trace e gravados em
+JSON Lines no formato OTLP (um ExportTraceServiceRequest por linha, o mesmo
+do file exporter do OpenTelemetry Collector)
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "bk_finance"
+DEFAULT_SAMPLE_RATE = 0.1
+
+# OTLP: SPAN_KIND_INTERNAL / CLIENT e STATUS_CODE_ERROR
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+_current = contextvars.ContextVar("bk_current_span", default=None)
+_config = None
+_config_lock = threading.Lock()
+_write_lock = threading.Lock()
+_rng = random.Random()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CONFIGURAÇÃO
+# ═══════════════════════════════════════════════════════════════════
+
+def _load_config() -> dict:
+    """secrets.toml [tracing] file/sample_rate → TRACE_FILE/TRACE_SAMPLE_RATE → desligado."""
+    config = {}
+    try:
+        import streamlit as st
+        config = dict(st.secrets["tracing"])
+    except Exception:
+        pass
+    if "file" not in config and os.getenv("TRACE_FILE"):
+        config["file"] = os.environ["TRACE_FILE"]
+    if "sample_rate" not in config and os.getenv("TRACE_SAMPLE_RATE"):
+        config["sample_rate"] = os.environ["TRACE_SAMPLE_RATE"]
+    rate = float(config.get("sample_rate", DEFAULT_SAMPLE_RATE))
+    return {"file": config.get("file"), "sample_rate": min(max(rate, 0.0), 1.0)}
+
+
+def _get_config() -> dict:
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = _load_config()
+    return _config
+
+
+def configure(file: str = None, sample_rate: float = None):
+    """Sobrescreve a configuração (CLIs e benchmarks); `file=None` desliga o tracing."""
+    global _config
+    with _config_lock:
+        _config = {"file": file,
+                   "sample_rate": DEFAULT_SAMPLE_RATE if sample_rate is None else min(max(sample_rate, 0.0), 1.0)}
+
+
+def enabled() -> bool:
+    return bool(_get_config()["file"])
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SPANS
+# ═══════════════════════════════════════════════════════════════════
+
+class _Trace:
+    """Spans concluídos de um trace — exportados juntos quando a raiz termina."""
+
+    def __init__(self, sampled: bool):
+        self.trace_id = f"{_rng.getrandbits(128):032x}"
+        self.sampled = sampled
+        self.spans = []
+
+
+class Span:
+    def __init__(self, name: str, trace: _Trace, parent_id: str = "", kind: int = KIND_INTERNAL,
+                 attributes: dict = None):
+        self.name = name
+        self.trace = trace
+        self.span_id = f"{_rng.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def recording(self) -> bool:
+        return self.trace.sampled
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self, end_ns: int = None):
+        self.end_ns = end_ns or time.time_ns()
+        if self.trace.sampled:
+            self.trace.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        out = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {},
+        }
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        return out
+
+
+class _NoopSpan:
+    """Span de trace não amostrado (ou tracing desligado): tudo é no-op."""
+    recording = False
+
+    def set_attribute(self, key: str, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+@contextmanager
+def span(name: str, attributes: dict = None, kind: int = KIND_INTERNAL):
+    """
+    Abre um span filho do span corrente (ou a raiz de um novo trace, sorteada
+    pela taxa de amostragem). Exceções marcam o span com status de erro;
+    st.rerun()/st.stop() (BaseException) não são erro.
+    """
+    if not enabled():
+        yield _NOOP
+        return
+    parent = _current.get()
+    if parent is None:
+        trace = _Trace(_rng.random() < _get_config()["sample_rate"])
+        current = Span(name, trace, kind=kind, attributes=attributes)
+    elif not parent.recording:
+        current = parent
+    else:
+        current = Span(name, parent.trace, parent.span_id, kind, attributes)
+    if current is parent:
+        yield _NOOP
+        return
+    token = _current.set(current)
+    try:
+        yield current if current.recording else _NOOP
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+        if parent is None and current.trace.sampled:
+            _export(current.trace)
+
+
+def traced(name: str = None):
+    """Decorador: executa a função dentro de um span (nome padrão: módulo.função)."""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_query(statement: str, elapsed: float):
+    """
+    Observador de database.instrumentation: cada execute vira um span filho
+    já concluído (db.query) do span corrente, com o nome da função emissora.
+    """
+    parent = _current.get()
+    if parent is None or not parent.recording:
+        return
+    end_ns = time.time_ns()
+    child = Span("db.query", parent.trace, parent.span_id, KIND_CLIENT,
+                 {"db.system": "postgresql", "code.function": statement})
+    child.start_ns = end_ns - int(elapsed * 1e9)
+    child.end(end_ns)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# EXPORTAÇÃO
+# ═══════════════════════════════════════════════════════════════════
+
+def _export(trace: _Trace):
+    path = _get_config()["file"]
+    request = {"resourceSpans": [{
+        "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME),
+                                    _otlp_attribute("process.pid", os.getpid())]},
+        "scopeSpans": [{"scope": {"name": __name__},
+                        "spans": [s.to_otlp() for s in trace.spans]}],
+    }]}
+    line = json.dumps(request, ensure_ascii=False, separators=(",", ":"))
+    try:
+        with _write_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        logger.warning(f"Falha ao gravar trace em {path}: {e}")